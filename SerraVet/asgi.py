@@ -8,9 +8,18 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+import time
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SerraVet.settings")
 
+inicio = time.perf_counter()
 application = get_asgi_application()
+
+if settings.AQUECIMENTO_INICIAL:
+    from clinica.inicializacao import aquecer
+
+    # A requisição de aquecimento passa por um WSGIHandler: mesmos middlewares, views e templates.
+    aquecer(inicio)
@@ -0,0 +1,53 @@
+"""Configuração do gunicorn (``gunicorn -c python:SerraVet.gunicorn_conf SerraVet.wsgi``).
+
+Tudo pode ser ajustado por variáveis de ambiente; os padrões partem do número de CPUs da máquina. Para
+achar bons valores numa máquina, rode ``manage.py calibrar_gunicorn``.
+"""
+
+import gc
+import multiprocessing
+import os
+
+
+def _inteiro(nome, padrao):
+    return int(os.environ.get(nome, padrao))
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Workers gthread: cada processo atende ``threads`` requisições ao mesmo tempo, o que cobre a espera pelo
+# Postgres sem multiplicar a memória como processos extras fariam.
+workers = _inteiro("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = _inteiro("GUNICORN_THREADS", 4)
+worker_class = "gthread" if threads > 1 else "sync"
+
+# As settings dimensionam o pool de conexões por essas contagens (veja DATABASES em settings.py).
+os.environ["GUNICORN_WORKERS"] = str(workers)
+os.environ["GUNICORN_THREADS"] = str(threads)
+
+# Carrega o Django uma vez no master e só então cria os workers: o boot fica mais rápido e as páginas de
+# memória do código importado são compartilhadas (copy-on-write) entre os processos. Nada abre conexão com o
+# banco durante o import; o pool de threads das imagens também só é criado no primeiro uso.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+timeout = _inteiro("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _inteiro("GUNICORN_GRACEFUL_TIMEOUT", 30)
+# Conexões keep-alive do nginx (upstream com ``keepalive``); precisa ser maior que o keepalive_timeout de lá.
+keepalive = _inteiro("GUNICORN_KEEPALIVE", 75)
+
+# Recicla cada worker depois de ~max_requests requisições, com jitter para não reiniciarem todos juntos.
+max_requests = _inteiro("GUNICORN_MAX_REQUESTS", 2000)
+max_requests_jitter = _inteiro("GUNICORN_MAX_REQUESTS_JITTER", 200)
+
+# O heartbeat dos workers em memória: o disco do container pode travar o arquivo temporário padrão.
+worker_tmp_dir = os.environ.get("GUNICORN_WORKER_TMP_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+
+
+def when_ready(server):
+    # Move os objetos já criados (settings, modelos, templates compilados) para fora do alcance do coletor:
+    # sem isso, a primeira coleta de cada worker escreve em todas essas páginas e desfaz o copy-on-write.
+    if preload_app:
+        gc.freeze()
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
@@ -37,11 +39,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "rest_framework",
+    "rest_framework.authtoken",
     "clinica",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "clinica.middleware.InstrumentacaoMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -85,6 +90,84 @@ DATABASES = {
     }
 }
 
+# Conexões com o PostgreSQL. Por padrão cada processo mantém a conexão aberta entre requisições por
+# SERRAVET_DB_CONN_MAX_AGE segundos (0 volta a abrir uma por requisição), com health check antes de reusá-la.
+# SERRAVET_DB_POOL=1 troca isso pelo pool do psycopg 3 (uma conexão por thread atendendo, devolvida ao pool no
+# fim da requisição). O pool de cada processo é dimensionado pelas threads do worker e limitado para que os
+# workers dos dois serviços (django e django_async) x conexões caibam em SERRAVET_DB_MAX_CONEXOES, a fatia do
+# max_connections do Postgres desta aplicação. SERRAVET_DB_WORKERS_OUTRO_SERVICO são os workers do outro
+# serviço; por padrão, os mesmos deste (os dois leem o .env e o gunicorn_conf.py), e 0 sem o django_async.
+# Compare os modos com `manage.py benchmark_conexoes`.
+GUNICORN_WORKERS = int(os.environ.get("GUNICORN_WORKERS", 2))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 1))
+DB_POOL = os.environ.get("SERRAVET_DB_POOL", "0") == "1"
+DB_MAX_CONEXOES = int(os.environ.get("SERRAVET_DB_MAX_CONEXOES", 40))
+DB_WORKERS_OUTRO_SERVICO = int(os.environ.get("SERRAVET_DB_WORKERS_OUTRO_SERVICO", GUNICORN_WORKERS))
+# Exportado por compose/django/start-asgi. Sob ASGI o ORM roda em threads criadas por requisição, e uma
+# conexão persistente ficaria presa a cada uma delas: ali só o pool ou uma conexão por requisição.
+SERVIDOR_ASGI = os.environ.get("SERRAVET_ASGI", "0") == "1"
+
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+if DB_POOL:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": 1,
+            "max_size": max(
+                1, min(GUNICORN_THREADS, DB_MAX_CONEXOES // (GUNICORN_WORKERS + DB_WORKERS_OUTRO_SERVICO))
+            ),
+            "timeout": 10,
+        }
+    }
+elif SERVIDOR_ASGI:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("SERRAVET_DB_CONN_MAX_AGE", 60))
+
+# Cache (clinica/cache.py). SERRAVET_CACHE escolhe o backend: "memoria" (um cache por processo), "arquivo"
+# (compartilhado entre os workers da mesma máquina/volume) ou "banco" (compartilhado por todos; exige
+# `manage.py createcachetable`). Todos contam acertos e falhas por namespace. O cache "memoria" só serve para
+# um único worker: nos outros, as versões dos namespaces (e as sessões) não seriam invalidadas e eles
+# continuariam servindo fragmentos, horários e painéis antigos. Por isso ele é o padrão só com
+# GUNICORN_WORKERS=1; com mais workers o padrão é "arquivo" e pedir "memoria" é erro de configuração.
+BACKENDS_CACHE = {
+    "memoria": ("clinica.cache.CacheMemoria", "serravet"),
+    "arquivo": ("clinica.cache.CacheArquivo", os.environ.get("SERRAVET_CACHE_DIR", str(BASE_DIR / "cache"))),
+    "banco": ("clinica.cache.CacheBanco", "clinica_cache"),
+}
+MODO_CACHE = os.environ.get("SERRAVET_CACHE", "memoria" if GUNICORN_WORKERS == 1 else "arquivo")
+if MODO_CACHE == "memoria" and GUNICORN_WORKERS > 1:
+    raise ImproperlyConfigured(
+        "SERRAVET_CACHE=memoria exige GUNICORN_WORKERS=1; com mais workers use um cache compartilhado "
+        "(SERRAVET_CACHE=arquivo ou banco), senão as invalidações não chegam aos outros workers."
+    )
+_backend_cache, _local_cache = BACKENDS_CACHE[MODO_CACHE]
+CACHES = {
+    "default": {
+        "BACKEND": _backend_cache,
+        "LOCATION": _local_cache,
+        "TIMEOUT": 300,
+        "KEY_PREFIX": "serravet",
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("SERRAVET_CACHE_MAX_ENTRIES", 5000))},
+    }
+}
+
+# Validade dos fragmentos de template em cache (cartões de pets e linhas de consultas).
+CACHE_FRAGMENTOS_SEGUNDOS = 600
+
+# Sessões. SERRAVET_SESSOES escolhe o modo: "cache_db" (padrão; lidas do cache e gravadas no banco e no cache),
+# "cookie" (assinadas no próprio cookie, sem nenhuma consulta; o logout não invalida cópias antigas do cookie)
+# ou "banco" (o backend padrão do Django: um SELECT em django_session por requisição autenticada). As sessões
+# expiradas do banco são apagadas em lotes por `manage.py limpar_sessoes`. Compare com benchmark_sessoes.
+# "cache_db" depende do cache compartilhado entre os workers (veja CACHES): com um cache por processo, o logout
+# (ou a troca de senha) só limparia a sessão no cache do worker que o atendeu.
+MODOS_SESSAO = {
+    "banco": "django.contrib.sessions.backends.db",
+    "cache_db": "django.contrib.sessions.backends.cached_db",
+    "cookie": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_ENGINE = MODOS_SESSAO[os.environ.get("SERRAVET_SESSOES", "cache_db")]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -101,6 +184,24 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# API JSON (clinica/api.py), servida em /api/v1/. Só JSON: o renderer navegável do DRF custa caro a cada resposta.
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.TokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+    "DEFAULT_PARSER_CLASSES": ["rest_framework.parsers.JSONParser"],
+    "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.NamespaceVersioning",
+    "ALLOWED_VERSIONS": ["v1"],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "rest_framework.throttling.AnonRateThrottle",
+        "rest_framework.throttling.UserRateThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {"anon": "30/min", "user": "300/min", "agendamentos": "10/min"},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -120,6 +221,15 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 MEDIA_URL = "/media/"
 
+# Arquivos privados (receitas): fora de MEDIA_ROOT e entregues só por views que checam o acesso. Com
+# ARQUIVOS_PRIVADOS_X_ACCEL a view responde com X-Accel-Redirect para a location internal do nginx.
+ARQUIVOS_PRIVADOS_ROOT = BASE_DIR / "privado"
+ARQUIVOS_PRIVADOS_URL = "/protegido/"
+ARQUIVOS_PRIVADOS_X_ACCEL = os.environ.get("ARQUIVOS_PRIVADOS_X_ACCEL", str(not DEBUG)).lower() in ("1", "true")
+
+# Miniaturas JPEG/WebP das fotos, geradas após o commit num pool de threads (veja clinica/imagens.py).
+IMAGENS_VARIANTES_THREADS = 2
+
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [
     BASE_DIR / "static",
@@ -127,6 +237,13 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Estáticos com hash no nome, imagens otimizadas e variantes .gz/.br (clinica/estaticos.py). O collectstatic
+# roda no build das imagens Docker, não na subida do container.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "clinica.estaticos.ArmazenamentoEstaticos"},
+}
+
 AUTH_USER_MODEL = "clinica.CustomUser"
 
 # Default primary key field type
@@ -138,5 +255,27 @@ LOGIN_REDIRECT_URL = "home_user"
 LOGOUT_REDIRECT_URL = "login"
 
 
+# Aquecimento na subida (clinica/inicializacao.py, chamado por wsgi.py/asgi.py): importa URLs e views, compila
+# os templates e atende um GET em AQUECIMENTO_CAMINHO antes do primeiro cliente. Com o preload do gunicorn roda
+# uma vez, no master. O tempo de cada etapa vai para o logger clinica.inicializacao.
+AQUECIMENTO_INICIAL = os.environ.get("SERRAVET_AQUECIMENTO", "1") == "1"
+AQUECIMENTO_CAMINHO = "/"
+
+# Instrumentação de requisições (Server-Timing e log de consultas SQL)
+INSTRUMENTACAO_REQUISICOES = os.environ.get("SERRAVET_INSTRUMENTACAO", "0") == "1"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "clinica.instrumentacao": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "clinica.inicializacao": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+
 # Enviar e-mail teste
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -17,7 +17,7 @@ Including another URLconf
 
 from django.contrib.auth import views as auth_views
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 from django.contrib.auth.views import LogoutView
 from clinica.views import (
     CustomLoginView,
@@ -28,13 +28,14 @@ from clinica.views import (
     home,
     prontuario_view,
 )
-from clinica import views
+from clinica import api, views
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/v1/", include((api.urlpatterns, "v1"))),
     path("", home, name="home"),
     path("cadastro/", cadastro, name="cadastro"),
     path("login/", CustomLoginView.as_view(), name="login"),
@@ -62,6 +63,11 @@ urlpatterns = [
         views.criar_horario,
         name="criar_horario",
     ),
+    path(
+        "home_atendente/atd/gerenciar_horarios/recorrentes/",
+        views.criar_horarios_recorrentes,
+        name="criar_horarios_recorrentes",
+    ),
     path("meus-pets/", views.meus_pets_view, name="meus_pets"),
     path("meus-pets/cadastrar/", views.cadastrar_pet_view, name="cadastrar_pet"),
     path("meus-pets/excluir/<int:pet_id>/", views.excluir_pet_view, name="excluir_pet"),
@@ -77,7 +83,9 @@ urlpatterns = [
     path("consultas/<int:pk>/", views.detalhe_consulta_view, name="detalhes_consulta"),
     path("perfil/", views.perfil_user, name="perfil_user"),
     path("vet/dashboard/", views.home_vet, name="home_vet"),
+    path("vet/painel/contadores/", views.contadores_painel_vet, name="contadores_painel_vet"),
     path("vet/consultas/", views.lista_consultas_vet, name="lista_consultas_vet"),
+    path("vet/prontuarios/busca/", views.buscar_prontuarios_vet, name="buscar_prontuarios_vet"),
     path(
         "vet/consulta/<int:consulta_id>/",
         views.detalhe_consulta_vet,
@@ -89,6 +97,8 @@ urlpatterns = [
         name="cadastrar_prontuario_vet",
     ),
     path("user/prontuario/<int:pk>/", prontuario_view, name="prontuario_user"),
+    path("prontuario/<int:pk>/receita/", views.baixar_receita, name="baixar_receita"),
+    path("interno/cache/", views.estatisticas_cache_view, name="estatisticas_cache"),
     path("reset_password/", auth_views.PasswordResetView.as_view(), name="reset_password"),
     path(
         "reset_password_sent/",
@@ -8,9 +8,17 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SerraVet.settings")
 
+inicio = time.perf_counter()
 application = get_wsgi_application()
+
+if settings.AQUECIMENTO_INICIAL:
+    from clinica.inicializacao import aquecer
+
+    aquecer(inicio, application)
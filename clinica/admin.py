@@ -9,6 +9,8 @@ from .models import (
     HorarioDisponivel,
 )
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .busca import filtro_busca_pets
+from .pagination import ContagemEstimadaPaginator
 from django.contrib.auth.admin import UserAdmin
 from django.utils import timezone
 
@@ -70,18 +72,33 @@ class CustomUserAdmin(UserAdmin):
 
 class VeterinarioInfoAdmin(admin.ModelAdmin):
     list_display = ("user", "crmv")
+    list_select_related = ("user",)
     search_fields = ("user__nome", "user__sobrenome", "crmv")
+    autocomplete_fields = ("user",)
 
 
 class ClientePerfilAdmin(admin.ModelAdmin):
     list_display = ("user", "telefone", "endereco")
+    list_select_related = ("user",)
     search_fields = ("user__nome", "user__sobrenome", "telefone", "endereco")
+    autocomplete_fields = ("user",)
 
 
 class PetAdmin(admin.ModelAdmin):
     list_display = ("nome", "especie", "tutor")
+    list_select_related = ("tutor",)
     list_filter = ("especie",)
+    ordering = ("nome",)
     search_fields = ("nome", "tutor__nome", "tutor__sobrenome")
+    autocomplete_fields = ("tutor",)
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Mesmos campos de search_fields, mas pelo índice de texto da coluna busca (também no autocomplete).
+        if not search_term:
+            return queryset, False
+        return queryset.filter(filtro_busca_pets(search_term)), False
 
 
 class ConsultaAdmin(admin.ModelAdmin):
@@ -91,9 +108,15 @@ class ConsultaAdmin(admin.ModelAdmin):
         "get_data_hora",
         "status",
     )
-    list_filter = ("status", "horario_agendado__data")
+    list_select_related = ("pet", "veterinario", "horario_agendado")
+    list_filter = ("status",)
+    date_hierarchy = "horario_agendado__data"
     ordering = ("horario_agendado__data",)
     search_fields = ("pet__nome", "veterinario__nome", "veterinario__sobrenome")
+    autocomplete_fields = ("pet", "veterinario")
+    raw_id_fields = ("horario_agendado",)
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
 
     @admin.display(description="Data e Hora")
     def get_data_hora(self, obj):
@@ -109,19 +132,28 @@ class ConsultaAdmin(admin.ModelAdmin):
 
 class ProntuarioAdmin(admin.ModelAdmin):
     list_display = ("consulta", "diagnostico", "criada_em")
+    list_select_related = ("consulta__pet", "consulta__veterinario", "consulta__horario_agendado")
     search_fields = (
         "consulta__pet__nome",
         "consulta__veterinario__nome",
         "diagnostico",
     )
     list_filter = ("criada_em",)
+    raw_id_fields = ("consulta",)
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
 
 
 class HorarioDisponivelAdmin(admin.ModelAdmin):
     list_display = ("veterinario", "data", "disponivel")
+    list_select_related = ("veterinario",)
     list_filter = ("disponivel",)
+    date_hierarchy = "data"
     search_fields = ("veterinario__nome", "veterinario__sobrenome")
     ordering = ("data",)
+    autocomplete_fields = ("veterinario",)
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
 
 
 admin.site.register(VeterinarioInfo, VeterinarioInfoAdmin)
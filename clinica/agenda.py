@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .cache import invalidar_escopos
+from .models import HorarioDisponivel
+
+
+# =====================
+# RECURRING SCHEDULE
+# =====================
+
+
+DIAS_SEMANA_CHOICES = [
+    (0, "Segunda-feira"),
+    (1, "Terça-feira"),
+    (2, "Quarta-feira"),
+    (3, "Quinta-feira"),
+    (4, "Sexta-feira"),
+    (5, "Sábado"),
+    (6, "Domingo"),
+]
+
+TAMANHO_LOTE_PADRAO = 1000
+
+
+def expandir_agenda(data_inicio, data_fim, dias_semana, hora_inicio, hora_fim, duracao, feriados=()):
+    """Gera os datetimes de cada horário da agenda recorrente, em ordem cronológica.
+
+    Um horário só é gerado se couber inteiro na janela [hora_inicio, hora_fim].
+    """
+    dias_semana = set(dias_semana)
+    feriados = set(feriados)
+    fuso = timezone.get_current_timezone()
+
+    dia = data_inicio
+    while dia <= data_fim:
+        if dia.weekday() in dias_semana and dia not in feriados:
+            inicio = datetime.combine(dia, hora_inicio)
+            limite = datetime.combine(dia, hora_fim)
+            while inicio + duracao <= limite:
+                yield timezone.make_aware(inicio, fuso)
+                inicio += duracao
+        dia += timedelta(days=1)
+
+
+def gerar_horarios_recorrentes(
+    veterinario,
+    data_inicio,
+    data_fim,
+    dias_semana,
+    hora_inicio,
+    hora_fim,
+    duracao,
+    feriados=(),
+    batch_size=TAMANHO_LOTE_PADRAO,
+):
+    """Cria em lote os HorarioDisponivel da agenda, ignorando os que já existem.
+
+    A leitura prévia só poupa os INSERTs já conhecidos; quem garante que não haja horário repetido é a
+    constraint horario_vet_data_uniq, com ``ignore_conflicts`` absorvendo uma execução concorrente (ou o
+    formulário enviado duas vezes). Retorna quantos horários da agenda passaram a existir desde a leitura,
+    incluindo os que uma execução concorrente tenha gravado no meio tempo.
+    """
+    datas = list(expandir_agenda(data_inicio, data_fim, dias_semana, hora_inicio, hora_fim, duracao, feriados))
+    if not datas:
+        return 0
+
+    periodo = HorarioDisponivel.objects.filter(veterinario=veterinario, data__gte=datas[0], data__lte=datas[-1])
+    existentes = set(periodo.values_list("data", flat=True))
+
+    novos = [HorarioDisponivel(veterinario=veterinario, data=data) for data in datas if data not in existentes]
+    if not novos:
+        return 0
+    HorarioDisponivel.objects.bulk_create(novos, batch_size=batch_size, ignore_conflicts=True)
+    # Com ignore_conflicts o banco não diz quais linhas entraram: conta de novo o período.
+    criados = periodo.count() - len(existentes)
+    if criados:
+        invalidar_escopos(agenda=veterinario.id)
+    return criados
@@ -0,0 +1,167 @@
+from datetime import datetime, time, timedelta
+
+from django.urls import path
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.views import obtain_auth_token
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.utils.urls import replace_query_param
+
+from .forms import JanelaHorariosForm
+from .models import Consulta, CustomUser, HorarioDisponivel, HorarioIndisponivelError, Pet
+from .pagination import paginar_por_cursor
+from .serializers import (
+    AgendamentoSerializer,
+    ConsultaSerializer,
+    HorarioSerializer,
+    PetSerializer,
+    VeterinarioSerializer,
+)
+
+
+# =====================
+# API (v1)
+# =====================
+
+
+class PaginacaoCursorAPI(BasePagination):
+    """Paginação por cursor (``paginar_por_cursor``) sobre ``view.ordenacao_cursor``, sem COUNT nem OFFSET.
+
+    O cliente escolhe o tamanho da página com ``?tamanho=`` (até ``tamanho_maximo``).
+    """
+
+    tamanho_padrao = 20
+    tamanho_maximo = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            tamanho = min(max(int(request.query_params.get("tamanho", self.tamanho_padrao)), 1), self.tamanho_maximo)
+        except ValueError:
+            tamanho = self.tamanho_padrao
+        self.pagina = paginar_por_cursor(queryset, view.ordenacao_cursor, request.query_params.get("cursor"), tamanho)
+        return list(self.pagina)
+
+    def _link(self, token):
+        if token is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), "cursor", token)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "proximo": self._link(self.pagina.proximo_cursor),
+                "anterior": self._link(self.pagina.cursor_anterior),
+                "resultados": data,
+            }
+        )
+
+
+class TipoUsuarioPermitido(permissions.BasePermission):
+    message = "Acesso negado."
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.user_type in view.tipos_usuario
+
+
+class BaseAPIView(generics.GenericAPIView):
+    permission_classes = [TipoUsuarioPermitido]
+    pagination_class = PaginacaoCursorAPI
+    tipos_usuario = ("cliente", "veterinario", "atendente", "administrador")
+
+
+class VeterinariosAPI(BaseAPIView, generics.ListAPIView):
+    serializer_class = VeterinarioSerializer
+    ordenacao_cursor = ["nome", "id"]
+
+    def get_queryset(self):
+        return (
+            CustomUser.objects.filter(user_type="veterinario", is_active=True)
+            .select_related("veterinarioinfo")
+            .only("id", "nome", "sobrenome", "veterinarioinfo__crmv")
+        )
+
+
+class HorariosAPI(BaseAPIView, generics.ListAPIView):
+    """Horários livres e futuros; filtros opcionais ``veterinario``, ``inicio`` e ``fim`` (AAAA-MM-DD)."""
+
+    serializer_class = HorarioSerializer
+    ordenacao_cursor = ["data", "id"]
+
+    def get_queryset(self):
+        horarios = HorarioDisponivel.objects.filter(disponivel=True, data__gte=timezone.now()).only(
+            "id", "veterinario", "data"
+        )
+        filtros = JanelaHorariosForm(
+            {
+                "veterinario_id": self.request.query_params.get("veterinario"),
+                "inicio": self.request.query_params.get("inicio"),
+                "fim": self.request.query_params.get("fim"),
+            }
+        )
+        filtros.is_valid()
+        dados = filtros.cleaned_data
+        if dados.get("veterinario_id"):
+            horarios = horarios.filter(veterinario_id=dados["veterinario_id"])
+        if dados.get("inicio"):
+            horarios = horarios.filter(data__gte=timezone.make_aware(datetime.combine(dados["inicio"], time.min)))
+        if dados.get("fim"):
+            horarios = horarios.filter(
+                data__lt=timezone.make_aware(datetime.combine(dados["fim"] + timedelta(days=1), time.min))
+            )
+        return horarios
+
+
+def _filtro_tutor(request):
+    """Clientes veem só o que é deles; a recepção vê tudo e pode filtrar com ``?tutor=<id>``."""
+    if request.user.user_type == "cliente":
+        return {"tutor_id": request.user.id}
+    tutor = request.query_params.get("tutor")
+    return {"tutor_id": tutor} if tutor and tutor.isdigit() else {}
+
+
+class PetsAPI(BaseAPIView, generics.ListAPIView):
+    serializer_class = PetSerializer
+    ordenacao_cursor = ["nome", "id"]
+    tipos_usuario = ("cliente", "atendente")
+
+    def get_queryset(self):
+        return Pet.objects.filter(**_filtro_tutor(self.request)).defer("busca")
+
+
+class ConsultasAPI(BaseAPIView, generics.ListCreateAPIView):
+    """GET lista as consultas (mais recentes primeiro); POST agenda uma nova."""
+
+    ordenacao_cursor = ["-horario_agendado__data", "-id"]
+    tipos_usuario = ("cliente", "atendente")
+    throttle_scope = "agendamentos"
+
+    def get_queryset(self):
+        filtro = {f"pet__{campo}": valor for campo, valor in _filtro_tutor(self.request).items()}
+        return Consulta.objects.filter(**filtro).select_related("pet", "veterinario", "horario_agendado")
+
+    def get_serializer_class(self):
+        return AgendamentoSerializer if self.request.method == "POST" else ConsultaSerializer
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        if self.request.method == "POST":
+            throttles.append(ScopedRateThrottle())
+        return throttles
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except HorarioIndisponivelError as erro:
+            return Response({"horario_agendado": erro.messages}, status=status.HTTP_409_CONFLICT)
+
+
+urlpatterns = [
+    path("token/", obtain_auth_token, name="token"),
+    path("veterinarios/", VeterinariosAPI.as_view(), name="veterinarios"),
+    path("horarios/", HorariosAPI.as_view(), name="horarios"),
+    path("pets/", PetsAPI.as_view(), name="pets"),
+    path("consultas/", ConsultasAPI.as_view(), name="consultas"),
+]
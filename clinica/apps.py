@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClinicaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "clinica"
+
+    def ready(self):
+        from . import sinais  # noqa: F401
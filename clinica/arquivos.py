@@ -0,0 +1,71 @@
+import mimetypes
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+from django.utils.http import content_disposition_header
+from django.views.static import serve
+
+
+# =====================
+# PRIVATE FILES
+# =====================
+
+
+# Caminho fixo: é o que as migrações gravam (0007_receitas_privadas). Se a classe mudar de módulo, este nome
+# precisa continuar importável.
+@deconstructible(path="clinica.arquivos.ArmazenamentoPrivado")
+class ArmazenamentoPrivado(FileSystemStorage):
+    """Armazenamento fora de MEDIA_ROOT para arquivos que só podem sair por uma view autenticada.
+
+    ``url()`` aponta para a location ``internal`` do nginx (ARQUIVOS_PRIVADOS_URL), que devolve 404 a
+    qualquer acesso direto e só serve o arquivo quando a view responde com ``X-Accel-Redirect``.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    @cached_property
+    def base_location(self):
+        return settings.ARQUIVOS_PRIVADOS_ROOT
+
+    @cached_property
+    def base_url(self):
+        return settings.ARQUIVOS_PRIVADOS_URL
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        if setting in ("ARQUIVOS_PRIVADOS_ROOT", "ARQUIVOS_PRIVADOS_URL"):
+            for atributo in ("base_location", "location", "base_url"):
+                self.__dict__.pop(atributo, None)
+        super()._clear_cached_properties(setting, **kwargs)
+
+
+armazenamento_privado = ArmazenamentoPrivado()
+
+
+def resposta_arquivo_privado(request, arquivo):
+    """Resposta que entrega ``arquivo`` (FieldFile de um ArmazenamentoPrivado) a um usuário já autorizado.
+
+    Em produção a transferência fica com o nginx via ``X-Accel-Redirect``: o worker devolve só os
+    cabeçalhos e o nginx cuida do envio (sendfile), de ``Range`` e de ``If-Modified-Since``/``If-None-Match``.
+    Sem nginx (ARQUIVOS_PRIVADOS_X_ACCEL desligado, como no runserver) o arquivo sai pelo ``serve`` do
+    Django, que já responde 304 a GETs condicionais.
+    """
+    nome_download = posixpath.basename(arquivo.name)
+    if settings.ARQUIVOS_PRIVADOS_X_ACCEL:
+        tipo, codificacao = mimetypes.guess_type(nome_download)
+        resposta = HttpResponse(content_type=tipo or "application/octet-stream")
+        resposta["X-Accel-Redirect"] = arquivo.url
+        if codificacao:
+            resposta["Content-Encoding"] = codificacao
+    else:
+        resposta = serve(request, arquivo.name, document_root=arquivo.storage.location)
+
+    resposta["Content-Disposition"] = content_disposition_header(False, nome_download)
+    # O navegador pode guardar o arquivo, mas precisa revalidar (e passar pela checagem de acesso) a cada uso.
+    resposta["Cache-Control"] = "private, no-cache"
+    resposta["X-Content-Type-Options"] = "nosniff"
+    return resposta
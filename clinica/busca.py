@@ -0,0 +1,225 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# =====================
+# TEXT SEARCH
+# =====================
+
+
+# Tabela FTS5 que espelha clinica_pet.busca no SQLite (criada na migração 0004).
+TABELA_FTS_PETS = "clinica_pet_busca"
+
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar_busca(*partes):
+    """Texto em minúsculas e sem acentos, pronto para ser indexado ou comparado."""
+    texto = " ".join(parte for parte in partes if parte)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_PALAVRA.findall(texto.lower()))
+
+
+def termos_busca(texto):
+    return normalizar_busca(texto).split()
+
+
+def texto_busca_pet(pet, tutor=None):
+    tutor = tutor or pet.tutor
+    return normalizar_busca(pet.nome, tutor.nome, tutor.sobrenome)
+
+
+def valores_por_busca(texto, choices):
+    """Valores de ``choices`` cujo código ou rótulo tem uma palavra começando com cada termo de ``texto``."""
+    termos = termos_busca(texto)
+    valores = []
+    for valor, rotulo in choices:
+        palavras = normalizar_busca(valor.replace("_", " "), str(rotulo)).split()
+        if termos and all(any(palavra.startswith(termo) for palavra in palavras) for termo in termos):
+            valores.append(valor)
+    return valores
+
+
+def _sql_busca_pets(termos):
+    if connection.vendor == "postgresql":
+        consulta = " & ".join(f"{termo}:*" for termo in termos)
+        return (
+            "SELECT id FROM clinica_pet WHERE to_tsvector('simple', busca) @@ to_tsquery('simple', %s)",
+            [consulta],
+        )
+    if connection.vendor == "sqlite":
+        consulta = " ".join(f'"{termo}"*' for termo in termos)
+        return f"SELECT rowid FROM {TABELA_FTS_PETS} WHERE {TABELA_FTS_PETS} MATCH %s", [consulta]
+    return None
+
+
+def filtro_busca_pets(texto, relacao=""):
+    """Q que restringe aos pets cujo nome ou nome do tutor começa com cada termo de ``texto``.
+
+    ``relacao`` é o caminho até o Pet a partir do model filtrado (por exemplo ``"pet"`` para Consulta).
+    Usa o índice GIN de texto do PostgreSQL ou a tabela FTS5 do SQLite; a comparação ignora acentos e
+    maiúsculas. Em outros bancos cai para um LIKE sobre a coluna ``busca``.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return Q()
+
+    prefixo = f"{relacao}__" if relacao else ""
+    sql = _sql_busca_pets(termos)
+    if sql is not None:
+        return Q(**{f"{prefixo}pk__in": RawSQL(*sql)})
+
+    filtro = Q()
+    for termo in termos:
+        filtro &= Q(**{f"{prefixo}busca__startswith": termo}) | Q(**{f"{prefixo}busca__contains": f" {termo}"})
+    return filtro
+
+
+# =====================
+# CLINICAL RECORDS SEARCH
+# =====================
+
+
+# Tabela FTS5 que espelha clinica_prontuario.busca no SQLite (criada na migração 0005).
+TABELA_FTS_PRONTUARIOS = "clinica_prontuario_busca"
+
+
+def texto_busca_prontuario(prontuario):
+    return normalizar_busca(
+        prontuario.sinais_clinicos,
+        prontuario.diagnostico,
+        prontuario.exames_realizados,
+        prontuario.observacoes,
+    )
+
+
+def buscar_prontuarios(queryset, texto):
+    """Filtra o queryset de prontuários pelos termos de ``texto`` e ordena pela relevância.
+
+    No PostgreSQL usa o dicionário ``portuguese`` (com radicalização) sobre o texto sem acentos, casando
+    "vomitos" com "vômito"; no SQLite usa FTS5 com casamento por prefixo e ordena pelo bm25. O queryset
+    volta anotado com ``relevancia`` (maior é melhor).
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return queryset.annotate(relevancia=Value(0.0)).none()
+
+    if connection.vendor == "postgresql":
+        vetor = "clinica_prontuario.busca_vetor"
+        consulta = "plainto_tsquery('portuguese', %s)"
+        texto = " ".join(termos)
+        return (
+            queryset.filter(RawSQL(f"{vetor} @@ {consulta}", [texto], output_field=BooleanField()))
+            .annotate(relevancia=RawSQL(f"ts_rank({vetor}, {consulta})", [texto], output_field=FloatField()))
+            .order_by("-relevancia", "-id")
+        )
+
+    if connection.vendor == "sqlite":
+        consulta = " ".join(f'"{termo}"*' for termo in termos)
+        return (
+            queryset.filter(
+                pk__in=RawSQL(
+                    f"SELECT rowid FROM {TABELA_FTS_PRONTUARIOS} WHERE {TABELA_FTS_PRONTUARIOS} MATCH %s", [consulta]
+                )
+            )
+            .annotate(
+                relevancia=RawSQL(
+                    f"SELECT -rank FROM {TABELA_FTS_PRONTUARIOS} WHERE {TABELA_FTS_PRONTUARIOS} MATCH %s "
+                    "AND rowid = clinica_prontuario.id",
+                    [consulta],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-relevancia", "-id")
+        )
+
+    filtro = Q()
+    for termo in termos:
+        filtro &= Q(busca__startswith=termo) | Q(busca__contains=f" {termo}")
+    return queryset.filter(filtro).annotate(relevancia=Value(0.0)).order_by("-id")
+
+
+# =====================
+# SEARCH INDEX DDL
+# =====================
+
+
+def _sql_fts5(tabela_fts, tabela):
+    """Tabela FTS5 de conteúdo externo sobre ``tabela.busca`` e os triggers que a mantêm sincronizada."""
+    remover = f"INSERT INTO {tabela_fts}({tabela_fts}, rowid, busca) VALUES ('delete', old.id, old.busca);"
+    inserir = f"INSERT INTO {tabela_fts}(rowid, busca) VALUES (new.id, new.busca);"
+    return {
+        "criar": [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabela_fts} USING fts5("
+            f"busca, content='{tabela}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {tabela_fts}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabela_fts}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabela_fts}_au AFTER UPDATE OF busca ON {tabela} "
+            f"BEGIN {remover} {inserir} END",
+            f"INSERT INTO {tabela_fts}({tabela_fts}) VALUES ('rebuild')",
+        ],
+        "remover": [
+            f"DROP TRIGGER IF EXISTS {tabela_fts}_ai",
+            f"DROP TRIGGER IF EXISTS {tabela_fts}_ad",
+            f"DROP TRIGGER IF EXISTS {tabela_fts}_au",
+            f"DROP TABLE IF EXISTS {tabela_fts}",
+        ],
+    }
+
+
+SQL_INDICE_BUSCA_PETS = {
+    "postgresql": {
+        "criar": [
+            "CREATE INDEX IF NOT EXISTS pet_busca_fts_idx ON clinica_pet USING gin (to_tsvector('simple', busca))",
+        ],
+        "remover": ["DROP INDEX IF EXISTS pet_busca_fts_idx"],
+    },
+    "sqlite": _sql_fts5(TABELA_FTS_PETS, "clinica_pet"),
+}
+
+SQL_INDICE_BUSCA_PRONTUARIOS = {
+    "postgresql": {
+        # Coluna gerada: evita recalcular o to_tsvector de cada linha no recheck do índice e no ts_rank.
+        "criar": [
+            "ALTER TABLE clinica_prontuario ADD COLUMN IF NOT EXISTS busca_vetor tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('portuguese', busca)) STORED",
+            "CREATE INDEX IF NOT EXISTS prontuario_busca_fts_idx ON clinica_prontuario USING gin (busca_vetor)",
+        ],
+        "remover": [
+            "DROP INDEX IF EXISTS prontuario_busca_fts_idx",
+            "ALTER TABLE clinica_prontuario DROP COLUMN IF EXISTS busca_vetor",
+        ],
+    },
+    "sqlite": _sql_fts5(TABELA_FTS_PRONTUARIOS, "clinica_prontuario"),
+}
+
+
+def _executar(schema_editor, sql_por_banco, acao):
+    for sql in sql_por_banco.get(schema_editor.connection.vendor, {}).get(acao, []):
+        schema_editor.execute(sql)
+
+
+def criar_indice_busca_pets(schema_editor):
+    """Cria (ou recria, no SQLite) o índice de texto sobre clinica_pet.busca. É idempotente.
+
+    No SQLite, recriar a tabela clinica_pet numa migração descarta os triggers que alimentam a tabela
+    FTS5; rode ``reindexar_busca`` depois de migrações que alterem Pet.
+    """
+    _executar(schema_editor, SQL_INDICE_BUSCA_PETS, "criar")
+
+
+def remover_indice_busca_pets(schema_editor):
+    _executar(schema_editor, SQL_INDICE_BUSCA_PETS, "remover")
+
+
+def criar_indice_busca_prontuarios(schema_editor):
+    """Cria (ou recria, no SQLite) o índice de texto sobre clinica_prontuario.busca. É idempotente."""
+    _executar(schema_editor, SQL_INDICE_BUSCA_PRONTUARIOS, "criar")
+
+
+def remover_indice_busca_prontuarios(schema_editor):
+    _executar(schema_editor, SQL_INDICE_BUSCA_PRONTUARIOS, "remover")
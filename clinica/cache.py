@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+# =====================
+# BACKENDS WITH HIT/MISS COUNTERS
+# =====================
+
+
+_AUSENTE = object()
+_trava_contadores = threading.Lock()
+_acertos = Counter()
+_falhas = Counter()
+_medicoes_cache = threading.local()
+
+
+def namespace_chave(chave):
+    """Agrupa as chaves para os contadores: ``clinica:tutor:7:...`` -> ``tutor``, fragmentos -> ``fragmento``."""
+    if chave.startswith("template.cache."):
+        return "fragmento"
+    partes = chave.split(":")
+    if partes[0] == "clinica" and len(partes) > 1:
+        return partes[1]
+    return partes[0]
+
+
+class MedicaoCache:
+    def __init__(self):
+        self.acertos = 0
+        self.falhas = 0
+
+
+class ContadoresCacheMixin:
+    """Conta acertos e falhas de ``get`` (e ``aget``, que o chama) por namespace, no processo atual."""
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, _AUSENTE, version)
+        acertou = valor is not _AUSENTE
+        namespace = namespace_chave(key)
+        with _trava_contadores:
+            (_acertos if acertou else _falhas)[namespace] += 1
+        for medicao in getattr(_medicoes_cache, "medicoes", ()):
+            if acertou:
+                medicao.acertos += 1
+            else:
+                medicao.falhas += 1
+        return valor if acertou else default
+
+
+class CacheMemoria(ContadoresCacheMixin, LocMemCache):
+    pass
+
+
+class CacheArquivo(ContadoresCacheMixin, FileBasedCache):
+    pass
+
+
+class CacheBanco(ContadoresCacheMixin, DatabaseCache):
+    pass
+
+
+def estatisticas_cache():
+    """Acertos, falhas e taxa de acerto por namespace desde o início do processo (cada worker tem os seus)."""
+    with _trava_contadores:
+        namespaces = sorted(set(_acertos) | set(_falhas))
+        estatisticas = {}
+        for namespace in namespaces:
+            total = _acertos[namespace] + _falhas[namespace]
+            estatisticas[namespace] = {
+                "acertos": _acertos[namespace],
+                "falhas": _falhas[namespace],
+                "taxa_acerto": round(_acertos[namespace] / total, 3),
+            }
+    return estatisticas
+
+
+def zerar_estatisticas_cache():
+    with _trava_contadores:
+        _acertos.clear()
+        _falhas.clear()
+
+
+@contextmanager
+def medir_cache():
+    """Conta os acertos e falhas de cache da thread atual enquanto o bloco roda."""
+    medicao = MedicaoCache()
+    if not hasattr(_medicoes_cache, "medicoes"):
+        _medicoes_cache.medicoes = []
+    _medicoes_cache.medicoes.append(medicao)
+    try:
+        yield medicao
+    finally:
+        _medicoes_cache.medicoes.remove(medicao)
+
+
+# =====================
+# NAMESPACES (TUTOR / VET / SLOT / AGENDA)
+# =====================
+
+
+# "agenda" são os horários livres de um veterinário (o JSON de obter_horarios_disponiveis_ajax); os demais são
+# o que os fragmentos de template exibem de um tutor, veterinário ou horário.
+ESCOPOS_CACHE = ("tutor", "veterinario", "horario", "agenda")
+
+
+def _chave_versao_escopo(escopo, id_):
+    return f"clinica:{escopo}:{id_}:versao"
+
+
+def versao_escopo(escopo, id_):
+    """Versão atual do namespace; tudo que foi guardado com uma versão anterior deixa de ser lido."""
+    chave = _chave_versao_escopo(escopo, id_)
+    versao = cache.get(chave)
+    if versao is None:
+        # Começa de um valor baseado no relógio para que uma versão despejada do cache nunca volte a apontar
+        # para payloads antigos.
+        cache.add(chave, time.time_ns(), None)
+        versao = cache.get(chave)
+    return versao
+
+
+async def aversao_escopo(escopo, id_):
+    """Versão assíncrona de versao_escopo."""
+    chave = _chave_versao_escopo(escopo, id_)
+    versao = await cache.aget(chave)
+    if versao is None:
+        await cache.aadd(chave, time.time_ns(), None)
+        versao = await cache.aget(chave)
+    return versao
+
+
+def _chave_escopo(escopo, id_, versao, partes):
+    return ":".join(["clinica", escopo, str(id_), f"v{versao}", *map(str, partes)])
+
+
+def chave_escopo(escopo, id_, *partes):
+    """Chave versionada dentro do namespace de um tutor, veterinário, horário ou agenda."""
+    return _chave_escopo(escopo, id_, versao_escopo(escopo, id_), partes)
+
+
+async def achave_escopo(escopo, id_, *partes):
+    """Versão assíncrona de chave_escopo."""
+    return _chave_escopo(escopo, id_, await aversao_escopo(escopo, id_), partes)
+
+
+def invalidar_escopos(**ids):
+    """Invalida, após o commit da transação atual, os namespaces informados (``tutor=7, horario=12``)."""
+
+    def _invalidar():
+        for escopo, id_ in ids.items():
+            if id_ is None:
+                continue
+            try:
+                cache.incr(_chave_versao_escopo(escopo, id_))
+            except ValueError:
+                pass
+
+    transaction.on_commit(_invalidar)
+
+
+def tempo_cache_fragmentos():
+    return getattr(settings, "CACHE_FRAGMENTOS_SEGUNDOS", 600)
+
+
+# Validade do JSON de horários livres, guardado em chave_escopo("agenda", veterinario_id, inicio, fim).
+TEMPO_CACHE_HORARIOS = 300
+
+
+# =====================
+# VET DASHBOARD CACHE
+# =====================
+
+
+def tempo_cache_painel_veterinario():
+    return getattr(settings, "CACHE_PAINEL_VETERINARIO_SEGUNDOS", 30)
+
+
+def chave_painel_veterinario(veterinario_id):
+    return f"clinica:painel:vet:{veterinario_id}"
+
+
+def invalidar_painel_veterinario(veterinario_id):
+    """Descarta, após o commit da transação atual, os contadores em cache do painel do veterinário."""
+    transaction.on_commit(lambda: cache.delete(chave_painel_veterinario(veterinario_id)))
@@ -0,0 +1,91 @@
+import hashlib
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+# =====================
+# CONDITIONAL GET
+# =====================
+
+
+_versao_arquivos = None
+
+
+def _versao_templates_e_estaticos():
+    """Maior mtime dos templates e estáticos do projeto: um deploy que mude o HTML invalida os ETags."""
+    global _versao_arquivos
+    if _versao_arquivos is None:
+        raizes = [os.path.join(os.path.dirname(__file__), "templates"), *map(str, settings.STATICFILES_DIRS)]
+        _versao_arquivos = max(
+            (
+                os.stat(os.path.join(pasta, arquivo)).st_mtime_ns
+                for raiz in raizes
+                for pasta, _, arquivos in os.walk(raiz)
+                for arquivo in arquivos
+            ),
+            default=0,
+        )
+    return _versao_arquivos
+
+
+def _segredo_csrf(request):
+    """Segredo CSRF que os formulários da página vão usar (gerado agora se o navegador ainda não tem o cookie)."""
+    get_token(request)
+    return request.META["CSRF_COOKIE"]
+
+
+def get_condicional(versoes):
+    """Decorator de views de detalhe que responde 304 a ``If-None-Match``.
+
+    ``versoes(request, *args, **kwargs)`` faz uma única consulta barata e retorna ``(atualizacoes, outros)``:
+    as colunas ``atualizado_em`` de tudo que a página mostra e os demais valores exibidos que não têm
+    versão própria. Retorna None quando o registro não existe ou não é acessível; nesse caso a view roda
+    normalmente e dá o 404 dela. O ETag também depende do usuário, do segredo CSRF (tokens dos formulários) e da
+    versão dos templates. Requisições com mensagens pendentes sempre renderizam, para exibi-las.
+    Use abaixo de ``login_required``.
+
+    Não há Last-Modified: as datas ``atualizado_em`` não mudam com o usuário, o token CSRF, os templates nem
+    os ``outros`` valores, e um ``If-Modified-Since`` devolveria 304 para uma página que mudou.
+    """
+
+    def _versao(request, *args, **kwargs):
+        if not hasattr(request, "_versao_condicional"):
+            request._versao_condicional = None
+            if request.method in ("GET", "HEAD") and not len(get_messages(request)):
+                request._versao_condicional = versoes(request, *args, **kwargs)
+        return request._versao_condicional
+
+    def etag(request, *args, **kwargs):
+        versao = _versao(request, *args, **kwargs)
+        if versao is None:
+            return None
+        semente = [
+            _versao_templates_e_estaticos(),
+            request.user.pk,
+            request.user.get_full_name(),
+            _segredo_csrf(request),
+            *versao[0],
+            *versao[1],
+        ]
+        return hashlib.md5(repr(semente).encode(), usedforsecurity=False).hexdigest()
+
+    def decorator(view):
+        view_condicional = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            resposta = view_condicional(request, *args, **kwargs)
+            if resposta.has_header("ETag"):
+                # Página por usuário: o navegador pode guardar, mas revalida a cada visita.
+                patch_cache_control(resposta, private=True, no_cache=True)
+            return resposta
+
+        return _view
+
+    return decorator
@@ -0,0 +1,86 @@
+import gzip
+import os
+from io import BytesIO
+
+import brotli
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from PIL import Image
+
+from .imagens import QUALIDADE_JPEG
+
+# =====================
+# STATIC FILES
+# =====================
+
+
+# Ganham variantes .gz e .br ao lado do arquivo; o nginx entrega a variante pronta (gzip_static e o mapa
+# $sufixo_brotli em compose/nginx/default.conf). Toda variante é gravada, mesmo se não ficar menor: o nginx
+# só confere se o arquivo existe.
+EXTENSOES_COMPRIMIDAS = (".css", ".js", ".svg", ".json", ".map", ".txt")
+# Recodificadas sem perda visível e sem metadados; o resultado só é mantido se ficar menor.
+FORMATOS_IMAGENS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG"}
+
+
+def comprimir(caminho):
+    """Grava ``caminho``.gz e ``caminho``.br com a mesma data de modificação do original."""
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    variantes = {
+        ".gz": gzip.compress(dados, compresslevel=9, mtime=0),
+        ".br": brotli.compress(dados, quality=11),
+    }
+    estado = os.stat(caminho)
+    for extensao, comprimido in variantes.items():
+        with open(caminho + extensao, "wb") as arquivo:
+            arquivo.write(comprimido)
+        os.utime(caminho + extensao, ns=(estado.st_atime_ns, estado.st_mtime_ns))
+
+
+def otimizar_imagem(caminho, formato):
+    """Recodifica a imagem com ``optimize`` (e JPEG progressivo). Retorna os bytes economizados."""
+    with open(caminho, "rb") as arquivo:
+        original = arquivo.read()
+    saida = BytesIO()
+    with Image.open(BytesIO(original)) as imagem:
+        if formato == "JPEG":
+            imagem.save(saida, formato, quality=QUALIDADE_JPEG, optimize=True, progressive=True)
+        else:
+            imagem.save(saida, formato, optimize=True)
+    otimizada = saida.getvalue()
+    if len(otimizada) >= len(original):
+        return 0
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(otimizada)
+    return len(original) - len(otimizada)
+
+
+class ArmazenamentoEstaticos(ManifestStaticFilesStorage):
+    """Estáticos com o hash do conteúdo no nome, imagens otimizadas e variantes .gz/.br pré-comprimidas.
+
+    Tudo acontece no ``collectstatic``, rodado no build das imagens (compose/django/Dockerfile e
+    compose/nginx/Dockerfile); como o nome muda junto com o conteúdo, o nginx pode mandar cache de um ano.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Sem manifesto (testes e runserver antes do collectstatic) ou arquivo inexistente em static/: o
+            # nome original, como o StaticFilesStorage faria, em vez de derrubar a página com erro 500.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        gerados = set(paths)
+        for original, processado, alterado in super().post_process(paths, dry_run, **options):
+            if processado and not isinstance(alterado, Exception):
+                gerados.add(processado)
+            yield original, processado, alterado
+        if dry_run:
+            return
+        for nome in sorted(gerados):
+            caminho = self.path(nome)
+            extensao = os.path.splitext(nome)[1].lower()
+            if extensao in FORMATOS_IMAGENS:
+                otimizar_imagem(caminho, FORMATOS_IMAGENS[extensao])
+            elif extensao in EXTENSOES_COMPRIMIDAS:
+                comprimir(caminho)
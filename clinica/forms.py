@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+
 from django import forms
 from django.core.validators import RegexValidator, FileExtensionValidator
 from django.db import transaction
@@ -11,6 +13,7 @@ from .models import (
     Prontuario,
     HorarioDisponivel,
 )
+from .agenda import DIAS_SEMANA_CHOICES
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import get_user_model
 
@@ -76,6 +79,62 @@ class HorarioDisponivelForm(forms.ModelForm):
         self.fields["veterinario"].queryset = CustomUser.objects.filter(user_type="veterinario")
 
 
+class HorarioRecorrenteForm(forms.Form):
+    veterinario = forms.ModelChoiceField(queryset=CustomUser.objects.none(), label="Veterinário")
+    data_inicio = forms.DateField(label="Data de Início", widget=forms.DateInput(attrs={"type": "date"}))
+    data_fim = forms.DateField(label="Data Final", widget=forms.DateInput(attrs={"type": "date"}))
+    dias_semana = forms.TypedMultipleChoiceField(
+        choices=DIAS_SEMANA_CHOICES,
+        coerce=int,
+        label="Dias da Semana",
+        widget=forms.CheckboxSelectMultiple,
+    )
+    hora_inicio = forms.TimeField(label="Hora de Início", widget=forms.TimeInput(attrs={"type": "time"}))
+    hora_fim = forms.TimeField(label="Hora Final", widget=forms.TimeInput(attrs={"type": "time"}))
+    duracao = forms.IntegerField(label="Duração do Horário (minutos)", min_value=5, max_value=480, initial=30)
+    feriados = forms.CharField(
+        required=False,
+        label="Feriados",
+        help_text="Datas a ignorar no formato DD/MM/AAAA, separadas por vírgula ou linha.",
+        widget=forms.Textarea(attrs={"rows": 3}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["veterinario"].queryset = CustomUser.objects.filter(user_type="veterinario")
+
+    def clean_duracao(self):
+        return timedelta(minutes=self.cleaned_data["duracao"])
+
+    def clean_feriados(self):
+        texto = self.cleaned_data.get("feriados") or ""
+        feriados = []
+        for valor in texto.replace(",", "\n").split():
+            try:
+                feriados.append(datetime.strptime(valor, "%d/%m/%Y").date())
+            except ValueError:
+                raise forms.ValidationError(f"Data inválida: {valor}. Use o formato DD/MM/AAAA.")
+        return feriados
+
+    def clean(self):
+        cleaned_data = super().clean()
+        data_inicio = cleaned_data.get("data_inicio")
+        data_fim = cleaned_data.get("data_fim")
+        hora_inicio = cleaned_data.get("hora_inicio")
+        hora_fim = cleaned_data.get("hora_fim")
+
+        if data_inicio and data_fim:
+            if data_fim < data_inicio:
+                self.add_error("data_fim", "A data final deve ser igual ou posterior à data de início.")
+            elif (data_fim - data_inicio).days > 366:
+                self.add_error("data_fim", "O período da agenda não pode ultrapassar um ano.")
+
+        if hora_inicio and hora_fim and hora_fim <= hora_inicio:
+            self.add_error("hora_fim", "A hora final deve ser posterior à hora de início.")
+
+        return cleaned_data
+
+
 # =====================
 # VETS FORMS
 # =====================
@@ -260,7 +319,7 @@ class AgendamentoClienteForm(forms.Form):
         horario = cleaned_data.get("horario_agendado")
         veterinario = cleaned_data.get("veterinario")
 
-        if horario and veterinario and horario.veterinario != veterinario:
+        if horario and veterinario and horario.veterinario_id != veterinario.pk:
             self.add_error(
                 "horario_agendado",
                 "O horário selecionado não pertence ao veterinário escolhido.",
@@ -272,27 +331,18 @@ class AgendamentoClienteForm(forms.Form):
         return cleaned_data
 
     def save(self, user):
-        """Salva a consulta e marca o HorarioDisponivel como indisponível."""
-
-        pet_instance = self.cleaned_data.get("pet")
-        veterinario_instance = self.cleaned_data.get("veterinario")
-        horario_instance = self.cleaned_data.get("horario_agendado")
-        motivo = self.cleaned_data.get("motivo")
+        """Salva a consulta reservando o HorarioDisponivel de forma atômica.
 
-        with transaction.atomic():
-
-            consulta = Consulta.objects.create(
-                pet=pet_instance,
-                veterinario=veterinario_instance,
-                horario_agendado=horario_instance,
-                motivo=motivo,
-                status="MARCADA",
-            )
-
-            horario_instance.disponivel = False
-            horario_instance.save()
+        Levanta HorarioIndisponivelError se outro agendamento reservou o horário antes.
+        """
 
-            return consulta
+        return Consulta.objects.create(
+            pet=self.cleaned_data.get("pet"),
+            veterinario=self.cleaned_data.get("veterinario"),
+            horario_agendado=self.cleaned_data.get("horario_agendado"),
+            motivo=self.cleaned_data.get("motivo"),
+            status="MARCADA",
+        )
 
 
 class ConsultaForm(forms.ModelForm):
@@ -315,7 +365,7 @@ class ConsultaForm(forms.ModelForm):
         veterinario = cleaned_data.get("veterinario")
         horario = cleaned_data.get("horario_agendado")
 
-        if veterinario and horario and veterinario != horario.veterinario:
+        if veterinario and horario and veterinario.pk != horario.veterinario_id:
             raise forms.ValidationError(
                 "O veterinário selecionado deve corresponder ao veterinário do horário disponível."
             )
@@ -383,6 +433,12 @@ class HorarioFiltroForm(forms.Form):
     apenas_disponiveis = forms.BooleanField(required=False, label="Apenas Disponíveis")
 
 
+class JanelaHorariosForm(forms.Form):
+    veterinario_id = forms.IntegerField(min_value=1)
+    inicio = forms.DateField(required=False)
+    fim = forms.DateField(required=False)
+
+
 class ConsultaFiltroForm(forms.Form):
 
     STATUS_CHOICES_FILTRO = [("TODOS", "Todos os Status")] + list(Consulta.STATUS_CHOICES)
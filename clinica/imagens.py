@@ -0,0 +1,144 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidar_escopos
+
+logger = logging.getLogger(__name__)
+
+
+# =====================
+# IMAGE VARIANTS
+# =====================
+
+
+# Larguras (px) das miniaturas geradas para cada campo de imagem, em JPEG e em WebP.
+LARGURAS_VARIANTES = {
+    "foto_pet": (120, 240, 480),
+    "foto_user": (80, 160, 320),
+}
+LADO_MAXIMO_ORIGINAL = 2048
+QUALIDADE_JPEG = 85
+QUALIDADE_WEBP = 80
+FORMATOS_VARIANTES = (("jpg", "JPEG", QUALIDADE_JPEG), ("webp", "WEBP", QUALIDADE_WEBP))
+
+_executor = None
+
+
+def _abrir_rgb(arquivo):
+    """Abre a imagem já na orientação do EXIF e em RGB (transparência vira fundo branco)."""
+    with Image.open(arquivo) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.mode in ("RGBA", "LA") or (imagem.mode == "P" and "transparency" in imagem.info):
+            imagem = imagem.convert("RGBA")
+            fundo = Image.new("RGB", imagem.size, "white")
+            fundo.paste(imagem, mask=imagem.getchannel("A"))
+            return fundo
+        return imagem.convert("RGB")
+
+
+def _codificar(imagem, formato, qualidade):
+    saida = BytesIO()
+    # Sem o parâmetro exif, o Pillow não grava metadados (GPS, modelo da câmera etc.).
+    imagem.save(saida, formato, quality=qualidade, optimize=True)
+    return saida.getvalue()
+
+
+def normalizar_upload(arquivo):
+    """Retorna o upload como JPEG já rotacionado, sem metadados e com no máximo LADO_MAXIMO_ORIGINAL px."""
+    arquivo.seek(0)
+    imagem = _abrir_rgb(arquivo)
+    imagem.thumbnail((LADO_MAXIMO_ORIGINAL, LADO_MAXIMO_ORIGINAL))
+    nome = posixpath.splitext(posixpath.basename(arquivo.name))[0]
+    return ContentFile(_codificar(imagem, "JPEG", QUALIDADE_JPEG), name=f"{nome}.jpg")
+
+
+def preparar_upload(instancia, campo):
+    """Normaliza o arquivo recém-enviado em ``instancia.<campo>``. Retorna True se havia um upload novo."""
+    arquivo = getattr(instancia, campo)
+    if not arquivo or arquivo._committed:
+        return False
+    setattr(instancia, campo, normalizar_upload(arquivo))
+    return True
+
+
+def nome_variante(nome, largura, extensao):
+    diretorio, arquivo = posixpath.split(nome)
+    return posixpath.join(diretorio, "variantes", f"{posixpath.splitext(arquivo)[0]}_{largura}.{extensao}")
+
+
+def gerar_variantes(storage, nome, larguras, substituir=False):
+    """Gera as miniaturas JPEG e WebP de ``nome``.
+
+    Variantes já existentes são mantidas, a não ser com ``substituir`` (upload novo que reaproveitou o nome
+    de um arquivo removido).
+    """
+    pendentes = []
+    for largura in larguras:
+        for extensao, formato, qualidade in FORMATOS_VARIANTES:
+            variante = nome_variante(nome, largura, extensao)
+            if storage.exists(variante):
+                if not substituir:
+                    continue
+                storage.delete(variante)
+            pendentes.append((variante, largura, formato, qualidade))
+    if not pendentes:
+        return 0
+
+    with storage.open(nome, "rb") as arquivo:
+        original = _abrir_rgb(arquivo)
+    for variante, largura, formato, qualidade in pendentes:
+        imagem = original.copy()
+        imagem.thumbnail((largura, largura * 4))
+        storage.save(variante, ContentFile(_codificar(imagem, formato, qualidade)))
+    return len(pendentes)
+
+
+def _gerar_variantes_em_segundo_plano(storage, nome, larguras, escopos):
+    try:
+        gerar_variantes(storage, nome, larguras, substituir=True)
+    except Exception:
+        logger.exception("Falha ao gerar as variantes de %s", nome)
+        return
+    # Fragmentos renderizados antes disso guardaram o <img> simples; a nova versão os descarta.
+    invalidar_escopos(**escopos)
+
+
+def agendar_variantes(arquivo, **escopos):
+    """Agenda, para depois do commit, a geração das variantes do arquivo salvo num campo de imagem.
+
+    Roda num pool de threads fora do ciclo da requisição; variantes perdidas (por exemplo, num restart do
+    worker) são refeitas pelo comando ``gerar_variantes_imagens``. ``escopos`` são os namespaces de cache
+    (``tutor=7``) invalidados quando as variantes ficam prontas.
+    """
+    if not arquivo:
+        return
+    storage, nome, larguras = arquivo.storage, arquivo.name, LARGURAS_VARIANTES[arquivo.field.name]
+
+    def _agendar():
+        global _executor
+        if not getattr(settings, "IMAGENS_VARIANTES_EM_SEGUNDO_PLANO", True):
+            _gerar_variantes_em_segundo_plano(storage, nome, larguras, escopos)
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMAGENS_VARIANTES_THREADS", 2), thread_name_prefix="variantes"
+            )
+        _executor.submit(_gerar_variantes_em_segundo_plano, storage, nome, larguras, escopos)
+
+    transaction.on_commit(_agendar)
+
+
+def variantes_disponiveis(arquivo):
+    """Larguras cujas variantes JPEG e WebP já existem para o arquivo (vazio enquanto não forem geradas)."""
+    larguras = LARGURAS_VARIANTES.get(arquivo.field.name, ())
+    # Basta conferir a maior: as variantes são gravadas da menor para a maior.
+    if not larguras or not arquivo.storage.exists(nome_variante(arquivo.name, larguras[-1], "webp")):
+        return ()
+    return larguras
@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+logger = logging.getLogger("clinica.inicializacao")
+
+
+# =====================
+# STARTUP WARMUP
+# =====================
+
+
+def _nomes_templates():
+    # Só os templates do projeto; os do admin e do DRF ficam para quando forem usados.
+    for raiz in [*settings.TEMPLATES[0]["DIRS"], os.path.join(os.path.dirname(__file__), "templates")]:
+        for pasta, _, arquivos in os.walk(raiz):
+            for arquivo in arquivos:
+                if arquivo.endswith(".html"):
+                    yield os.path.relpath(os.path.join(pasta, arquivo), raiz).replace(os.sep, "/")
+
+
+def _primeira_requisicao(application, caminho):
+    """Passa uma requisição GET anônima por toda a pilha WSGI (middlewares, view, template). Retorna o status."""
+    ambiente = {"PATH_INFO": caminho, "wsgi.input": BytesIO()}
+    setup_testing_defaults(ambiente)
+    status = []
+    resposta = application(ambiente, lambda codigo, cabecalhos, exc_info=None: status.append(codigo))
+    try:
+        for _ in resposta:
+            pass
+    finally:
+        if hasattr(resposta, "close"):
+            resposta.close()
+    return int(status[0].split()[0])
+
+
+def _fechar_conexoes():
+    # Com preload_app o aquecimento roda no master do gunicorn: uma conexão aberta aqui seria herdada (e
+    # compartilhada) por todos os workers depois do fork.
+    for conexao in connections.all(initialized_only=True):
+        if conexao.connection is not None and not conexao.in_atomic_block:
+            conexao.close()
+
+
+def aquecer(inicio, application=None):
+    """Importa as URLs e views, compila todos os templates e atende uma requisição antes do primeiro cliente.
+
+    ``inicio`` é o ``time.perf_counter()`` de antes do ``django.setup()``. Registra (logger
+    clinica.inicializacao) e retorna os milissegundos de cada etapa.
+    """
+    tempos = {"django_setup": time.perf_counter() - inicio}
+
+    etapa = time.perf_counter()
+    get_resolver().reverse_dict  # importa urls.py e as views e monta a tabela do reverse()
+    tempos["urls"] = time.perf_counter() - etapa
+
+    etapa = time.perf_counter()
+    motor = engines["django"]
+    templates = 0
+    for nome in _nomes_templates():
+        motor.get_template(nome)
+        templates += 1
+    tempos["templates"] = time.perf_counter() - etapa
+
+    etapa = time.perf_counter()
+    status = _primeira_requisicao(application or WSGIHandler(), settings.AQUECIMENTO_CAMINHO)
+    _fechar_conexoes()
+    tempos["primeira_requisicao"] = time.perf_counter() - etapa
+
+    tempos["total"] = time.perf_counter() - inicio
+    registro = {etapa: round(segundos * 1000, 1) for etapa, segundos in tempos.items()}
+    logger.info(json.dumps({"pid": os.getpid(), "templates": templates, "status": status, "ms": registro}))
+    return registro
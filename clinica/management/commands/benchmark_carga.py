@@ -0,0 +1,133 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from .benchmark_views import _percentil
+
+
+def _alvo(valor):
+    nome, separador, url = valor.partition("=")
+    if not separador or not urlsplit(url).hostname:
+        raise ValueError(valor)
+    return nome, url
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga HTTP contra servidores já no ar: dispara GETs com N conexões keep-alive simultâneas "
+        "durante um tempo fixo e reporta requisições/s, latências p50/p95/p99 e erros de cada alvo. Use para "
+        "comparar o caminho síncrono (gunicorn, ./start) com o ASGI (./start-asgi) na mesma URL, por exemplo "
+        "--alvo wsgi=http://django:5000/ajax/obter_horarios_disponiveis_ajax/?veterinario_id=1 "
+        "--alvo asgi=http://django_async:5001/ajax/obter_horarios_disponiveis_ajax/?veterinario_id=1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alvo", type=_alvo, action="append", dest="alvos", required=True, help="nome=URL")
+        parser.add_argument("--concorrencia", type=int, default=200)
+        parser.add_argument("--duracao", type=float, default=20, help="Segundos de medição por alvo.")
+        parser.add_argument("--aquecimento", type=float, default=2, help="Segundos descartados antes de medir.")
+        parser.add_argument("--cookie", default="", help="Cabeçalho Cookie (por exemplo sessionid=...).")
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument("--saida", default="bench_carga.json", help="Arquivo JSON com os resultados.")
+
+    def handle(self, *args, **options):
+        resultados = {}
+        for nome, url in options["alvos"]:
+            self.stdout.write(f"{nome}: {options['concorrencia']} conexões por {options['duracao']:.0f}s em {url}")
+            resultados[nome] = self.medir(url, options)
+
+        self.relatar(resultados)
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "concorrencia": options["concorrencia"],
+            "duracao_s": options["duracao"],
+            "alvos": resultados,
+        }
+        Path(options["saida"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+        if any(resultado["requisicoes"] == 0 for resultado in resultados.values()):
+            raise CommandError("Algum alvo não respondeu a nenhuma requisição.")
+
+    def medir(self, url, options):
+        partes = urlsplit(url)
+        classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        caminho = partes.path or "/"
+        if partes.query:
+            caminho += f"?{partes.query}"
+        cabecalhos = {"Cookie": options["cookie"]} if options["cookie"] else {}
+
+        inicio_medicao = time.perf_counter() + options["aquecimento"]
+        fim = inicio_medicao + options["duracao"]
+        trava = threading.Lock()
+        latencias, status, erros = [], {}, []
+
+        def trabalhador():
+            conexao = classe(partes.hostname, partes.port, timeout=options["timeout"])
+            locais, status_locais, erros_locais = [], {}, 0
+            while (agora := time.perf_counter()) < fim:
+                try:
+                    conexao.request("GET", caminho, headers=cabecalhos)
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                    codigo = resposta.status
+                except (OSError, http.client.HTTPException):
+                    conexao.close()
+                    codigo = None
+                decorrido = time.perf_counter() - agora
+                if agora < inicio_medicao:
+                    continue
+                if codigo is None:
+                    erros_locais += 1
+                    continue
+                locais.append(decorrido)
+                status_locais[codigo] = status_locais.get(codigo, 0) + 1
+            conexao.close()
+            with trava:
+                latencias.extend(locais)
+                erros.append(erros_locais)
+                for codigo, total in status_locais.items():
+                    status[codigo] = status.get(codigo, 0) + total
+
+        with ThreadPoolExecutor(max_workers=options["concorrencia"]) as executor:
+            for _ in range(options["concorrencia"]):
+                executor.submit(trabalhador)
+
+        if not latencias:
+            return {"url": url, "requisicoes": 0, "erros": sum(erros), "status": {}}
+        return {
+            "url": url,
+            "requisicoes": len(latencias),
+            "req_s": round(len(latencias) / options["duracao"], 1),
+            "erros": sum(erros),
+            "status": {str(codigo): total for codigo, total in sorted(status.items())},
+            "media_ms": round(statistics.mean(latencias) * 1000, 3),
+            "p50_ms": round(_percentil(latencias, 50) * 1000, 3),
+            "p95_ms": round(_percentil(latencias, 95) * 1000, 3),
+            "p99_ms": round(_percentil(latencias, 99) * 1000, 3),
+            "max_ms": round(max(latencias) * 1000, 3),
+        }
+
+    def relatar(self, resultados):
+        colunas = ["req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "erros", "status"]
+        self.stdout.write(f"{'alvo':16} " + " ".join(f"{coluna:>9}" for coluna in colunas))
+        for nome, resultado in resultados.items():
+            if not resultado["requisicoes"]:
+                self.stdout.write(self.style.ERROR(f"{nome:16} sem respostas ({resultado['erros']} erros)"))
+                continue
+            linha = (
+                f"{nome:16} {resultado['req_s']:>9.1f} {resultado['p50_ms']:>9.2f} {resultado['p95_ms']:>9.2f} "
+                f"{resultado['p99_ms']:>9.2f} {resultado['max_ms']:>9.2f} {resultado['erros']:>9} "
+                f"{','.join(f'{codigo}:{total}' for codigo, total in resultado['status'].items()):>9}"
+            )
+            if resultado["erros"] or any(not codigo.startswith("2") for codigo in resultado["status"]):
+                self.stdout.write(self.style.WARNING(linha))
+            else:
+                self.stdout.write(linha)
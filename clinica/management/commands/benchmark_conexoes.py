@@ -0,0 +1,138 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.utils import timezone
+
+from clinica.models import Pet
+
+from .benchmark_views import _percentil
+
+# modo -> ajustes sobre DATABASES["default"]
+MODOS_CONEXAO = {
+    "por_requisicao": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+    "persistente": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True},
+    "pool": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": {"pool": {}}},
+}
+
+# Consultas típicas de uma página autenticada: o usuário da sessão e uma listagem curta.
+SQL_REQUISICAO = [
+    "SELECT id, nome, sobrenome, user_type FROM clinica_customuser WHERE id = %s",
+    "SELECT id, nome, especie FROM clinica_pet WHERE tutor_id = %s ORDER BY nome, id LIMIT 5",
+]
+
+
+def _sessoes_abertas():
+    """Total de conexões já abertas no banco, segundo o próprio Postgres (pg_stat_database.sessions)."""
+    time.sleep(1.2)  # as estatísticas dos backends são publicadas no máximo a cada segundo
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute("SELECT sessions FROM pg_stat_database WHERE datname = current_database()")
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de conexão por requisição com o PostgreSQL em cada modo de settings.DATABASES: uma conexão "
+        "por requisição (CONN_MAX_AGE=0), conexões persistentes com health check e o pool do psycopg 3. Cada "
+        "requisição simulada repete o ciclo do Django (close_if_unusable_or_obsolete no início e no fim) em "
+        "volta de duas consultas curtas. Reporta latência, requisições/s e conexões abertas por requisição."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modo", action="append", dest="modos", choices=list(MODOS_CONEXAO))
+        parser.add_argument("--requisicoes", type=int, default=500, help="Requisições por modo.")
+        parser.add_argument("--threads", type=int, default=1, help="Threads simultâneas (threads do worker).")
+        parser.add_argument("--saida", default="bench_conexoes.json", help="Arquivo JSON com os resultados.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Este benchmark mede conexões com o PostgreSQL.")
+        pet = Pet.objects.values("tutor_id").first()
+        if pet is None:
+            raise CommandError("Base vazia: rode gerar_dados_sinteticos antes.")
+
+        resultados = {}
+        for modo in options["modos"] or list(MODOS_CONEXAO):
+            resultados[modo] = self.medir(modo, pet["tutor_id"], options)
+
+        self.relatar(resultados)
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "host": settings.DATABASES["default"].get("HOST") or "localhost",
+            "threads": options["threads"],
+            "requisicoes": options["requisicoes"],
+            "modos": resultados,
+        }
+        Path(options["saida"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    def medir(self, modo, tutor_id, options):
+        alias = f"benchmark_{modo}"
+        configuracao = {**connections["default"].settings_dict, **MODOS_CONEXAO[modo]}
+        if modo == "pool":
+            configuracao["OPTIONS"] = {
+                **connections["default"].settings_dict.get("OPTIONS", {}),
+                "pool": {"min_size": 1, "max_size": options["threads"], "timeout": 10},
+            }
+        # Conexões avulsas, fora de connections: o benchmark não altera a configuração do processo.
+        backend = load_backend(configuracao["ENGINE"])
+
+        por_thread = [options["requisicoes"] // options["threads"]] * options["threads"]
+        por_thread[0] += options["requisicoes"] % options["threads"]
+        trava = threading.Lock()
+        latencias = []
+
+        def trabalhador(requisicoes):
+            conexao = backend.DatabaseWrapper(configuracao, alias)
+            locais = []
+            try:
+                for _ in range(requisicoes):
+                    inicio = time.perf_counter()
+                    conexao.close_if_unusable_or_obsolete()  # request_started
+                    with conexao.cursor() as cursor:
+                        for sql in SQL_REQUISICAO:
+                            cursor.execute(sql, [tutor_id])
+                            cursor.fetchall()
+                    conexao.close_if_unusable_or_obsolete()  # request_finished
+                    locais.append(time.perf_counter() - inicio)
+            finally:
+                conexao.close()
+            with trava:
+                latencias.extend(locais)
+
+        sessoes_antes = _sessoes_abertas()
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            list(executor.map(trabalhador, por_thread))
+        duracao = time.perf_counter() - inicio
+        sessoes_depois = _sessoes_abertas()
+
+        if modo == "pool":
+            backend.DatabaseWrapper(configuracao, alias).close_pool()
+
+        return {
+            "ajustes": MODOS_CONEXAO[modo],
+            "req_s": round(len(latencias) / duracao, 1),
+            "media_ms": round(statistics.mean(latencias) * 1000, 3),
+            "p50_ms": round(_percentil(latencias, 50) * 1000, 3),
+            "p95_ms": round(_percentil(latencias, 95) * 1000, 3),
+            "conexoes_abertas": sessoes_depois - sessoes_antes,
+            "conexoes_por_requisicao": round((sessoes_depois - sessoes_antes) / len(latencias), 3),
+        }
+
+    def relatar(self, resultados):
+        colunas = ["req/s", "média ms", "p50 ms", "p95 ms", "conexões", "con/req"]
+        self.stdout.write(f"{'modo':16} " + " ".join(f"{coluna:>9}" for coluna in colunas))
+        for modo, resultado in resultados.items():
+            self.stdout.write(
+                f"{modo:16} {resultado['req_s']:>9.1f} {resultado['media_ms']:>9.3f} {resultado['p50_ms']:>9.3f} "
+                f"{resultado['p95_ms']:>9.3f} {resultado['conexoes_abertas']:>9} "
+                f"{resultado['conexoes_por_requisicao']:>9.3f}"
+            )
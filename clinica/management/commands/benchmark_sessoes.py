@@ -0,0 +1,119 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clinica.models import CustomUser
+from clinica.perf import medir_sql
+
+from .benchmark_views import _percentil
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os modos de sessão (settings.MODOS_SESSAO) sob tráfego autenticado concorrente: cada thread é "
+        "um cliente logado que repete GETs numa página com login_required. Reporta requisições/s, latência "
+        "p50/p95, consultas SQL por requisição (total e em django_session) e o tamanho do cookie de sessão. "
+        "Rode sobre uma base gerada por gerar_dados_sinteticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modo", action="append", dest="modos", choices=sorted(settings.MODOS_SESSAO))
+        parser.add_argument("--rota", default="home_user", help="Nome de uma rota sem argumentos para clientes.")
+        parser.add_argument("--concorrencia", type=int, default=8, help="Clientes logados simultâneos.")
+        parser.add_argument("--requisicoes", type=int, default=50, help="GETs por cliente.")
+        parser.add_argument("--saida", default="bench_sessoes.json", help="Arquivo JSON com os resultados.")
+
+    def handle(self, *args, **options):
+        usuarios = list(CustomUser.objects.filter(user_type="cliente", is_active=True)[: options["concorrencia"]])
+        if len(usuarios) < options["concorrencia"]:
+            raise CommandError(f"A base tem só {len(usuarios)} cliente(s) ativos; reduza --concorrencia.")
+        url = reverse(options["rota"])
+
+        resultados = {}
+        for modo in options["modos"] or list(settings.MODOS_SESSAO):
+            with override_settings(SESSION_ENGINE=settings.MODOS_SESSAO[modo]):
+                resultados[modo] = self.medir(usuarios, url, options["requisicoes"])
+
+        self.relatar(resultados)
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "banco": settings.DATABASES["default"]["ENGINE"],
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "url": url,
+            "concorrencia": options["concorrencia"],
+            "requisicoes_por_cliente": options["requisicoes"],
+            "modos": resultados,
+        }
+        Path(options["saida"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    def medir(self, usuarios, url, requisicoes):
+        clientes = []
+        for usuario in usuarios:
+            cliente = Client(raise_request_exception=False)
+            cliente.force_login(usuario)
+            cliente.get(url)  # aquecimento: carrega o cache de sessões e de fragmentos
+            clientes.append(cliente)
+
+        trava = threading.Lock()
+        latencias, consultas, consultas_sessao, status = [], [], [], set()
+
+        def trabalhador(cliente):
+            locais, sql_locais, sessao_locais, status_locais = [], [], [], set()
+            try:
+                for _ in range(requisicoes):
+                    with medir_sql() as sql:
+                        inicio = time.perf_counter()
+                        resposta = cliente.get(url)
+                        locais.append(time.perf_counter() - inicio)
+                    status_locais.add(resposta.status_code)
+                    sql_locais.append(sql.total)
+                    sessao_locais.append(sum("django_session" in texto for texto, _, _ in sql.consultas))
+            finally:
+                connections.close_all()
+            with trava:
+                latencias.extend(locais)
+                consultas.extend(sql_locais)
+                consultas_sessao.extend(sessao_locais)
+                status.update(status_locais)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(clientes)) as executor:
+            list(executor.map(trabalhador, clientes))
+        duracao = time.perf_counter() - inicio
+
+        cookie = clientes[0].cookies.get(settings.SESSION_COOKIE_NAME)
+        return {
+            "engine": settings.SESSION_ENGINE,
+            "requisicoes": len(latencias),
+            "req_s": round(len(latencias) / duracao, 1),
+            "status": sorted(status),
+            "p50_ms": round(_percentil(latencias, 50) * 1000, 3),
+            "p95_ms": round(_percentil(latencias, 95) * 1000, 3),
+            "consultas_por_requisicao": round(statistics.mean(consultas), 2),
+            "consultas_sessao_por_requisicao": round(statistics.mean(consultas_sessao), 2),
+            "cookie_bytes": len(cookie.value) if cookie else 0,
+        }
+
+    def relatar(self, resultados):
+        colunas = ["req/s", "p50 ms", "p95 ms", "sql/req", "sessão/req", "cookie B"]
+        self.stdout.write(f"{'modo':10} " + " ".join(f"{coluna:>10}" for coluna in colunas))
+        for modo, resultado in resultados.items():
+            linha = (
+                f"{modo:10} {resultado['req_s']:>10.1f} {resultado['p50_ms']:>10.2f} {resultado['p95_ms']:>10.2f} "
+                f"{resultado['consultas_por_requisicao']:>10.2f} {resultado['consultas_sessao_por_requisicao']:>10.2f} "
+                f"{resultado['cookie_bytes']:>10}"
+            )
+            if resultado["status"] != [200]:
+                self.stdout.write(self.style.WARNING(f"{linha}  status {resultado['status']}"))
+            else:
+                self.stdout.write(linha)
@@ -0,0 +1,296 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from clinica.models import Consulta, CustomUser, HorarioDisponivel, Pet, Prontuario
+from clinica.perf import medir_sql, medir_templates
+
+BASELINE_PADRAO = Path(settings.BASE_DIR) / "benchmarks" / "baseline_views.json"
+
+# Rotas que não fazem sentido num GET de benchmark.
+ROTAS_IGNORADAS = {"logout", "v1:token", "estatisticas_cache"}
+
+# Namespaces incluídos na medição (os demais, como o admin, ficam de fora).
+NAMESPACES_MEDIDOS = {"v1"}
+
+# nome da rota -> (tipo de usuário logado, máximo de consultas SQL por requisição)
+# As páginas com get_condicional gastam uma consulta a mais (a de versão) quando renderizam; o benchmark não
+# envia If-None-Match, então mede sempre esse caminho. A revalidação (304) custa sessão + usuário + versão.
+ORCAMENTOS = {
+    "home": (None, 0),
+    "cadastro": (None, 0),
+    "login": (None, 0),
+    "reset_password": (None, 0),
+    "password_reset_done": (None, 0),
+    "password_reset_confirm": (None, 1),
+    "password_reset_complete": (None, 0),
+    "redirect_home": ("cliente", 2),
+    "home_user": ("cliente", 3),
+    "meus_pets": ("cliente", 4),
+    "cadastrar_pet": ("cliente", 3),
+    "excluir_pet": ("cliente", 3),
+    "detalhes_pet": ("cliente", 5),
+    "editar_pet": ("cliente", 4),
+    "consultas_user": ("cliente", 4),
+    "cadastrar_consulta": ("cliente", 5),
+    "obter_horarios_disponiveis_ajax": ("cliente", 1),
+    "detalhes_consulta": ("cliente", 6),
+    "perfil_user": ("cliente", 3),
+    "prontuario_user": ("cliente", 6),
+    "baixar_receita": ("cliente", 3),
+    "home_vet": ("veterinario", 4),
+    "contadores_painel_vet": ("veterinario", 3),
+    "lista_consultas_vet": ("veterinario", 4),
+    "buscar_prontuarios_vet": ("veterinario", 3),
+    "detalhe_consulta_vet": ("veterinario", 7),
+    "cadastrar_prontuario_vet": ("veterinario", 6),
+    "home_atendente": ("atendente", 4),
+    "criar_horario": ("atendente", 3),
+    "criar_horarios_recorrentes": ("atendente", 3),
+    "editar_horario": ("atendente", 4),
+    "excluir_horario": ("atendente", 4),
+    # API JSON: mesmo conteúdo das páginas HTML equivalentes, para comparar.
+    "v1:veterinarios": ("cliente", 3),
+    "v1:horarios": ("cliente", 3),
+    "v1:pets": ("cliente", 3),
+    "v1:consultas": ("cliente", 3),
+}
+
+
+def _percentil(valores, percentil):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, round(percentil / 100 * (len(ordenados) - 1)))
+    return ordenados[indice]
+
+
+def _nomes_rotas(resolver=None, prefixo=""):
+    resolver = resolver or get_resolver()
+    for padrao in resolver.url_patterns:
+        if isinstance(padrao, URLPattern):
+            if padrao.name:
+                yield f"{prefixo}{padrao.name}"
+        elif getattr(padrao, "namespace", None) is None:
+            yield from _nomes_rotas(padrao, prefixo)
+        elif padrao.namespace in NAMESPACES_MEDIDOS:
+            yield from _nomes_rotas(padrao, f"{prefixo}{padrao.namespace}:")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede cada rota de SerraVet/urls.py com o test client (consultas SQL, tempo de SQL, tempo de "
+        "renderização e latência p50/p95), compara com a baseline e falha se alguma view estourar seu "
+        "orçamento de consultas. Rode sobre uma base gerada por gerar_dados_sinteticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=20)
+        parser.add_argument("--aquecimento", type=int, default=2)
+        parser.add_argument("--saida", default="bench_views.json", help="Arquivo JSON com os resultados.")
+        parser.add_argument("--baseline", default=str(BASELINE_PADRAO))
+        parser.add_argument("--atualizar-baseline", action="store_true", help="Grava os resultados como baseline.")
+        parser.add_argument("--rota", action="append", dest="rotas", help="Mede apenas as rotas informadas.")
+
+    def handle(self, *args, **options):
+        rotas = [nome for nome in dict.fromkeys(_nomes_rotas()) if nome not in ROTAS_IGNORADAS]
+        sem_orcamento = [nome for nome in rotas if nome not in ORCAMENTOS]
+        if sem_orcamento:
+            raise CommandError(f"Rotas sem orçamento de consultas definido: {', '.join(sem_orcamento)}")
+        if options["rotas"]:
+            rotas = [nome for nome in rotas if nome in options["rotas"]]
+
+        alvos = self.montar_alvos()
+        clientes = {}
+        resultados = {}
+        for nome in rotas:
+            tipo_usuario, orcamento = ORCAMENTOS[nome]
+            if nome not in alvos:
+                self.stdout.write(self.style.WARNING(f"{nome}: sem dados para montar a URL, ignorada."))
+                continue
+            if tipo_usuario not in clientes:
+                clientes[tipo_usuario] = self.criar_cliente(tipo_usuario)
+            if clientes[tipo_usuario] is None:
+                self.stdout.write(self.style.WARNING(f"{nome}: nenhum usuário '{tipo_usuario}' na base, ignorada."))
+                continue
+
+            resultados[nome] = self.medir(clientes[tipo_usuario], alvos[nome], orcamento, options)
+
+        baseline = self.carregar_baseline(options["baseline"])
+        estouros = self.relatar(resultados, baseline)
+
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "banco": settings.DATABASES["default"]["ENGINE"],
+            "repeticoes": options["repeticoes"],
+            "views": resultados,
+        }
+        Path(options["saida"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        if options["atualizar_baseline"]:
+            Path(options["baseline"]).parent.mkdir(parents=True, exist_ok=True)
+            Path(options["baseline"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+        if estouros:
+            raise CommandError(f"Orçamento de consultas excedido em: {', '.join(estouros)}")
+
+    def montar_alvos(self):
+        tutor_id = Consulta.objects.filter(prontuario__isnull=False).values_list("pet__tutor_id", flat=True).first()
+        veterinario_id = Consulta.objects.values_list("veterinario_id", flat=True).first()
+        self.usuarios = {
+            "cliente": tutor_id,
+            "veterinario": veterinario_id,
+            "atendente": CustomUser.objects.filter(user_type="atendente").values_list("id", flat=True).first(),
+        }
+
+        alvos = {
+            nome: reverse(nome)
+            for nome in [
+                "home",
+                "cadastro",
+                "login",
+                "reset_password",
+                "password_reset_done",
+                "password_reset_complete",
+                "redirect_home",
+                "home_user",
+                "meus_pets",
+                "cadastrar_pet",
+                "consultas_user",
+                "cadastrar_consulta",
+                "perfil_user",
+                "home_vet",
+                "contadores_painel_vet",
+                "lista_consultas_vet",
+                "home_atendente",
+                "criar_horario",
+                "criar_horarios_recorrentes",
+                "v1:veterinarios",
+                "v1:pets",
+                "v1:consultas",
+            ]
+        }
+
+        pet_id = Pet.objects.filter(tutor_id=tutor_id).values_list("id", flat=True).first()
+        if pet_id:
+            for nome in ["excluir_pet", "detalhes_pet", "editar_pet"]:
+                alvos[nome] = reverse(nome, args=[pet_id])
+
+        consulta_id = Consulta.objects.filter(pet__tutor_id=tutor_id).values_list("id", flat=True).first()
+        if consulta_id:
+            alvos["detalhes_consulta"] = reverse("detalhes_consulta", args=[consulta_id])
+
+        prontuario_id = Prontuario.objects.filter(consulta__pet__tutor_id=tutor_id).values_list("id", flat=True).first()
+        if prontuario_id:
+            alvos["prontuario_user"] = reverse("prontuario_user", args=[prontuario_id])
+        receita_id = (
+            Prontuario.objects.filter(consulta__pet__tutor_id=tutor_id)
+            .exclude(receita_prescrita="")
+            .exclude(receita_prescrita__isnull=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if receita_id:
+            alvos["baixar_receita"] = reverse("baixar_receita", args=[receita_id])
+
+        if veterinario_id:
+            alvos["obter_horarios_disponiveis_ajax"] = (
+                f"{reverse('obter_horarios_disponiveis_ajax')}?veterinario_id={veterinario_id}"
+            )
+            alvos["v1:horarios"] = f"{reverse('v1:horarios')}?veterinario={veterinario_id}"
+            alvos["buscar_prontuarios_vet"] = f"{reverse('buscar_prontuarios_vet')}?q=dermatite+alergica"
+            # cadastrar_prontuario_vet inicia consultas MARCADAS num GET; mede uma já realizada.
+            consulta_vet_id = (
+                Consulta.objects.filter(veterinario_id=veterinario_id, status="REALIZADA")
+                .values_list("id", flat=True)
+                .first()
+            )
+            if consulta_vet_id:
+                alvos["detalhe_consulta_vet"] = reverse("detalhe_consulta_vet", args=[consulta_vet_id])
+                alvos["cadastrar_prontuario_vet"] = reverse("cadastrar_prontuario_vet", args=[consulta_vet_id])
+
+        horario_id = HorarioDisponivel.objects.filter(disponivel=True).values_list("id", flat=True).first()
+        if horario_id:
+            alvos["editar_horario"] = reverse("editar_horario", args=[horario_id])
+            alvos["excluir_horario"] = reverse("excluir_horario", args=[horario_id])
+
+        if tutor_id:
+            tutor = CustomUser.objects.get(pk=tutor_id)
+            alvos["password_reset_confirm"] = reverse(
+                "password_reset_confirm",
+                args=[urlsafe_base64_encode(force_bytes(tutor.pk)), default_token_generator.make_token(tutor)],
+            )
+
+        return alvos
+
+    def criar_cliente(self, tipo_usuario):
+        cliente = Client(raise_request_exception=False)
+        if tipo_usuario is None:
+            return cliente
+        usuario_id = self.usuarios.get(tipo_usuario)
+        if usuario_id is None:
+            return None
+        cliente.force_login(CustomUser.objects.get(pk=usuario_id))
+        return cliente
+
+    def medir(self, cliente, url, orcamento, options):
+        for _ in range(options["aquecimento"]):
+            cliente.get(url)
+
+        latencias, consultas, tempos_sql, tempos_render = [], [], [], []
+        for _ in range(options["repeticoes"]):
+            with medir_sql() as sql, medir_templates() as templates:
+                inicio = time.perf_counter()
+                resposta = cliente.get(url)
+                latencias.append(time.perf_counter() - inicio)
+            consultas.append(sql.total)
+            tempos_sql.append(sql.tempo)
+            tempos_render.append(templates.tempo)
+
+        return {
+            "url": url,
+            "status": resposta.status_code,
+            "consultas": max(consultas),
+            "orcamento_consultas": orcamento,
+            "tempo_sql_ms": round(statistics.median(tempos_sql) * 1000, 3),
+            "tempo_render_ms": round(statistics.median(tempos_render) * 1000, 3),
+            "p50_ms": round(_percentil(latencias, 50) * 1000, 3),
+            "p95_ms": round(_percentil(latencias, 95) * 1000, 3),
+        }
+
+    def carregar_baseline(self, caminho):
+        try:
+            return json.loads(Path(caminho).read_text())["views"]
+        except FileNotFoundError:
+            return {}
+
+    def relatar(self, resultados, baseline):
+        estouros = []
+        colunas = ["status", "sql", "orç", "sql ms", "render ms", "p50 ms", "p95 ms"]
+        larguras = [6, 5, 4, 8, 10, 8, 8]
+        self.stdout.write(f"{'rota':34} " + " ".join(f"{c:>{w}}" for c, w in zip(colunas, larguras)))
+        for nome, resultado in resultados.items():
+            linha = (
+                f"{nome:34} {resultado['status']:>6} {resultado['consultas']:>5} {resultado['orcamento_consultas']:>4} "
+                f"{resultado['tempo_sql_ms']:>8.2f} {resultado['tempo_render_ms']:>10.2f} "
+                f"{resultado['p50_ms']:>8.2f} {resultado['p95_ms']:>8.2f}"
+            )
+            anterior = baseline.get(nome)
+            if anterior:
+                linha += f"  (baseline: {anterior['consultas']} sql, p95 {anterior['p95_ms']:.2f} ms)"
+
+            if resultado["consultas"] > resultado["orcamento_consultas"]:
+                estouros.append(nome)
+                self.stdout.write(self.style.ERROR(linha))
+            elif resultado["status"] >= 400 or (anterior and resultado["consultas"] > anterior["consultas"]):
+                self.stdout.write(self.style.WARNING(linha))
+            else:
+                self.stdout.write(linha)
+        return estouros
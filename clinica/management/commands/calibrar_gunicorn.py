@@ -0,0 +1,153 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from .benchmark_carga import Command as BenchmarkCarga
+
+
+def _combinacao(valor):
+    workers, separador, threads = valor.partition(":")
+    if not separador:
+        raise ValueError(valor)
+    return int(workers), int(threads)
+
+
+def combinacoes_padrao(cpus):
+    """Workers em torno de 1x e 2x+1 CPUs, cada um com 1 (sync), 2, 4 e 8 threads (gthread)."""
+    return [(workers, threads) for workers in sorted({cpus, cpus * 2 + 1}) for threads in (1, 2, 4, 8)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Sobe o gunicorn com SerraVet/gunicorn_conf.py em várias combinações de workers x threads nesta máquina, "
+        "mede cada uma com o teste de carga do benchmark_carga e recomenda a de maior vazão cujo p95 fique "
+        "abaixo de --p95-maximo sem erros. Imprime as variáveis GUNICORN_* a usar no .env."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--caminho", default="/", help="Caminho medido, por exemplo /api/v1/veterinarios/.")
+        parser.add_argument("--cookie", default="", help="Cabeçalho Cookie para páginas com login.")
+        parser.add_argument(
+            "--combinacao", type=_combinacao, action="append", dest="combinacoes", help="workers:threads"
+        )
+        parser.add_argument("--concorrencia", type=int, default=32)
+        parser.add_argument("--duracao", type=float, default=10, help="Segundos de medição por combinação.")
+        parser.add_argument("--aquecimento", type=float, default=2)
+        parser.add_argument("--timeout", type=float, default=10)
+        parser.add_argument("--p95-maximo", type=float, default=250, help="Latência p95 aceitável, em ms.")
+        parser.add_argument("--porta", type=int, default=5055)
+        parser.add_argument("--saida", default="bench_calibracao_gunicorn.json", help="Arquivo JSON com os resultados.")
+
+    def handle(self, *args, **options):
+        cpus = os.cpu_count() or 1
+        combinacoes = options["combinacoes"] or combinacoes_padrao(cpus)
+        url = f"http://127.0.0.1:{options['porta']}{options['caminho']}"
+        carga = BenchmarkCarga(stdout=self.stdout, stderr=self.stderr)
+
+        resultados = []
+        for workers, threads in combinacoes:
+            self.stdout.write(f"{workers} worker(s) x {threads} thread(s)...")
+            with self.servidor(workers, threads, options["porta"]):
+                resultado = carga.medir(url, options)
+            resultados.append({"workers": workers, "threads": threads, **resultado})
+
+        recomendada = self.escolher(resultados, options["p95_maximo"])
+        self.relatar(resultados, recomendada)
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "cpus": cpus,
+            "url": url,
+            "concorrencia": options["concorrencia"],
+            "p95_maximo_ms": options["p95_maximo"],
+            "recomendada": recomendada,
+            "combinacoes": resultados,
+        }
+        Path(options["saida"]).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        if recomendada is None:
+            raise CommandError("Nenhuma combinação atendeu ao p95 sem erros; aumente --p95-maximo ou reduza a carga.")
+
+    @contextmanager
+    def servidor(self, workers, threads, porta):
+        ambiente = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+            "GUNICORN_BIND": f"127.0.0.1:{porta}",
+            "GUNICORN_WORKERS": str(workers),
+            "GUNICORN_THREADS": str(threads),
+            # A reciclagem derruba conexões keep-alive no meio da medição e não muda o dimensionamento.
+            "GUNICORN_MAX_REQUESTS": "0",
+        }
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "SerraVet.wsgi", "-c", "python:SerraVet.gunicorn_conf"],
+            cwd=settings.BASE_DIR,
+            env=ambiente,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.aguardar_porta(porta, processo)
+            yield processo
+        finally:
+            processo.terminate()
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+                processo.wait()
+
+    def aguardar_porta(self, porta, processo, limite=60):
+        fim = time.monotonic() + limite
+        while time.monotonic() < fim:
+            if processo.poll() is not None:
+                raise CommandError(f"O gunicorn saiu com código {processo.returncode} antes de abrir a porta.")
+            try:
+                with socket.create_connection(("127.0.0.1", porta), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"O gunicorn não abriu a porta {porta} em {limite}s.")
+
+    def escolher(self, resultados, p95_maximo):
+        aceitaveis = [
+            resultado
+            for resultado in resultados
+            if resultado["requisicoes"]
+            and not resultado["erros"]
+            and all(codigo.startswith("2") for codigo in resultado["status"])
+            and resultado["p95_ms"] <= p95_maximo
+        ]
+        if not aceitaveis:
+            return None
+        # Vazão arredondada a 5% para que, num empate técnico, vença a combinação com menos processos.
+        melhor = max(resultado["req_s"] for resultado in aceitaveis)
+        empatadas = [resultado for resultado in aceitaveis if resultado["req_s"] >= melhor * 0.95]
+        escolhida = min(empatadas, key=lambda resultado: (resultado["workers"], resultado["threads"]))
+        return {"workers": escolhida["workers"], "threads": escolhida["threads"]}
+
+    def relatar(self, resultados, recomendada):
+        colunas = ["req/s", "p50 ms", "p95 ms", "p99 ms", "erros"]
+        self.stdout.write(f"{'workers x threads':18} " + " ".join(f"{coluna:>9}" for coluna in colunas))
+        for resultado in resultados:
+            nome = f"{resultado['workers']} x {resultado['threads']}"
+            if not resultado["requisicoes"]:
+                self.stdout.write(self.style.ERROR(f"{nome:18} sem respostas ({resultado['erros']} erros)"))
+                continue
+            self.stdout.write(
+                f"{nome:18} {resultado['req_s']:>9.1f} {resultado['p50_ms']:>9.2f} {resultado['p95_ms']:>9.2f} "
+                f"{resultado['p99_ms']:>9.2f} {resultado['erros']:>9}"
+            )
+        if recomendada:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Recomendado: GUNICORN_WORKERS={recomendada['workers']} GUNICORN_THREADS={recomendada['threads']}"
+                )
+            )
@@ -0,0 +1,254 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as hora
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from clinica.agenda import expandir_agenda
+from clinica.busca import normalizar_busca, texto_busca_prontuario
+from clinica.models import (
+    ClientePerfil,
+    Consulta,
+    CustomUser,
+    HorarioDisponivel,
+    Pet,
+    Prontuario,
+)
+
+DOMINIO = "sintetico.serravet.com"
+
+NOMES = [
+    "Ana",
+    "Bruno",
+    "Carla",
+    "Diego",
+    "Elisa",
+    "Fábio",
+    "Gabriela",
+    "Heitor",
+    "Isabela",
+    "João",
+    "Larissa",
+    "Miguel",
+]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida", "Nunes", "Carvalho"]
+NOMES_PETS = ["Thor", "Luna", "Mel", "Bob", "Nina", "Fred", "Amora", "Simba", "Pipoca", "Bidu", "Jade", "Paçoca"]
+RACAS = ["SRD", "Poodle", "Labrador", "Siamês", "Persa", "Shih Tzu", "Vira-lata", "Angorá"]
+MOTIVOS = [
+    "Consulta de rotina",
+    "Vacinação",
+    "Vômito e diarreia",
+    "Coceira intensa",
+    "Perda de apetite",
+    "Check-up anual",
+]
+SINAIS = [
+    "Febre e apatia",
+    "Prurido generalizado",
+    "Desidratação leve",
+    "Claudicação no membro posterior",
+    "Tosse seca",
+]
+DIAGNOSTICOS = ["Gastroenterite", "Dermatite alérgica", "Otite externa", "Verminose", "Animal saudável", "Artrose"]
+EXAMES = ["Hemograma completo", "Raio-X", "Ultrassonografia abdominal", "Parasitológico de fezes", ""]
+
+# Distribuição de status para horários passados e futuros que tiveram consulta marcada.
+STATUS_PASSADO = [("REALIZADA", 0.82), ("CANCELADA", 0.15), ("EM_ANDAMENTO", 0.03)]
+STATUS_FUTURO = [("MARCADA", 0.9), ("CANCELADA", 0.1)]
+
+
+def _sortear_status(rng, distribuicao):
+    valores, pesos = zip(*distribuicao)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma base sintética e determinística (tutores, pets, veterinários, horários, consultas e "
+        "prontuários) para testes de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tutores", type=int, default=1000)
+        parser.add_argument("--pets-por-tutor", type=int, default=2)
+        parser.add_argument("--veterinarios", type=int, default=10)
+        parser.add_argument("--atendentes", type=int, default=1)
+        parser.add_argument("--dias", type=int, default=365, help="Dias de agenda, centrados na data de hoje.")
+        parser.add_argument("--duracao", type=int, default=30, help="Duração de cada horário em minutos.")
+        parser.add_argument("--ocupacao", type=float, default=0.6, help="Fração dos horários com consulta.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--data-base",
+            type=date.fromisoformat,
+            help="Data (AAAA-MM-DD) que separa passado e futuro na agenda. Padrão: hoje.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--limpar", action="store_true", help="Remove os dados sintéticos antes de gerar.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        inicio = time.perf_counter()
+
+        if options["limpar"]:
+            self.limpar()
+        elif CustomUser.objects.filter(email__endswith=f".{DOMINIO}").exists():
+            # Uma base por vez: os CPFs levam só os dois últimos dígitos da seed (1 e 101 colidiriam), e o
+            # --limpar remove as bases de todas as seeds.
+            raise CommandError("Já existem dados sintéticos no banco. Use --limpar para recriá-los com esta seed.")
+
+        self.senha = make_password("serravet")
+        tutores = self.criar_usuarios("cliente", options["tutores"], deslocamento=0)
+        veterinarios = self.criar_usuarios("veterinario", options["veterinarios"], deslocamento=options["tutores"])
+        atendentes = self.criar_usuarios(
+            "atendente", options["atendentes"], deslocamento=options["tutores"] + options["veterinarios"]
+        )
+        ClientePerfil.objects.bulk_create(
+            (
+                ClientePerfil(user_id=tutor_id, telefone=f"849{self.rng.randint(10**7, 10**8 - 1)}")
+                for tutor_id in tutores
+            ),
+            batch_size=self.batch_size,
+        )
+        pets = self.criar_pets(tutores, options["pets_por_tutor"])
+
+        if options["data_base"]:
+            data_base = options["data_base"]
+            self.agora = timezone.make_aware(datetime.combine(data_base, hora.min))
+        else:
+            data_base = timezone.localdate()
+            self.agora = timezone.now()
+        data_inicio = data_base - timedelta(days=options["dias"] // 2)
+        data_fim = data_inicio + timedelta(days=options["dias"] - 1)
+        duracao = timedelta(minutes=options["duracao"])
+        datas = list(expandir_agenda(data_inicio, data_fim, range(6), hora(8), hora(18), duracao))
+
+        totais = {"horarios": 0, "consultas": 0, "prontuarios": 0}
+        for veterinario_id in veterinarios:
+            with transaction.atomic():
+                for chave, quantidade in self.criar_agenda(veterinario_id, datas, pets, options["ocupacao"]).items():
+                    totais[chave] += quantidade
+
+        total = len(tutores) * 2 + len(veterinarios) + len(atendentes) + len(pets) + sum(totais.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(tutores)} tutores, {len(pets)} pets, {len(veterinarios)} veterinários, "
+                f"{totais['horarios']} horários, {totais['consultas']} consultas e {totais['prontuarios']} "
+                f"prontuários ({total} linhas) em {time.perf_counter() - inicio:.1f}s."
+            )
+        )
+
+    def limpar(self):
+        usuarios = CustomUser.objects.filter(email__endswith=f".{DOMINIO}")
+        Prontuario.objects.filter(consulta__veterinario__in=usuarios).delete()
+        Consulta.objects.filter(veterinario__in=usuarios).delete()
+        HorarioDisponivel.objects.filter(veterinario__in=usuarios).delete()
+        Pet.objects.filter(tutor__in=usuarios).delete()
+        ClientePerfil.objects.filter(user__in=usuarios).delete()
+        usuarios.delete()
+
+    def criar_usuarios(self, user_type, quantidade, deslocamento):
+        prefixo = {"veterinario": "vet", "atendente": "atendente"}.get(user_type, "tutor")
+        usuarios = [
+            CustomUser(
+                email=f"{prefixo}{i}@{self.seed}.{DOMINIO}",
+                password=self.senha,
+                nome=self.rng.choice(NOMES),
+                sobrenome=self.rng.choice(SOBRENOMES),
+                cpf=f"{self.seed % 100:02d}{deslocamento + i:09d}",
+                user_type=user_type,
+            )
+            for i in range(quantidade)
+        ]
+        CustomUser.objects.bulk_create(usuarios, batch_size=self.batch_size)
+        return list(
+            CustomUser.objects.filter(email__endswith=f"@{self.seed}.{DOMINIO}", user_type=user_type)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def criar_pets(self, tutores, pets_por_tutor):
+        especies = [especie for especie, _ in Pet.especieChoices]
+        # bulk_create não passa por Pet.save, então a coluna de busca é preenchida aqui.
+        nomes_tutores = {
+            tutor_id: (nome, sobrenome)
+            for tutor_id, nome, sobrenome in CustomUser.objects.filter(
+                email__endswith=f"@{self.seed}.{DOMINIO}", user_type="cliente"
+            ).values_list("id", "nome", "sobrenome")
+        }
+        Pet.objects.bulk_create(
+            (
+                Pet(
+                    tutor_id=tutor_id,
+                    nome=nome,
+                    especie=self.rng.choice(especies),
+                    raca=self.rng.choice(RACAS),
+                    peso=round(self.rng.uniform(0.5, 40), 2),
+                    vacinas_em_dia=self.rng.random() < 0.7,
+                    busca=normalizar_busca(nome, *nomes_tutores[tutor_id]),
+                )
+                for tutor_id in tutores
+                for nome in (self.rng.choice(NOMES_PETS) for _ in range(pets_por_tutor))
+            ),
+            batch_size=self.batch_size,
+        )
+        return list(
+            Pet.objects.filter(tutor__email__endswith=f"@{self.seed}.{DOMINIO}")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def criar_agenda(self, veterinario_id, datas, pets, ocupacao):
+        ocupados = {}
+        horarios = []
+        for data in datas:
+            if pets and self.rng.random() < ocupacao:
+                status = _sortear_status(self.rng, STATUS_PASSADO if data < self.agora else STATUS_FUTURO)
+                ocupados[data] = status
+            else:
+                status = None
+            horarios.append(
+                HorarioDisponivel(veterinario_id=veterinario_id, data=data, disponivel=status in (None, "CANCELADA"))
+            )
+        HorarioDisponivel.objects.bulk_create(horarios, batch_size=self.batch_size)
+
+        consultas = [
+            Consulta(
+                pet_id=self.rng.choice(pets),
+                veterinario_id=veterinario_id,
+                horario_agendado_id=horario_id,
+                motivo=self.rng.choice(MOTIVOS),
+                status=ocupados[data],
+            )
+            for horario_id, data in HorarioDisponivel.objects.filter(veterinario_id=veterinario_id)
+            .order_by("data")
+            .values_list("id", "data")
+            if data in ocupados
+        ]
+        Consulta.objects.bulk_create(consultas, batch_size=self.batch_size)
+
+        prontuarios = [
+            Prontuario(
+                consulta_id=consulta_id,
+                finalizado=status == "REALIZADA",
+                sinais_clinicos=self.rng.choice(SINAIS),
+                diagnostico=self.rng.choice(DIAGNOSTICOS),
+                exames_realizados=self.rng.choice(EXAMES),
+                observacoes="Retorno em 15 dias." if self.rng.random() < 0.3 else "",
+            )
+            for consulta_id, status in Consulta.objects.filter(
+                veterinario_id=veterinario_id, status__in=["REALIZADA", "EM_ANDAMENTO"]
+            )
+            .order_by("horario_agendado__data")
+            .values_list("id", "status")
+        ]
+        for prontuario in prontuarios:
+            prontuario.busca = texto_busca_prontuario(prontuario)
+        Prontuario.objects.bulk_create(prontuarios, batch_size=self.batch_size)
+
+        return {"horarios": len(horarios), "consultas": len(consultas), "prontuarios": len(prontuarios)}
@@ -0,0 +1,77 @@
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinica.agenda import TAMANHO_LOTE_PADRAO, gerar_horarios_recorrentes
+from clinica.models import CustomUser
+
+
+def _data(valor):
+    return date.fromisoformat(valor)
+
+
+def _hora(valor):
+    return datetime.strptime(valor, "%H:%M").time()
+
+
+class Command(BaseCommand):
+    help = "Gera em lote os horários disponíveis de uma agenda recorrente de um veterinário."
+
+    def add_arguments(self, parser):
+        parser.add_argument("veterinario", help="E-mail ou ID do veterinário.")
+        parser.add_argument("--inicio", type=_data, required=True, help="Data de início (AAAA-MM-DD).")
+        parser.add_argument("--fim", type=_data, required=True, help="Data final (AAAA-MM-DD).")
+        parser.add_argument(
+            "--dias",
+            default="0,1,2,3,4",
+            help="Dias da semana separados por vírgula, 0 = segunda ... 6 = domingo (padrão: 0,1,2,3,4).",
+        )
+        parser.add_argument("--hora-inicio", type=_hora, default="08:00", help="Hora de início (HH:MM).")
+        parser.add_argument("--hora-fim", type=_hora, default="18:00", help="Hora final (HH:MM).")
+        parser.add_argument("--duracao", type=int, default=30, help="Duração de cada horário em minutos.")
+        parser.add_argument(
+            "--feriado",
+            type=_data,
+            action="append",
+            default=[],
+            help="Data a ignorar (AAAA-MM-DD). Pode ser repetido.",
+        )
+        parser.add_argument("--batch-size", type=int, default=TAMANHO_LOTE_PADRAO)
+
+    def handle(self, *args, **options):
+        filtro = (
+            {"id": options["veterinario"]} if options["veterinario"].isdigit() else {"email": options["veterinario"]}
+        )
+        try:
+            veterinario = CustomUser.objects.get(user_type="veterinario", **filtro)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"Veterinário '{options['veterinario']}' não encontrado.")
+
+        try:
+            dias_semana = [int(dia) for dia in options["dias"].split(",")]
+        except ValueError:
+            raise CommandError("--dias deve conter números de 0 a 6 separados por vírgula.")
+
+        if options["fim"] < options["inicio"]:
+            raise CommandError("--fim deve ser igual ou posterior a --inicio.")
+        if options["hora_fim"] <= options["hora_inicio"]:
+            raise CommandError("--hora-fim deve ser posterior a --hora-inicio.")
+        if options["duracao"] <= 0:
+            raise CommandError("--duracao deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        criados = gerar_horarios_recorrentes(
+            veterinario,
+            options["inicio"],
+            options["fim"],
+            dias_semana,
+            options["hora_inicio"],
+            options["hora_fim"],
+            timedelta(minutes=options["duracao"]),
+            feriados=options["feriado"],
+            batch_size=options["batch_size"],
+        )
+        decorrido = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f"{criados} horário(s) criado(s) em {decorrido:.2f}s."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from clinica.cache import invalidar_escopos
+from clinica.imagens import LARGURAS_VARIANTES, gerar_variantes
+from clinica.models import ClientePerfil, Pet
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas JPEG/WebP que faltam para as fotos de pets e de perfil. Use após importar fotos "
+        "sem passar por save() ou para refazer variantes perdidas num restart dos workers."
+    )
+
+    def handle(self, *args, **options):
+        geradas = falhas = 0
+        for model, campo, dono in [(Pet, "foto_pet", "tutor_id"), (ClientePerfil, "foto_user", "user_id")]:
+            storage = model._meta.get_field(campo).storage
+            fotos = model.objects.exclude(**{campo: ""}).exclude(**{f"{campo}__isnull": True})
+            for nome, tutor_id in fotos.values_list(campo, dono).iterator():
+                try:
+                    novas = gerar_variantes(storage, nome, LARGURAS_VARIANTES[campo])
+                except Exception as erro:
+                    falhas += 1
+                    self.stderr.write(f"{nome}: {erro}")
+                    continue
+                if novas:
+                    # Os fragmentos em cache do tutor ainda têm o <img> sem as variantes.
+                    invalidar_escopos(tutor=tutor_id)
+                geradas += novas
+
+        mensagem = f"{geradas} variante(s) gerada(s)."
+        if falhas:
+            self.stdout.write(self.style.WARNING(f"{mensagem} {falhas} foto(s) com erro."))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensagem))
@@ -0,0 +1,53 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+
+def modelo_sessao():
+    """Modelo das sessões do SESSION_ENGINE atual; com sessões em cookie, o django_session padrão (sobras)."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    return store.get_model_class() if hasattr(store, "get_model_class") else Session
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga as sessões expiradas de django_session em lotes pequenos (cada lote num DELETE curto), em vez "
+        "do DELETE único do clearsessions, que segura a tabela por muito tempo numa base grande. Com "
+        "--intervalo fica em execução e repete a limpeza a cada N segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pausa", type=float, default=0.1, help="Segundos de espera entre os lotes.")
+        parser.add_argument("--intervalo", type=float, help="Repete a limpeza a cada N segundos, indefinidamente.")
+
+    def handle(self, *args, **options):
+        while True:
+            apagadas = self.limpar(options["batch_size"], options["pausa"])
+            self.stdout.write(f"{apagadas} sessão(ões) expirada(s) apagada(s).")
+            if not options["intervalo"]:
+                return
+            close_old_connections()
+            time.sleep(options["intervalo"])
+
+    def limpar(self, batch_size, pausa):
+        modelo = modelo_sessao()
+        agora = timezone.now()
+        apagadas = 0
+        while True:
+            # A seleção usa o índice de expire_date; o DELETE, a chave primária.
+            chaves = list(
+                modelo.objects.filter(expire_date__lt=agora).values_list("session_key", flat=True)[:batch_size]
+            )
+            if not chaves:
+                return apagadas
+            modelo.objects.filter(session_key__in=chaves).delete()
+            apagadas += len(chaves)
+            if len(chaves) < batch_size:
+                return apagadas
+            time.sleep(pausa)
@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+# Chave da trava consultiva (pg_advisory_lock) que serializa as migrações entre réplicas; qualquer bigint fixo
+# serve, desde que nada mais no banco use o mesmo.
+CHAVE_TRAVA_MIGRACOES = 0x53455252_41564554  # "SERRAVET"
+
+
+def migracoes_pendentes():
+    """Migrações ainda não aplicadas, lidas dos arquivos e de django_migrations (uma consulta, sem o migrate)."""
+    executor = MigrationExecutor(connection)
+    return [migracao for migracao, _ in executor.migration_plan(executor.loader.graph.leaf_nodes())]
+
+
+def tabelas_cache_ausentes():
+    """Tabelas dos caches em banco (SERRAVET_CACHE=banco) que ainda não existem; sem cache em banco, nenhuma."""
+    tabelas = {cache._table for cache in caches.all() if isinstance(cache, BaseDatabaseCache)}
+    if not tabelas:
+        return set()
+    return tabelas - set(connection.introspection.table_names())
+
+
+@contextmanager
+def trava_migracoes(espera_maxima):
+    """Segura a trava consultiva de migrações no Postgres; retorna os segundos gastos esperando por ela.
+
+    Fora do Postgres (SQLite no desenvolvimento) não há réplicas concorrentes e nada é travado.
+    """
+    if connection.vendor != "postgresql":
+        yield 0.0
+        return
+    inicio = time.monotonic()
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [CHAVE_TRAVA_MIGRACOES])
+            if cursor.fetchone()[0]:
+                break
+            if time.monotonic() - inicio > espera_maxima:
+                raise CommandError(f"Outra réplica segura a trava de migrações há mais de {espera_maxima:.0f}s.")
+            time.sleep(0.5)
+    try:
+        yield time.monotonic() - inicio
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [CHAVE_TRAVA_MIGRACOES])
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepara o banco na subida do container: confere em milissegundos se há migrações pendentes (ou tabela "
+        "de cache em banco faltando) e só então roda o migrate/createcachetable, segurando uma trava consultiva "
+        "do Postgres para que só uma réplica migre por vez. Sem nada pendente, não roda nenhum dos dois. "
+        "Imprime o tempo de cada etapa."
+    )
+    # As verificações do Django custam mais que o resto do comando; ficam para o `manage.py check --deploy`.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--espera-maxima", type=float, default=600, help="Segundos aguardando a trava de outra réplica."
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        pendentes = migracoes_pendentes()
+        tabelas = tabelas_cache_ausentes()
+        tempos = {"verificacao": time.perf_counter() - inicio}
+
+        outra_replica = False
+        if pendentes or tabelas:
+            with trava_migracoes(options["espera_maxima"]) as espera:
+                tempos["trava"] = espera
+                # Enquanto esperávamos, outra réplica pode ter feito tudo: confere de novo já com a trava.
+                outra_replica, pendentes = bool(pendentes), migracoes_pendentes()
+                outra_replica = outra_replica and not pendentes
+                etapa = time.perf_counter()
+                if pendentes:
+                    call_command("migrate", interactive=False, verbosity=options["verbosity"])
+                    tempos["migrate"] = time.perf_counter() - etapa
+                if tabelas_cache_ausentes():
+                    etapa = time.perf_counter()
+                    call_command("createcachetable", verbosity=options["verbosity"])
+                    tempos["createcachetable"] = time.perf_counter() - etapa
+
+        if pendentes:
+            self.stdout.write(f"{len(pendentes)} migração(ões) aplicada(s).")
+        elif outra_replica:
+            self.stdout.write("Migrações já aplicadas por outra réplica.")
+        else:
+            self.stdout.write("Nenhuma migração pendente.")
+        tempos["total"] = time.perf_counter() - inicio
+        self.stdout.write(" ".join(f"{etapa}={segundos * 1000:.0f}ms" for etapa, segundos in tempos.items()))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from clinica.busca import (
+    criar_indice_busca_pets,
+    criar_indice_busca_prontuarios,
+    texto_busca_pet,
+    texto_busca_prontuario,
+)
+from clinica.models import Pet, Prontuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as colunas de busca de pets e prontuários e recria os índices de texto. Use após cargas que "
+        "não passam por save() ou, no SQLite, após migrações que recriem essas tabelas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        pets = self.recalcular(
+            Pet.objects.select_related("tutor").only("id", "nome", "busca", "tutor__nome", "tutor__sobrenome"),
+            texto_busca_pet,
+            options["batch_size"],
+        )
+        prontuarios = self.recalcular(
+            Prontuario.objects.only(
+                "id", "busca", "sinais_clinicos", "diagnostico", "exames_realizados", "observacoes"
+            ),
+            texto_busca_prontuario,
+            options["batch_size"],
+        )
+
+        with connection.schema_editor() as schema_editor:
+            criar_indice_busca_pets(schema_editor)
+            criar_indice_busca_prontuarios(schema_editor)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{pets} pet(s) e {prontuarios} prontuário(s) atualizados; índices de busca recriados.")
+        )
+
+    def recalcular(self, queryset, calcular_texto, batch_size):
+        atualizados = 0
+        pendentes = []
+        with transaction.atomic():
+            for obj in queryset.iterator(chunk_size=batch_size):
+                texto = calcular_texto(obj)
+                if texto != obj.busca:
+                    obj.busca = texto
+                    pendentes.append(obj)
+                if len(pendentes) >= batch_size:
+                    atualizados += len(pendentes)
+                    queryset.model.objects.bulk_update(pendentes, ["busca"])
+                    pendentes = []
+            atualizados += len(pendentes)
+            queryset.model.objects.bulk_update(pendentes, ["busca"])
+        return atualizados
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from clinica.busca import TABELA_FTS_PETS, TABELA_FTS_PRONTUARIOS, buscar_prontuarios, filtro_busca_pets
+from clinica.models import Consulta, CustomUser, HorarioDisponivel, Pet, Prontuario
+
+
+def consultas_frequentes():
+    """Consultas das views, forms e admin que devem ser atendidas por um índice.
+
+    Cada item é (descrição, queryset, índice esperado).
+    """
+    veterinario_id = CustomUser.objects.filter(user_type="veterinario").values_list("id", flat=True).first() or 0
+    tutor_id = Pet.objects.values_list("tutor_id", flat=True).first() or 0
+
+    return [
+        (
+            "Horários disponíveis futuros do veterinário (AJAX de agendamento)",
+            HorarioDisponivel.objects.filter(
+                veterinario_id=veterinario_id, disponivel=True, data__gte=timezone.now()
+            ).order_by("data"),
+            "horario_disp_vet_data_idx",
+        ),
+        (
+            "Quadro de horários filtrado por veterinário (gerenciar_horarios)",
+            HorarioDisponivel.objects.filter(veterinario_id=veterinario_id).order_by("data", "id")[:3],
+            # Índice da constraint horario_vet_data_uniq; o SQLite dá nome próprio ao índice de um UNIQUE.
+            (
+                "horario_vet_data_uniq"
+                if connection.vendor == "postgresql"
+                else "sqlite_autoindex_clinica_horariodisponivel_1"
+            ),
+        ),
+        (
+            "Quadro de horários sem filtros (gerenciar_horarios)",
+            HorarioDisponivel.objects.order_by("data", "id")[:3],
+            "horario_data_idx",
+        ),
+        (
+            "Consultas ativas do veterinário (home_vet, lista_consultas_vet)",
+            Consulta.objects.filter(veterinario_id=veterinario_id, status__in=["MARCADA", "EM_ANDAMENTO"]),
+            "consulta_vet_status_idx",
+        ),
+        (
+            "Busca por nome do pet ou do tutor (lista_consultas_vet)",
+            Pet.objects.filter(filtro_busca_pets("mel")),
+            "pet_busca_fts_idx" if connection.vendor == "postgresql" else TABELA_FTS_PETS,
+        ),
+        (
+            "Busca textual nos prontuários (buscar_prontuarios_vet)",
+            buscar_prontuarios(Prontuario.objects.all(), "vomito"),
+            "prontuario_busca_fts_idx" if connection.vendor == "postgresql" else TABELA_FTS_PRONTUARIOS,
+        ),
+        (
+            "Pets do tutor por nome (meus_pets_view, AgendamentoClienteForm)",
+            Pet.objects.filter(tutor_id=tutor_id).order_by("nome"),
+            "pet_tutor_nome_idx",
+        ),
+        (
+            "Veterinários por nome (AgendamentoClienteForm)",
+            CustomUser.objects.filter(user_type="veterinario").order_by("nome"),
+            "usuario_tipo_nome_idx",
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Roda EXPLAIN nas consultas mais frequentes e verifica se cada uma usa o índice esperado."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sem-seqscan",
+            action="store_true",
+            help="Desabilita seq scans no PostgreSQL, para verificar se os índices são utilizáveis em bases pequenas.",
+        )
+        parser.add_argument("--plano", action="store_true", help="Mostra o plano completo de cada consulta.")
+
+    def handle(self, *args, **options):
+        if options["sem_seqscan"] and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+        falhas = []
+        for descricao, queryset, indice in consultas_frequentes():
+            plano = queryset.explain()
+            if indice in plano:
+                self.stdout.write(self.style.SUCCESS(f"OK     {descricao} -> {indice}"))
+            else:
+                falhas.append(descricao)
+                self.stdout.write(self.style.ERROR(f"FALHOU {descricao} (esperado {indice})"))
+
+            if options["plano"] or indice not in plano:
+                self.stdout.write(plano)
+
+        if options["sem_seqscan"] and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("RESET enable_seqscan")
+
+        if falhas:
+            raise CommandError(f"{len(falhas)} consulta(s) sem o índice esperado.")
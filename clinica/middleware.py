@@ -0,0 +1,63 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .cache import medir_cache
+from .perf import medir_sql, medir_templates
+
+logger = logging.getLogger("clinica.instrumentacao")
+
+
+class InstrumentacaoMiddleware:
+    """Mede consultas SQL, tempo de banco, de templates, acertos de cache e total de cada requisição.
+
+    Os tempos saem no cabeçalho Server-Timing e numa linha de log JSON. Só é ativado
+    quando settings.INSTRUMENTACAO_REQUISICOES é verdadeiro.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTACAO_REQUISICOES", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        with medir_sql() as sql, medir_templates() as templates, medir_cache() as cache:
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+
+        duplicadas = sql.duplicadas()
+        similares = sql.similares()
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={sql.tempo * 1000:.1f};desc="{sql.total} consultas"',
+                f"tpl;dur={templates.tempo * 1000:.1f}",
+                f'cache;desc="{cache.acertos} acertos, {cache.falhas} falhas"',
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+
+        registro = {
+            "metodo": request.method,
+            "caminho": request.path,
+            "status": response.status_code,
+            "consultas": sql.total,
+            "db_ms": round(sql.tempo * 1000, 2),
+            "templates_ms": round(templates.tempo * 1000, 2),
+            "cache_acertos": cache.acertos,
+            "cache_falhas": cache.falhas,
+            "total_ms": round(total * 1000, 2),
+            "duplicadas": sum(duplicadas.values()),
+            "similares": sum(similares.values()),
+        }
+        nivel = logging.WARNING if duplicadas else logging.INFO
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False))
+
+        for consulta, vezes in sorted(duplicadas.items(), key=lambda item: -item[1])[:3]:
+            logger.warning(json.dumps({"caminho": request.path, "duplicada": vezes, "sql": consulta[:300]}))
+
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.2 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("clinica", "0002_remove_veterinarioinfo_foto_veterinario"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="consulta",
+            index=models.Index(fields=["veterinario", "status"], name="consulta_vet_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["user_type", "nome"], name="usuario_tipo_nome_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="horariodisponivel",
+            index=models.Index(fields=["data", "id"], name="horario_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="horariodisponivel",
+            index=models.Index(fields=["veterinario", "data"], name="horario_vet_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="horariodisponivel",
+            index=models.Index(
+                condition=models.Q(("disponivel", True)),
+                fields=["veterinario", "data"],
+                name="horario_disp_vet_data_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pet",
+            index=models.Index(fields=["tutor", "nome"], name="pet_tutor_nome_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="prontuario",
+            index=models.Index(fields=["criada_em"], name="prontuario_criada_em_idx"),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.2 on 2026-10-18 04:49
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia congelada da normalização e do DDL de clinica/busca.py na época desta migração: mudanças posteriores
+# naquele módulo não podem alterar o que esta migração faz num banco novo.
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar_busca(*partes):
+    texto = " ".join(parte for parte in partes if parte)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_PALAVRA.findall(texto.lower()))
+
+
+SQL_INDICE_BUSCA_PETS = {
+    "postgresql": {
+        "criar": [
+            "CREATE INDEX IF NOT EXISTS pet_busca_fts_idx ON clinica_pet USING gin (to_tsvector('simple', busca))",
+        ],
+        "remover": ["DROP INDEX IF EXISTS pet_busca_fts_idx"],
+    },
+    "sqlite": {
+        "criar": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS clinica_pet_busca USING fts5("
+            "busca, content='clinica_pet', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_ai AFTER INSERT ON clinica_pet BEGIN "
+            "INSERT INTO clinica_pet_busca(rowid, busca) VALUES (new.id, new.busca); END",
+            "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_ad AFTER DELETE ON clinica_pet BEGIN "
+            "INSERT INTO clinica_pet_busca(clinica_pet_busca, rowid, busca) VALUES ('delete', old.id, old.busca); END",
+            "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_au AFTER UPDATE OF busca ON clinica_pet BEGIN "
+            "INSERT INTO clinica_pet_busca(clinica_pet_busca, rowid, busca) VALUES ('delete', old.id, old.busca); "
+            "INSERT INTO clinica_pet_busca(rowid, busca) VALUES (new.id, new.busca); END",
+            "INSERT INTO clinica_pet_busca(clinica_pet_busca) VALUES ('rebuild')",
+        ],
+        "remover": [
+            "DROP TRIGGER IF EXISTS clinica_pet_busca_ai",
+            "DROP TRIGGER IF EXISTS clinica_pet_busca_ad",
+            "DROP TRIGGER IF EXISTS clinica_pet_busca_au",
+            "DROP TABLE IF EXISTS clinica_pet_busca",
+        ],
+    },
+}
+
+
+def _executar(schema_editor, acao):
+    for sql in SQL_INDICE_BUSCA_PETS.get(schema_editor.connection.vendor, {}).get(acao, []):
+        schema_editor.execute(sql)
+
+
+def preencher_busca(apps, schema_editor):
+    Pet = apps.get_model("clinica", "Pet")
+    pets = []
+    for pet in Pet.objects.select_related("tutor").only("id", "nome", "tutor__nome", "tutor__sobrenome").iterator():
+        pet.busca = normalizar_busca(pet.nome, pet.tutor.nome, pet.tutor.sobrenome)
+        pets.append(pet)
+        if len(pets) == 2000:
+            Pet.objects.bulk_update(pets, ["busca"])
+            pets = []
+    Pet.objects.bulk_update(pets, ["busca"])
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, "criar")
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, "remover")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0003_indices_consultas_frequentes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pet",
+            name="busca",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
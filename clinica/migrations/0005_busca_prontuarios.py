@@ -0,0 +1,96 @@
+# Generated by Django 5.2.2 on 2026-10-18 05:10
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia congelada da normalização e do DDL de clinica/busca.py na época desta migração: mudanças posteriores
+# naquele módulo não podem alterar o que esta migração faz num banco novo.
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar_busca(*partes):
+    texto = " ".join(parte for parte in partes if parte)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_PALAVRA.findall(texto.lower()))
+
+
+SQL_INDICE_BUSCA_PRONTUARIOS = {
+    "postgresql": {
+        "criar": [
+            "ALTER TABLE clinica_prontuario ADD COLUMN IF NOT EXISTS busca_vetor tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('portuguese', busca)) STORED",
+            "CREATE INDEX IF NOT EXISTS prontuario_busca_fts_idx ON clinica_prontuario USING gin (busca_vetor)",
+        ],
+        "remover": [
+            "DROP INDEX IF EXISTS prontuario_busca_fts_idx",
+            "ALTER TABLE clinica_prontuario DROP COLUMN IF EXISTS busca_vetor",
+        ],
+    },
+    "sqlite": {
+        "criar": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS clinica_prontuario_busca USING fts5("
+            "busca, content='clinica_prontuario', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ai AFTER INSERT ON clinica_prontuario BEGIN "
+            "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+            "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ad AFTER DELETE ON clinica_prontuario BEGIN "
+            "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+            "VALUES ('delete', old.id, old.busca); END",
+            "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_au AFTER UPDATE OF busca ON clinica_prontuario "
+            "BEGIN INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+            "VALUES ('delete', old.id, old.busca); "
+            "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+            "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca) VALUES ('rebuild')",
+        ],
+        "remover": [
+            "DROP TRIGGER IF EXISTS clinica_prontuario_busca_ai",
+            "DROP TRIGGER IF EXISTS clinica_prontuario_busca_ad",
+            "DROP TRIGGER IF EXISTS clinica_prontuario_busca_au",
+            "DROP TABLE IF EXISTS clinica_prontuario_busca",
+        ],
+    },
+}
+
+
+def _executar(schema_editor, acao):
+    for sql in SQL_INDICE_BUSCA_PRONTUARIOS.get(schema_editor.connection.vendor, {}).get(acao, []):
+        schema_editor.execute(sql)
+
+
+def preencher_busca(apps, schema_editor):
+    Prontuario = apps.get_model("clinica", "Prontuario")
+    campos = ["sinais_clinicos", "diagnostico", "exames_realizados", "observacoes"]
+    prontuarios = []
+    for prontuario in Prontuario.objects.only("id", *campos).iterator(chunk_size=2000):
+        prontuario.busca = normalizar_busca(*(getattr(prontuario, campo) for campo in campos))
+        prontuarios.append(prontuario)
+        if len(prontuarios) == 2000:
+            Prontuario.objects.bulk_update(prontuarios, ["busca"])
+            prontuarios = []
+    Prontuario.objects.bulk_update(prontuarios, ["busca"])
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, "criar")
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, "remover")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0004_busca_pets"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prontuario",
+            name="busca",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
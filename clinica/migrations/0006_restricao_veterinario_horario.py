@@ -0,0 +1,68 @@
+# Generated by Django 5.2.2 on 2026-10-18 05:40
+
+from django.db import migrations
+
+# Cópia congelada do DDL de clinica/restricoes.py na época desta migração: mudanças posteriores naquele módulo
+# não podem alterar o que esta migração faz num banco novo.
+SQL_RESTRICAO_VETERINARIO_HORARIO = {
+    "postgresql": {
+        "criar": [
+            "ALTER TABLE clinica_horariodisponivel DROP CONSTRAINT IF EXISTS horario_id_veterinario_uniq",
+            "ALTER TABLE clinica_horariodisponivel "
+            "ADD CONSTRAINT horario_id_veterinario_uniq UNIQUE (id, veterinario_id)",
+            "ALTER TABLE clinica_consulta DROP CONSTRAINT IF EXISTS consulta_horario_veterinario_fk",
+            "ALTER TABLE clinica_consulta ADD CONSTRAINT consulta_horario_veterinario_fk "
+            "FOREIGN KEY (horario_agendado_id, veterinario_id) "
+            "REFERENCES clinica_horariodisponivel (id, veterinario_id) ON UPDATE CASCADE",
+        ],
+        "remover": [
+            "ALTER TABLE clinica_consulta DROP CONSTRAINT IF EXISTS consulta_horario_veterinario_fk",
+            "ALTER TABLE clinica_horariodisponivel DROP CONSTRAINT IF EXISTS horario_id_veterinario_uniq",
+        ],
+    },
+    "sqlite": {
+        "criar": [
+            "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_ai BEFORE INSERT ON clinica_consulta "
+            "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+            "WHERE id = NEW.horario_agendado_id) BEGIN "
+            "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+            "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_au "
+            "BEFORE UPDATE OF veterinario_id, horario_agendado_id ON clinica_consulta "
+            "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+            "WHERE id = NEW.horario_agendado_id) BEGIN "
+            "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+            "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_horario_au "
+            "AFTER UPDATE OF veterinario_id ON clinica_horariodisponivel BEGIN "
+            "UPDATE clinica_consulta SET veterinario_id = NEW.veterinario_id WHERE horario_agendado_id = NEW.id; END",
+        ],
+        "remover": [
+            "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_ai",
+            "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_au",
+            "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_horario_au",
+        ],
+    },
+}
+
+
+def _executar(schema_editor, acao):
+    for sql in SQL_RESTRICAO_VETERINARIO_HORARIO.get(schema_editor.connection.vendor, {}).get(acao, []):
+        schema_editor.execute(sql)
+
+
+def criar_restricao(apps, schema_editor):
+    _executar(schema_editor, "criar")
+
+
+def remover_restricao(apps, schema_editor):
+    _executar(schema_editor, "remover")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0005_busca_prontuarios"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_restricao, remover_restricao),
+    ]
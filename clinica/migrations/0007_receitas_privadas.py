@@ -0,0 +1,81 @@
+# Generated by Django 5.2.2 on 2026-10-18 05:05
+
+import os
+import shutil
+
+from django.conf import settings
+from django.db import migrations, models
+
+import clinica.arquivos
+
+# Cópia congelada do DDL do índice de busca dos prontuários (0005_busca_prontuarios). Só o SQLite precisa dele
+# aqui; no PostgreSQL os comandos são IF NOT EXISTS e não mudam nada.
+SQL_INDICE_BUSCA_PRONTUARIOS = {
+    "postgresql": [
+        "ALTER TABLE clinica_prontuario ADD COLUMN IF NOT EXISTS busca_vetor tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('portuguese', busca)) STORED",
+        "CREATE INDEX IF NOT EXISTS prontuario_busca_fts_idx ON clinica_prontuario USING gin (busca_vetor)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS clinica_prontuario_busca USING fts5("
+        "busca, content='clinica_prontuario', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ai AFTER INSERT ON clinica_prontuario BEGIN "
+        "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+        "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ad AFTER DELETE ON clinica_prontuario BEGIN "
+        "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+        "VALUES ('delete', old.id, old.busca); END",
+        "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_au AFTER UPDATE OF busca ON clinica_prontuario "
+        "BEGIN INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+        "VALUES ('delete', old.id, old.busca); "
+        "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+        "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca) VALUES ('rebuild')",
+    ],
+}
+
+
+def _mover_receitas(apps, origem, destino):
+    Prontuario = apps.get_model("clinica", "Prontuario")
+    nomes = Prontuario.objects.exclude(receita_prescrita="").exclude(receita_prescrita__isnull=True)
+    for nome in nomes.values_list("receita_prescrita", flat=True).iterator():
+        caminho_origem = os.path.join(origem, nome)
+        caminho_destino = os.path.join(destino, nome)
+        if os.path.exists(caminho_origem) and not os.path.exists(caminho_destino):
+            os.makedirs(os.path.dirname(caminho_destino), exist_ok=True)
+            shutil.move(caminho_origem, caminho_destino)
+
+
+def recriar_indice_busca(apps, schema_editor):
+    # No SQLite o AlterField recria clinica_prontuario e descarta os triggers da tabela FTS5.
+    for sql in SQL_INDICE_BUSCA_PRONTUARIOS.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def tornar_receitas_privadas(apps, schema_editor):
+    _mover_receitas(apps, settings.MEDIA_ROOT, settings.ARQUIVOS_PRIVADOS_ROOT)
+
+
+def tornar_receitas_publicas(apps, schema_editor):
+    _mover_receitas(apps, settings.ARQUIVOS_PRIVADOS_ROOT, settings.MEDIA_ROOT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0006_restricao_veterinario_horario"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="prontuario",
+            name="receita_prescrita",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=clinica.arquivos.ArmazenamentoPrivado(),
+                upload_to="receitas/",
+                verbose_name="Receita Prescrita",
+            ),
+        ),
+        migrations.RunPython(recriar_indice_busca, recriar_indice_busca),
+        migrations.RunPython(tornar_receitas_privadas, tornar_receitas_publicas),
+    ]
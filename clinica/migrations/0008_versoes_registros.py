@@ -0,0 +1,102 @@
+# Generated by Django 5.2.2 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+# Cópia congelada, só do SQLite, dos triggers de 0004_busca_pets, 0005_busca_prontuarios e
+# 0006_restricao_veterinario_horario: mudanças posteriores em clinica/busca.py e clinica/restricoes.py não
+# podem alterar o que esta migração faz num banco novo.
+SQL_TRIGGERS_RESTRICAO = {
+    "criar": [
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_ai BEFORE INSERT ON clinica_consulta "
+        "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+        "WHERE id = NEW.horario_agendado_id) BEGIN "
+        "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_au "
+        "BEFORE UPDATE OF veterinario_id, horario_agendado_id ON clinica_consulta "
+        "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+        "WHERE id = NEW.horario_agendado_id) BEGIN "
+        "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_horario_au "
+        "AFTER UPDATE OF veterinario_id ON clinica_horariodisponivel BEGIN "
+        "UPDATE clinica_consulta SET veterinario_id = NEW.veterinario_id WHERE horario_agendado_id = NEW.id; END",
+    ],
+    "remover": [
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_ai",
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_au",
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_horario_au",
+    ],
+}
+
+SQL_TRIGGERS_BUSCA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clinica_pet_busca USING fts5("
+    "busca, content='clinica_pet', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_ai AFTER INSERT ON clinica_pet BEGIN "
+    "INSERT INTO clinica_pet_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_ad AFTER DELETE ON clinica_pet BEGIN "
+    "INSERT INTO clinica_pet_busca(clinica_pet_busca, rowid, busca) VALUES ('delete', old.id, old.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS clinica_pet_busca_au AFTER UPDATE OF busca ON clinica_pet BEGIN "
+    "INSERT INTO clinica_pet_busca(clinica_pet_busca, rowid, busca) VALUES ('delete', old.id, old.busca); "
+    "INSERT INTO clinica_pet_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "INSERT INTO clinica_pet_busca(clinica_pet_busca) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clinica_prontuario_busca USING fts5("
+    "busca, content='clinica_prontuario', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ai AFTER INSERT ON clinica_prontuario BEGIN "
+    "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_ad AFTER DELETE ON clinica_prontuario BEGIN "
+    "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+    "VALUES ('delete', old.id, old.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS clinica_prontuario_busca_au AFTER UPDATE OF busca ON clinica_prontuario "
+    "BEGIN INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca, rowid, busca) "
+    "VALUES ('delete', old.id, old.busca); "
+    "INSERT INTO clinica_prontuario_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "INSERT INTO clinica_prontuario_busca(clinica_prontuario_busca) VALUES ('rebuild')",
+]
+
+
+def remover_triggers(apps, schema_editor):
+    # O trigger de clinica_horariodisponivel referencia clinica_consulta e impediria o SQLite de recriá-la.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQL_TRIGGERS_RESTRICAO["remover"]:
+        schema_editor.execute(sql)
+
+
+def recriar_triggers(apps, schema_editor):
+    # No SQLite o AddField recria as tabelas e descarta os triggers das tabelas FTS5 e da restrição
+    # veterinário/horário. Nos outros bancos nada se perde.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQL_TRIGGERS_BUSCA + SQL_TRIGGERS_RESTRICAO["criar"]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0007_receitas_privadas"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_triggers, recriar_triggers),
+        migrations.AddField(
+            model_name="clienteperfil",
+            name="atualizado_em",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="consulta",
+            name="atualizado_em",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="pet",
+            name="atualizado_em",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="prontuario",
+            name="atualizado_em",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(recriar_triggers, remover_triggers),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.2 on 2026-10-18 05:59
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+# Cópia congelada, só do SQLite, dos triggers de 0006_restricao_veterinario_horario: mudanças posteriores em
+# clinica/restricoes.py não podem alterar o que esta migração faz num banco novo.
+SQL_TRIGGERS_RESTRICAO = {
+    "criar": [
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_ai BEFORE INSERT ON clinica_consulta "
+        "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+        "WHERE id = NEW.horario_agendado_id) BEGIN "
+        "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_au "
+        "BEFORE UPDATE OF veterinario_id, horario_agendado_id ON clinica_consulta "
+        "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+        "WHERE id = NEW.horario_agendado_id) BEGIN "
+        "SELECT RAISE(ABORT, 'consulta_horario_veterinario_fk: veterinário difere do horário'); END",
+        "CREATE TRIGGER IF NOT EXISTS consulta_horario_veterinario_fk_horario_au "
+        "AFTER UPDATE OF veterinario_id ON clinica_horariodisponivel BEGIN "
+        "UPDATE clinica_consulta SET veterinario_id = NEW.veterinario_id WHERE horario_agendado_id = NEW.id; END",
+    ],
+    "remover": [
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_ai",
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_au",
+        "DROP TRIGGER IF EXISTS consulta_horario_veterinario_fk_horario_au",
+    ],
+}
+
+
+def remover_duplicados(apps, schema_editor):
+    """Apaga os horários repetidos (mesmo veterinário e data) que nenhuma consulta usa.
+
+    De cada grupo fica o horário agendado, se houver, ou o de menor id. Dois horários repetidos e ambos
+    agendados não são tocados: a constraint falha e o conflito precisa ser resolvido à mão.
+    """
+    HorarioDisponivel = apps.get_model("clinica", "HorarioDisponivel")
+    repetidos = (
+        HorarioDisponivel.objects.values("veterinario_id", "data")
+        .annotate(total=Count("id"), primeiro=Min("id"))
+        .filter(total__gt=1)
+    )
+    for grupo in repetidos:
+        horarios = HorarioDisponivel.objects.filter(veterinario_id=grupo["veterinario_id"], data=grupo["data"])
+        agendados = set(horarios.filter(consulta__isnull=False).values_list("id", flat=True))
+        manter = agendados or {grupo["primeiro"]}
+        horarios.exclude(id__in=manter).delete()
+    if repetidos and schema_editor.connection.vendor == "postgresql":
+        # As FKs do Django são DEFERRABLE: sem checá-las agora, o ALTER TABLE seguinte falharia com "pending
+        # trigger events".
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def remover_triggers(apps, schema_editor):
+    # O trigger de clinica_horariodisponivel referencia clinica_consulta, e os de clinica_consulta referenciam
+    # clinica_horariodisponivel: impediriam o SQLite de recriar a tabela.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQL_TRIGGERS_RESTRICAO["remover"]:
+        schema_editor.execute(sql)
+
+
+def recriar_triggers(apps, schema_editor):
+    # No SQLite o AddConstraint recria clinica_horariodisponivel e descarta os triggers da restrição
+    # veterinário/horário. Nos outros bancos nada se perde.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQL_TRIGGERS_RESTRICAO["criar"]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinica", "0008_versoes_registros"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_duplicados, migrations.RunPython.noop),
+        migrations.RunPython(remover_triggers, recriar_triggers),
+        migrations.RemoveIndex(
+            model_name="horariodisponivel",
+            name="horario_vet_data_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="horariodisponivel",
+            constraint=models.UniqueConstraint(fields=("veterinario", "data"), name="horario_vet_data_uniq"),
+        ),
+        migrations.RunPython(recriar_triggers, remover_triggers),
+    ]
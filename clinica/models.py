@@ -1,10 +1,44 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
     BaseUserManager,
 )
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .arquivos import armazenamento_privado
+from .busca import texto_busca_pet, texto_busca_prontuario
+from .cache import invalidar_painel_veterinario
+from .imagens import agendar_variantes, preparar_upload
+from .restricoes import RESTRICAO_VETERINARIO_HORARIO
+
+
+# =====================
+# EXCEPTIONS
+# =====================
+
+
+MENSAGEM_VETERINARIO_HORARIO = (
+    "O veterinário da consulta deve ser o mesmo cadastrado no Horário Disponível selecionado."
+)
+
+
+class HorarioIndisponivelError(ValidationError):
+    def __init__(self, message="Este horário não está mais disponível.", *args, **kwargs):
+        super().__init__(message, *args, **kwargs)
+
+
+# =====================
+# HELPERS
+# =====================
+
+
+def _incluir_update_fields(kwargs, *campos):
+    """Acrescenta ``campos`` ao ``update_fields`` do save(), quando informado."""
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None:
+        kwargs["update_fields"] = {*update_fields, *campos}
 
 
 # =====================
@@ -58,15 +92,38 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["nome", "sobrenome", "cpf", "user_type"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Lê direto do __dict__ para não disparar consultas quando os campos foram adiados (only/defer).
+        self._nome_original = (self.__dict__.get("nome"), self.__dict__.get("sobrenome"))
+
     def __str__(self):
         return f"{self.nome} ({self.user_type})"
 
+    def save(self, *args, **kwargs):
+        nome_atual = (self.__dict__.get("nome"), self.__dict__.get("sobrenome"))
+        nome_alterado = not self._state.adding and nome_atual != self._nome_original
+        super().save(*args, **kwargs)
+        self._nome_original = nome_atual
+
+        if nome_alterado and self.user_type == "cliente":
+            # O nome do tutor faz parte da coluna de busca dos pets dele.
+            pets = list(self.pet_set.only("id", "nome"))
+            agora = timezone.now()
+            for pet in pets:
+                pet.busca = texto_busca_pet(pet, tutor=self)
+                pet.atualizado_em = agora
+            Pet.objects.bulk_update(pets, ["busca", "atualizado_em"])
+
     def get_full_name(self):
         return f"{self.nome} {self.sobrenome}"
 
     class Meta:
         verbose_name = "Usuário"
         verbose_name_plural = "Usuários"
+        indexes = [
+            models.Index(fields=["user_type", "nome"], name="usuario_tipo_nome_idx"),
+        ]
 
 
 class VeterinarioInfo(models.Model):
@@ -128,10 +185,18 @@ class ClientePerfil(models.Model):
     estado = models.CharField(max_length=2, choices=UF_CHOICES, blank=True, null=True)
     bairro = models.CharField(max_length=100, blank=True, null=True)
     numero = models.CharField(max_length=10, blank=True, null=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Perfil de {self.user.get_full_name()}"
 
+    def save(self, *args, **kwargs):
+        nova_foto = preparar_upload(self, "foto_user")
+        _incluir_update_fields(kwargs, "atualizado_em")
+        super().save(*args, **kwargs)
+        if nova_foto:
+            agendar_variantes(self.foto_user, tutor=self.user_id)
+
     class Meta:
         verbose_name = "Perfil do Cliente"
         verbose_name_plural = "Perfis dos Clientes"
@@ -165,13 +230,26 @@ class Pet(models.Model):
     vacinas_em_dia = models.BooleanField(default=False)
     alergias = models.TextField(blank=True, null=True)
     doencas = models.TextField(blank=True, null=True)
+    busca = models.CharField(max_length=255, blank=True, default="", editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.nome} ({self.especie})"
 
+    def save(self, *args, **kwargs):
+        self.busca = texto_busca_pet(self)
+        nova_foto = preparar_upload(self, "foto_pet")
+        _incluir_update_fields(kwargs, "busca", "atualizado_em")
+        super().save(*args, **kwargs)
+        if nova_foto:
+            agendar_variantes(self.foto_pet, tutor=self.tutor_id)
+
     class Meta:
         verbose_name = "Pet"
         verbose_name_plural = "Pets"
+        indexes = [
+            models.Index(fields=["tutor", "nome"], name="pet_tutor_nome_idx"),
+        ]
 
 
 class Consulta(models.Model):
@@ -204,33 +282,70 @@ class Consulta(models.Model):
         default="MARCADA",
         verbose_name="Status da Consulta",
     )
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         data_formatada = self.horario_agendado.data.strftime("%d/%m/%Y às %H:%M")
         return f"Consulta {self.pet.nome} - {self.veterinario.get_full_name()} ({data_formatada})"
 
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
+        """Salva a consulta comparando apenas ids, sem carregar veterinário nem horário.
 
-        if self.veterinario != self.horario_agendado.veterinario:
-            raise ValidationError(
-                "O veterinário da consulta deve ser o mesmo cadastrado no Horário Disponível selecionado."
-            )
+        Orçamento de consultas SQL (além dos SAVEPOINTs):
+        - agendamento: 2 (UPDATE condicional do horário + INSERT);
+        - cancelamento: 2 (UPDATE do horário + UPDATE da consulta);
+        - demais alterações: 1 (UPDATE da consulta, restrito a ``update_fields`` quando informado).
 
-        if is_new:
-            self.horario_agendado.disponivel = False
-            self.horario_agendado.save()
+        A regra "veterinário da consulta = veterinário do horário" fica no banco (ver clinica.restricoes);
+        aqui ela só é antecipada quando o horário já está carregado, para dar uma mensagem amigável.
+        """
+        is_new = self._state.adding
 
-        elif self.status == "CANCELADA" and not self.horario_agendado.disponivel:
-            self.horario_agendado.disponivel = True
-            self.horario_agendado.save()
+        if Consulta.horario_agendado.is_cached(self) and self.veterinario_id != self.horario_agendado.veterinario_id:
+            raise ValidationError(MENSAGEM_VETERINARIO_HORARIO)
 
-        super().save(*args, **kwargs)
+        if is_new:
+            try:
+                with transaction.atomic():
+                    if not HorarioDisponivel.objects.reservar(self.horario_agendado_id):
+                        raise HorarioIndisponivelError()
+                    super().save(*args, **kwargs)
+            except IntegrityError as erro:
+                if RESTRICAO_VETERINARIO_HORARIO in str(erro):
+                    raise ValidationError(MENSAGEM_VETERINARIO_HORARIO)
+                raise HorarioIndisponivelError()
+
+            if Consulta.horario_agendado.is_cached(self):
+                self.horario_agendado.disponivel = False
+            invalidar_painel_veterinario(self.veterinario_id)
+            return
+
+        update_fields = kwargs.get("update_fields")
+        _incluir_update_fields(kwargs, "atualizado_em")
+        if self.status == "CANCELADA" and (update_fields is None or "status" in update_fields):
+            with transaction.atomic():
+                liberados = HorarioDisponivel.objects.filter(pk=self.horario_agendado_id, disponivel=False).update(
+                    disponivel=True
+                )
+                super().save(*args, **kwargs)
+            if liberados and Consulta.horario_agendado.is_cached(self):
+                self.horario_agendado.disponivel = True
+        else:
+            try:
+                super().save(*args, **kwargs)
+            except IntegrityError as erro:
+                if RESTRICAO_VETERINARIO_HORARIO in str(erro):
+                    raise ValidationError(MENSAGEM_VETERINARIO_HORARIO)
+                raise
+        invalidar_painel_veterinario(self.veterinario_id)
 
     class Meta:
         verbose_name = "Consulta"
         verbose_name_plural = "Consultas"
         ordering = ["horario_agendado__data"]
+        indexes = [
+            models.Index(fields=["veterinario", "status"], name="consulta_vet_status_idx"),
+        ]
 
 
 # =====================
@@ -238,6 +353,16 @@ class Consulta(models.Model):
 # =====================
 
 
+class HorarioDisponivelQuerySet(models.QuerySet):
+    def reservar(self, horario_id):
+        """Marca o horário como indisponível se ainda estiver livre.
+
+        É uma única UPDATE condicional: entre requisições concorrentes, apenas uma
+        recebe True.
+        """
+        return self.filter(pk=horario_id, disponivel=True).update(disponivel=False) == 1
+
+
 class HorarioDisponivel(models.Model):
     veterinario = models.ForeignKey(
         CustomUser,
@@ -248,6 +373,15 @@ class HorarioDisponivel(models.Model):
     disponivel = models.BooleanField(default=True)
     disponivel = models.BooleanField(default=True)
 
+    objects = HorarioDisponivelQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        horario = super().from_db(db, field_names, values)
+        # Veterinário lido do banco: se um save trocá-lo, clinica.sinais invalida também a agenda do anterior.
+        horario._veterinario_carregado_id = horario.__dict__.get("veterinario_id")
+        return horario
+
     def __str__(self):
         status = "Disponível" if self.disponivel else "Indisponível"
         return f"{self.veterinario} - {self.data.strftime('%d/%m/%Y %H:%M')} ({status})"
@@ -255,6 +389,18 @@ class HorarioDisponivel(models.Model):
     class Meta:
         verbose_name = "Horário Disponível"
         verbose_name_plural = "Horários Disponíveis"
+        # A constraint também serve de índice para (veterinario, data); ela substituiu o horario_vet_data_idx.
+        constraints = [
+            models.UniqueConstraint(fields=["veterinario", "data"], name="horario_vet_data_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["data", "id"], name="horario_data_idx"),
+            models.Index(
+                fields=["veterinario", "data"],
+                condition=models.Q(disponivel=True),
+                name="horario_disp_vet_data_idx",
+            ),
+        ]
 
 
 # =====================
@@ -269,9 +415,17 @@ class Prontuario(models.Model):
     diagnostico = models.TextField(verbose_name="Diagnóstico")
     exames_realizados = models.TextField(blank=True, null=True, verbose_name="Exames Realizados")
     imunizacao_aplicada = models.TextField(blank=True, null=True, verbose_name="Imunização Aplicada")
-    receita_prescrita = models.FileField(upload_to="receitas/", blank=True, null=True, verbose_name="Receita Prescrita")
+    receita_prescrita = models.FileField(
+        upload_to="receitas/",
+        storage=armazenamento_privado,
+        blank=True,
+        null=True,
+        verbose_name="Receita Prescrita",
+    )
     observacoes = models.TextField(blank=True, null=True, verbose_name="Observações Adicionais")
     criada_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    busca = models.TextField(blank=True, default="", editable=False)
 
     def __str__(self):
         return f"Prontuário - {self.consulta.pet.nome}"
@@ -279,11 +433,42 @@ class Prontuario(models.Model):
     class Meta:
         verbose_name = "Prontuário"
         verbose_name_plural = "Prontuários"
+        indexes = [
+            models.Index(fields=["criada_em"], name="prontuario_criada_em_idx"),
+        ]
+
+    def ids_consulta(self):
+        """(veterinario_id, horario_agendado_id) da consulta, sem carregá-la inteira.
+
+        Com ``consulta`` já carregada não consulta o banco; senão lê os dois ids num único SELECT, guardado
+        na instância para que save() e o receiver de clinica.sinais não repitam a leitura.
+        """
+        if Prontuario.consulta.is_cached(self):
+            return self.consulta.veterinario_id, self.consulta.horario_agendado_id
+        lidos = getattr(self, "_ids_consulta", None)
+        if lidos is None or lidos[0] != self.consulta_id:
+            ids = Consulta.objects.filter(pk=self.consulta_id).values_list("veterinario_id", "horario_agendado_id")
+            lidos = self._ids_consulta = (self.consulta_id, ids.get())
+        return lidos[1]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.finalizado:
-            consulta = self.consulta
-            consulta.status = "REALIZADA"
-            consulta.save(update_fields=["status"])
+        """Salva o prontuário e, se finalizado, marca a consulta como REALIZADA.
+
+        Orçamento de consultas SQL (além dos SAVEPOINTs), com ``consulta`` já carregada: 1 para rascunho
+        (INSERT/UPDATE do prontuário) e 2 ao finalizar (mais um UPDATE direto do status da consulta, sem
+        passar por Consulta.save). Sem ela, mais um SELECT dos ids do veterinário e do horário (ids_consulta).
+        """
+        # O índice de texto (GIN ou FTS5) acompanha a coluna, então cada save reindexa só este prontuário.
+        self.busca = texto_busca_prontuario(self)
+        _incluir_update_fields(kwargs, "busca", "atualizado_em")
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.finalizado:
+                Consulta.objects.filter(pk=self.consulta_id).exclude(status="REALIZADA").update(
+                    status="REALIZADA", atualizado_em=timezone.now()
+                )
+
+        if self.finalizado and Prontuario.consulta.is_cached(self):
+            self.consulta.status = "REALIZADA"
+        invalidar_painel_veterinario(self.ids_consulta()[0])
@@ -0,0 +1,173 @@
+import json
+from datetime import datetime
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+# =====================
+# CURSOR PAGINATION
+# =====================
+
+
+SALT_CURSOR = "clinica.paginacao.cursor"
+
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    # O DjangoJSONEncoder corta datetimes em milissegundos; com microssegundos na coluna, o filtro "depois
+    # do cursor" voltaria a incluir a última linha da página anterior. Vai a precisão inteira, marcada.
+    def default(self, o):
+        if isinstance(o, datetime):
+            return {"dt": o.isoformat()}
+        return super().default(o)
+
+
+def _decodificar_cursor(obj):
+    if obj.keys() == {"dt"}:
+        return datetime.fromisoformat(obj["dt"])
+    return obj
+
+
+class _SerializadorCursor:
+    def dumps(self, obj):
+        return json.dumps(obj, cls=_CodificadorCursor, separators=(",", ":")).encode("latin-1")
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"), object_hook=_decodificar_cursor)
+
+
+class PaginaCursor:
+    """Página de uma paginação por cursor, com os tokens opacos da próxima página e da anterior."""
+
+    def __init__(self, object_list, proximo_cursor=None, cursor_anterior=None):
+        self.object_list = object_list
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def has_next(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _valor(obj, campo):
+    for atributo in campo.split("__"):
+        obj = getattr(obj, atributo)
+    return obj
+
+
+def _gerar_token(obj, campos, direcao):
+    valores = [_valor(obj, campo.lstrip("-")) for campo in campos]
+    return signing.dumps({"v": valores, "d": direcao}, salt=SALT_CURSOR, serializer=_SerializadorCursor)
+
+
+def _ler_token(token, campos):
+    try:
+        dados = signing.loads(token, salt=SALT_CURSOR, serializer=_SerializadorCursor)
+    except (signing.BadSignature, ValueError):
+        return None, None
+    if not isinstance(dados, dict) or len(dados.get("v") or []) != len(campos) or dados.get("d") not in ("n", "p"):
+        return None, None
+    return dados["v"], dados["d"]
+
+
+def _filtro_apos(campos, valores):
+    """Equivalente a (campo1, campo2, ...) > (valor1, valor2, ...) respeitando a direção de cada campo."""
+    filtro = Q()
+    iguais = {}
+    for campo, valor in zip(campos, valores):
+        nome = campo.lstrip("-")
+        operador = "lt" if campo.startswith("-") else "gt"
+        filtro |= Q(**iguais, **{f"{nome}__{operador}": valor})
+        iguais[nome] = valor
+
+    # Limite redundante na primeira coluna, para o banco poder fazer um range scan no índice.
+    primeiro = campos[0].lstrip("-")
+    return Q(**{f"{primeiro}__{'lte' if campos[0].startswith('-') else 'gte'}": valores[0]}) & filtro
+
+
+def _inverter(campos):
+    return [campo[1:] if campo.startswith("-") else f"-{campo}" for campo in campos]
+
+
+def paginar_por_cursor(queryset, campos, cursor=None, tamanho=10):
+    """Pagina o queryset por keyset, sem COUNT nem OFFSET.
+
+    ``campos`` é a ordenação da listagem e precisa ser única (termine com ``id``). Cada página custa uma
+    única consulta de ``tamanho + 1`` linhas, qualquer que seja a profundidade. Tokens inválidos ou
+    adulterados voltam para a primeira página.
+    """
+    valores, direcao = _ler_token(cursor, campos) if cursor else (None, None)
+
+    if direcao == "p":
+        linhas = list(
+            queryset.filter(_filtro_apos(_inverter(campos), valores)).order_by(*_inverter(campos))[: tamanho + 1]
+        )
+        tem_anterior = len(linhas) > tamanho
+        linhas = linhas[:tamanho][::-1]
+        tem_proxima = True
+    else:
+        if valores is not None:
+            queryset = queryset.filter(_filtro_apos(campos, valores))
+        linhas = list(queryset.order_by(*campos)[: tamanho + 1])
+        tem_proxima = len(linhas) > tamanho
+        linhas = linhas[:tamanho]
+        tem_anterior = valores is not None
+
+    if not linhas:
+        return PaginaCursor([])
+    return PaginaCursor(
+        linhas,
+        proximo_cursor=_gerar_token(linhas[-1], campos, "n") if tem_proxima else None,
+        cursor_anterior=_gerar_token(linhas[0], campos, "p") if tem_anterior else None,
+    )
+
+
+# =====================
+# ESTIMATED COUNTS
+# =====================
+
+
+class ContagemEstimadaPaginator(Paginator):
+    """Paginator que, no PostgreSQL, usa a estimativa do planner (pg_class.reltuples) como total de linhas
+    quando o queryset não tem filtros, evitando um COUNT(*) sobre a tabela inteira a cada página.
+
+    Tabelas pequenas (ou nunca analisadas) continuam com a contagem exata.
+    """
+
+    LIMITE_CONTAGEM_EXATA = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            conexao = connections[queryset.db]
+            if conexao.vendor == "postgresql":
+                with conexao.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [queryset.model._meta.db_table],
+                    )
+                    linha = cursor.fetchone()
+                if linha and linha[0] >= self.LIMITE_CONTAGEM_EXATA:
+                    return linha[0]
+        return super().count
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+
+# =====================
+# SQL AND TEMPLATE TIMING
+# =====================
+
+
+class MedicaoSQL:
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, repr(params), time.perf_counter() - inicio))
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def tempo(self):
+        return sum(duracao for _, _, duracao in self.consultas)
+
+    def duplicadas(self):
+        """Retorna {sql: ocorrências} das consultas idênticas (mesmo SQL e parâmetros) repetidas."""
+        repetidas = Counter()
+        for (sql, _), vezes in Counter((sql, params) for sql, params, _ in self.consultas).items():
+            if vezes > 1:
+                repetidas[sql] += vezes
+        return dict(repetidas)
+
+    def similares(self):
+        """Retorna {sql: ocorrências} do mesmo SQL repetido com parâmetros diferentes, o padrão de um N+1."""
+        contagem = Counter(sql for sql, _, _ in self.consultas)
+        return {sql: vezes for sql, vezes in contagem.items() if vezes > 1}
+
+
+@contextmanager
+def medir_sql(using=None):
+    """Registra as consultas executadas (e o tempo de cada uma) nas conexões informadas."""
+    aliases = [using] if using else list(connections)
+    medicao = MedicaoSQL()
+    with ExitStack() as pilha:
+        for alias in aliases:
+            pilha.enter_context(connections[alias].execute_wrapper(medicao))
+        yield medicao
+
+
+class MedicaoTemplates:
+    def __init__(self):
+        self.tempo = 0.0
+
+
+_estado_templates = threading.local()
+_render_original = None
+
+
+def _render_medido(self, context):
+    medicoes = getattr(_estado_templates, "medicoes", None)
+    if not medicoes or getattr(_estado_templates, "renderizando", False):
+        return _render_original(self, context)
+
+    # Só o render mais externo é cronometrado; includes e extends já estão dentro dele.
+    _estado_templates.renderizando = True
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        duracao = time.perf_counter() - inicio
+        for medicao in medicoes:
+            medicao.tempo += duracao
+        _estado_templates.renderizando = False
+
+
+def instalar_medicao_templates():
+    global _render_original
+    if _render_original is None:
+        _render_original = Template.render
+        Template.render = _render_medido
+
+
+@contextmanager
+def medir_templates():
+    """Acumula o tempo gasto renderizando templates na thread atual."""
+    instalar_medicao_templates()
+    medicao = MedicaoTemplates()
+    if not hasattr(_estado_templates, "medicoes"):
+        _estado_templates.medicoes = []
+    _estado_templates.medicoes.append(medicao)
+    try:
+        yield medicao
+    finally:
+        _estado_templates.medicoes.remove(medicao)
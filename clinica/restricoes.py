@@ -0,0 +1,64 @@
+# =====================
+# VET / SLOT CONSISTENCY
+# =====================
+
+
+# Nome usado tanto na FK composta do PostgreSQL quanto na mensagem do trigger do SQLite, para que
+# Consulta.save reconheça a violação no IntegrityError.
+RESTRICAO_VETERINARIO_HORARIO = "consulta_horario_veterinario_fk"
+
+_MENSAGEM_SQLITE = f"{RESTRICAO_VETERINARIO_HORARIO}: veterinário difere do horário"
+
+SQL_RESTRICAO_VETERINARIO_HORARIO = {
+    "postgresql": {
+        # A FK composta exige uma chave única em (id, veterinario_id) do lado do horário. ON UPDATE CASCADE
+        # leva a consulta junto quando o atendente troca o veterinário de um horário já agendado.
+        "criar": [
+            "ALTER TABLE clinica_horariodisponivel DROP CONSTRAINT IF EXISTS horario_id_veterinario_uniq",
+            "ALTER TABLE clinica_horariodisponivel "
+            "ADD CONSTRAINT horario_id_veterinario_uniq UNIQUE (id, veterinario_id)",
+            f"ALTER TABLE clinica_consulta DROP CONSTRAINT IF EXISTS {RESTRICAO_VETERINARIO_HORARIO}",
+            f"ALTER TABLE clinica_consulta ADD CONSTRAINT {RESTRICAO_VETERINARIO_HORARIO} "
+            "FOREIGN KEY (horario_agendado_id, veterinario_id) "
+            "REFERENCES clinica_horariodisponivel (id, veterinario_id) ON UPDATE CASCADE",
+        ],
+        "remover": [
+            f"ALTER TABLE clinica_consulta DROP CONSTRAINT IF EXISTS {RESTRICAO_VETERINARIO_HORARIO}",
+            "ALTER TABLE clinica_horariodisponivel DROP CONSTRAINT IF EXISTS horario_id_veterinario_uniq",
+        ],
+    },
+    "sqlite": {
+        "criar": [
+            f"CREATE TRIGGER IF NOT EXISTS {RESTRICAO_VETERINARIO_HORARIO}_ai BEFORE INSERT ON clinica_consulta "
+            "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+            f"WHERE id = NEW.horario_agendado_id) BEGIN SELECT RAISE(ABORT, '{_MENSAGEM_SQLITE}'); END",
+            f"CREATE TRIGGER IF NOT EXISTS {RESTRICAO_VETERINARIO_HORARIO}_au "
+            "BEFORE UPDATE OF veterinario_id, horario_agendado_id ON clinica_consulta "
+            "WHEN NEW.veterinario_id IS NOT (SELECT veterinario_id FROM clinica_horariodisponivel "
+            f"WHERE id = NEW.horario_agendado_id) BEGIN SELECT RAISE(ABORT, '{_MENSAGEM_SQLITE}'); END",
+            f"CREATE TRIGGER IF NOT EXISTS {RESTRICAO_VETERINARIO_HORARIO}_horario_au "
+            "AFTER UPDATE OF veterinario_id ON clinica_horariodisponivel BEGIN "
+            "UPDATE clinica_consulta SET veterinario_id = NEW.veterinario_id WHERE horario_agendado_id = NEW.id; END",
+        ],
+        "remover": [
+            f"DROP TRIGGER IF EXISTS {RESTRICAO_VETERINARIO_HORARIO}_ai",
+            f"DROP TRIGGER IF EXISTS {RESTRICAO_VETERINARIO_HORARIO}_au",
+            f"DROP TRIGGER IF EXISTS {RESTRICAO_VETERINARIO_HORARIO}_horario_au",
+        ],
+    },
+}
+
+
+def criar_restricao_veterinario_horario(schema_editor):
+    """Garante no banco que a consulta tem o mesmo veterinário do horário agendado. É idempotente.
+
+    No SQLite a regra é feita por triggers, que se perdem quando uma migração recria clinica_consulta ou
+    clinica_horariodisponivel; nesse caso rode esta função de novo numa migração.
+    """
+    for sql in SQL_RESTRICAO_VETERINARIO_HORARIO.get(schema_editor.connection.vendor, {}).get("criar", []):
+        schema_editor.execute(sql)
+
+
+def remover_restricao_veterinario_horario(schema_editor):
+    for sql in SQL_RESTRICAO_VETERINARIO_HORARIO.get(schema_editor.connection.vendor, {}).get("remover", []):
+        schema_editor.execute(sql)
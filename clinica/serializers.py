@@ -0,0 +1,97 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from .models import Consulta, CustomUser, HorarioDisponivel, HorarioIndisponivelError, Pet
+
+
+# =====================
+# API SERIALIZERS
+# =====================
+
+
+class CamposDinamicosMixin:
+    """Permite ao cliente pedir só alguns campos com ``?campos=id,nome`` (campos desconhecidos são ignorados)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        campos = request.query_params.get("campos") if request else None
+        if campos:
+            pedidos = {campo.strip() for campo in campos.split(",")}
+            for campo in set(self.fields) - pedidos:
+                self.fields.pop(campo)
+
+
+class VeterinarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Espera um queryset com ``select_related("veterinarioinfo")``."""
+
+    crmv = serializers.CharField(source="veterinarioinfo.crmv", default=None, read_only=True)
+
+    class Meta:
+        model = CustomUser
+        fields = ["id", "nome", "sobrenome", "crmv"]
+
+
+class HorarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = HorarioDisponivel
+        fields = ["id", "veterinario", "data"]
+
+
+class PetSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    foto = serializers.ImageField(source="foto_pet", read_only=True)
+
+    class Meta:
+        model = Pet
+        fields = ["id", "nome", "especie", "raca", "peso", "vacinas_em_dia", "alergias", "doencas", "foto"]
+
+
+class ConsultaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Espera um queryset com ``select_related("pet", "veterinario", "horario_agendado")``."""
+
+    data = serializers.DateTimeField(source="horario_agendado.data", read_only=True)
+    pet_nome = serializers.CharField(source="pet.nome", read_only=True)
+    veterinario_nome = serializers.CharField(source="veterinario.get_full_name", read_only=True)
+
+    class Meta:
+        model = Consulta
+        fields = [
+            "id",
+            "status",
+            "motivo",
+            "data",
+            "horario_agendado",
+            "pet",
+            "pet_nome",
+            "veterinario",
+            "veterinario_nome",
+        ]
+
+
+class AgendamentoSerializer(serializers.ModelSerializer):
+    """Cria uma consulta MARCADA. O veterinário é o dono do horário escolhido."""
+
+    horario_agendado = serializers.PrimaryKeyRelatedField(
+        queryset=HorarioDisponivel.objects.filter(disponivel=True),
+        error_messages={"does_not_exist": "Este horário não está mais disponível."},
+    )
+
+    class Meta:
+        model = Consulta
+        fields = ["id", "pet", "horario_agendado", "motivo"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request and request.user.user_type == "cliente":
+            self.fields["pet"].queryset = Pet.objects.filter(tutor=request.user)
+
+    def create(self, validated_data):
+        horario = validated_data["horario_agendado"]
+        try:
+            return Consulta.objects.create(**validated_data, veterinario_id=horario.veterinario_id, status="MARCADA")
+        except HorarioIndisponivelError:
+            # Outra requisição reservou o horário depois da validação; a view responde 409.
+            raise
+        except DjangoValidationError as erro:
+            raise serializers.ValidationError(erro.messages)
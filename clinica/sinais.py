@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidar_escopos
+from .models import Consulta, CustomUser, HorarioDisponivel, Pet, Prontuario
+
+
+# =====================
+# CACHE INVALIDATION
+# =====================
+
+
+# Os fragmentos em cache (cartões de pets, linhas de consultas) usam as versões dos namespaces do tutor,
+# do veterinário e do horário na chave, e o JSON de horários livres usa a do namespace "agenda" do veterinário;
+# estes receivers trocam a versão quando algo exibido neles muda. Atualizações em massa (QuerySet.update,
+# bulk_create, bulk_update) não disparam sinais: quem as faz invalida à mão.
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidar_usuario(sender, instance, update_fields=None, **kwargs):
+    # O login grava só last_login; o nome é o que aparece nos fragmentos.
+    if update_fields is not None and not {"nome", "sobrenome"} & set(update_fields):
+        return
+    if instance.user_type == "cliente":
+        invalidar_escopos(tutor=instance.pk)
+    elif instance.user_type == "veterinario":
+        invalidar_escopos(veterinario=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Pet)
+def invalidar_pet(sender, instance, **kwargs):
+    invalidar_escopos(tutor=instance.tutor_id)
+
+
+@receiver([post_save, post_delete], sender=Consulta)
+def invalidar_consulta(sender, instance, created=False, update_fields=None, **kwargs):
+    invalidar_escopos(horario=instance.horario_agendado_id)
+    # Agendar reserva o horário e cancelar o libera, ambos por UPDATE direto (ver Consulta.save).
+    cancelou = instance.status == "CANCELADA" and (update_fields is None or "status" in update_fields)
+    if created or cancelou:
+        invalidar_escopos(agenda=instance.veterinario_id)
+
+
+@receiver([post_save, post_delete], sender=Prontuario)
+def invalidar_prontuario(sender, instance, created=True, **kwargs):
+    # A lista do veterinário mostra se a consulta tem prontuário, e finalizar o prontuário muda o status da
+    # consulta por um UPDATE direto (ver Prontuario.save). Rascunhos salvos de novo não mudam nada disso.
+    if created or instance.finalizado:
+        invalidar_escopos(horario=instance.ids_consulta()[1])
+
+
+@receiver([post_save, post_delete], sender=HorarioDisponivel)
+def invalidar_horario(sender, instance, **kwargs):
+    invalidar_escopos(horario=instance.pk, agenda=instance.veterinario_id)
+    anterior_id = getattr(instance, "_veterinario_carregado_id", None)
+    if anterior_id != instance.veterinario_id:
+        invalidar_escopos(agenda=anterior_id)
+    instance._veterinario_carregado_id = instance.veterinario_id
@@ -0,0 +1,29 @@
+from django import template
+
+from ..cache import ESCOPOS_CACHE, tempo_cache_fragmentos as _tempo_cache_fragmentos, versao_escopo
+
+register = template.Library()
+
+
+@register.simple_tag
+def tempo_cache_fragmentos():
+    """Validade, em segundos, para usar como primeiro argumento do ``{% cache %}``."""
+    return _tempo_cache_fragmentos()
+
+
+@register.simple_tag(takes_context=True)
+def versao_cache(context, **escopos):
+    """Versões dos namespaces de que um fragmento depende, para compor a chave do ``{% cache %}``.
+
+    ``{% versao_cache tutor=pet.tutor_id horario=consulta.horario_agendado_id as versao %}``. Cada
+    namespace é lido do cache uma única vez por renderização, mesmo dentro de um ``{% for %}``.
+    """
+    lidas = context.render_context.setdefault("clinica_versoes_cache", {})
+    partes = []
+    for escopo, id_ in sorted(escopos.items()):
+        if escopo not in ESCOPOS_CACHE:
+            raise template.TemplateSyntaxError(f"versao_cache: namespace desconhecido {escopo!r}.")
+        if (escopo, id_) not in lidas:
+            lidas[escopo, id_] = versao_escopo(escopo, id_)
+        partes.append(f"{escopo}{lidas[escopo, id_]}")
+    return "-".join(partes)
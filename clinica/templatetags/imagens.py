@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from clinica.imagens import nome_variante, variantes_disponiveis
+
+register = template.Library()
+
+
+def _srcset(arquivo, larguras, extensao):
+    return format_html_join(
+        ", ",
+        "{} {}w",
+        ((arquivo.storage.url(nome_variante(arquivo.name, largura, extensao)), largura) for largura in larguras),
+    )
+
+
+@register.simple_tag
+def imagem_responsiva(arquivo, alt="", classe="", sizes="100vw"):
+    """``<picture>`` com as variantes WebP e JPEG de um campo de imagem e ``srcset`` por largura.
+
+    Enquanto as variantes ainda não foram geradas, cai para um ``<img>`` com o arquivo original.
+    """
+    larguras = variantes_disponiveis(arquivo)
+    if not larguras:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', arquivo.url, alt, classe)
+
+    src = arquivo.storage.url(nome_variante(arquivo.name, larguras[len(larguras) // 2], "jpg"))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        _srcset(arquivo, larguras, "webp"),
+        sizes,
+        src,
+        _srcset(arquivo, larguras, "jpg"),
+        sizes,
+        alt,
+        classe,
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_cursor(context, parametro, token):
+    """Query string da requisição atual com o cursor ``parametro`` trocado por ``token``."""
+    query = context["request"].GET.copy()
+    query[parametro] = token
+    return f"?{query.urlencode()}"
@@ -1 +1,1586 @@
-# Create your tests here.
+import gzip
+import json
+import os
+import runpy
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as hora_do_dia, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock, skipIf, skipUnless
+
+import brotli
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.utils import timezone
+from PIL import Image
+
+from .agenda import expandir_agenda, gerar_horarios_recorrentes
+from .busca import filtro_busca_pets
+from .cache import CacheArquivo, CacheMemoria, estatisticas_cache, medir_cache, zerar_estatisticas_cache
+from .imagens import LARGURAS_VARIANTES, nome_variante
+from .inicializacao import aquecer
+from .management.commands.benchmark_views import ORCAMENTOS, ROTAS_IGNORADAS, _nomes_rotas
+from .management.commands.calibrar_gunicorn import Command as CalibrarGunicorn, combinacoes_padrao
+from .models import ClientePerfil, Consulta, CustomUser, HorarioDisponivel, HorarioIndisponivelError, Pet, Prontuario
+from .pagination import paginar_por_cursor
+
+
+def criar_usuario(email, user_type, cpf):
+    return CustomUser.objects.create_user(
+        email=email, password="senha-teste", nome="Teste", sobrenome="SerraVet", cpf=cpf, user_type=user_type
+    )
+
+
+# Variáveis de ambiente lidas por SerraVet/settings.py que os testes controlam.
+VARIAVEIS_SETTINGS = {
+    "GUNICORN_WORKERS",
+    "GUNICORN_THREADS",
+    "SERRAVET_CACHE",
+    "SERRAVET_SESSOES",
+    "SERRAVET_DB_POOL",
+    "SERRAVET_DB_MAX_CONEXOES",
+    "SERRAVET_DB_CONN_MAX_AGE",
+    "SERRAVET_DB_WORKERS_OUTRO_SERVICO",
+    "SERRAVET_ASGI",
+}
+
+
+def carregar_settings(**ambiente):
+    """Executa SerraVet/settings.py de novo só com as variáveis de VARIAVEIS_SETTINGS informadas."""
+    with mock.patch.dict(os.environ, ambiente):
+        for nome in VARIAVEIS_SETTINGS - set(ambiente):
+            os.environ.pop(nome, None)
+        return runpy.run_path(os.path.join(settings.BASE_DIR, "SerraVet", "settings.py"))
+
+
+class AgendamentoTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+    def setUp(self):
+        self.horario = HorarioDisponivel.objects.create(
+            veterinario=self.veterinario, data=timezone.now() + timedelta(days=1)
+        )
+
+    def agendar(self, horario):
+        return Consulta.objects.create(
+            pet=self.pet, veterinario=self.veterinario, horario_agendado=horario, motivo="Check-up"
+        )
+
+    def test_agendamento_reserva_horario(self):
+        self.agendar(self.horario)
+        self.horario.refresh_from_db()
+        self.assertFalse(self.horario.disponivel)
+
+    def test_agendamento_faz_apenas_reserva_e_insercao(self):
+        horario = HorarioDisponivel.objects.get(pk=self.horario.pk)
+        with self.assertNumQueries(4):  # SAVEPOINT, UPDATE condicional, INSERT, RELEASE
+            self.agendar(horario)
+
+    def test_horario_ja_reservado_levanta_erro(self):
+        self.agendar(self.horario)
+        horario_desatualizado = HorarioDisponivel.objects.get(pk=self.horario.pk)
+        horario_desatualizado.disponivel = True
+
+        with self.assertRaises(HorarioIndisponivelError):
+            self.agendar(horario_desatualizado)
+        self.assertEqual(Consulta.objects.filter(horario_agendado=self.horario).count(), 1)
+
+    def test_horario_reservado_por_outra_requisicao(self):
+        # A requisição concorrente que ganhou a UPDATE condicional, sem threads: roda também no SQLite, onde o
+        # AgendamentoConcorrenteTestCase é pulado.
+        self.assertTrue(HorarioDisponivel.objects.reservar(self.horario.pk))
+        self.assertFalse(HorarioDisponivel.objects.reservar(self.horario.pk))
+
+        with self.assertRaises(HorarioIndisponivelError):
+            self.agendar(self.horario)
+        self.assertFalse(Consulta.objects.exists())
+        self.assertFalse(HorarioDisponivel.objects.get(pk=self.horario.pk).disponivel)
+
+    def test_view_recusa_horario_ja_reservado(self):
+        self.client.force_login(self.tutor)
+        dados = {
+            "pet": self.pet.pk,
+            "veterinario": self.veterinario.pk,
+            "horario_agendado": self.horario.pk,
+            "motivo": "Vacina",
+        }
+        self.agendar(self.horario)
+
+        resposta = self.client.post(reverse("cadastrar_consulta"), dados)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("horario_agendado", resposta.context["form"].errors)
+        self.assertEqual(Consulta.objects.count(), 1)
+
+    def test_view_responde_409_quando_perde_a_corrida(self):
+        # O formulário ainda vê o horário livre, mas outra requisição o reserva antes da UPDATE.
+        self.client.force_login(self.tutor)
+        dados = {
+            "pet": self.pet.pk,
+            "veterinario": self.veterinario.pk,
+            "horario_agendado": self.horario.pk,
+            "motivo": "Vacina",
+        }
+        with mock.patch("clinica.models.HorarioDisponivelQuerySet.reservar", return_value=False):
+            resposta = self.client.post(reverse("cadastrar_consulta"), dados)
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(
+            resposta.context["form"].errors["horario_agendado"], ["Este horário não está mais disponível."]
+        )
+        self.assertContains(resposta, "Este horário não está mais disponível.", status_code=409)
+        self.assertFalse(Consulta.objects.exists())
+
+
+class AgendaRecorrenteTestCase(TestCase):
+    # 04/03/2030 é uma segunda-feira; a semana vai até o domingo, 10/03.
+    SEGUNDA = date(2030, 3, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+
+    def horario(self, dia, hora_minuto):
+        return timezone.make_aware(datetime.combine(dia, hora_do_dia(*hora_minuto)))
+
+    def gerar(self, **opcoes):
+        parametros = {
+            "data_inicio": self.SEGUNDA,
+            "data_fim": self.SEGUNDA + timedelta(days=4),
+            "dias_semana": [0, 1, 2, 3, 4],
+            "hora_inicio": hora_do_dia(8),
+            "hora_fim": hora_do_dia(9, 45),
+            "duracao": timedelta(minutes=30),
+        }
+        parametros.update(opcoes)
+        return gerar_horarios_recorrentes(self.veterinario, **parametros)
+
+    def test_expande_dias_da_semana_sem_feriados(self):
+        quarta = self.SEGUNDA + timedelta(days=2)
+        datas = list(
+            expandir_agenda(
+                self.SEGUNDA,
+                self.SEGUNDA + timedelta(days=6),
+                [0, 2],
+                hora_do_dia(8),
+                hora_do_dia(9, 45),
+                timedelta(minutes=30),
+                feriados=[quarta],
+            )
+        )
+        # Só a segunda: a quarta é feriado e das 9h30 às 10h não cabe na janela.
+        self.assertEqual(
+            datas,
+            [
+                self.horario(self.SEGUNDA, (8, 0)),
+                self.horario(self.SEGUNDA, (8, 30)),
+                self.horario(self.SEGUNDA, (9, 0)),
+            ],
+        )
+
+    def test_pula_existentes_em_lotes(self):
+        HorarioDisponivel.objects.create(veterinario=self.veterinario, data=self.horario(self.SEGUNDA, (8, 30)))
+
+        with CaptureQueriesContext(connection) as consultas:
+            criados = self.gerar(feriados=[self.SEGUNDA + timedelta(days=2)], batch_size=4)
+
+        # 4 dias úteis (a quarta é feriado) x 3 horários, menos o que já existia, em lotes de 4.
+        self.assertEqual(criados, 11)
+        self.assertEqual(HorarioDisponivel.objects.filter(veterinario=self.veterinario).count(), 12)
+        inserts = [consulta for consulta in consultas if consulta["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+
+        self.assertEqual(self.gerar(), 3)  # só os da quarta
+        self.assertEqual(self.gerar(), 0)
+
+    def test_execucao_concorrente_nao_duplica(self):
+        bulk_create = HorarioDisponivel.objects.bulk_create
+
+        def outra_execucao_grava_antes(novos, **opcoes):
+            HorarioDisponivel.objects.create(veterinario=self.veterinario, data=novos[0].data)
+            return bulk_create(novos, **opcoes)
+
+        with mock.patch.object(HorarioDisponivel.objects, "bulk_create", side_effect=outra_execucao_grava_antes):
+            criados = self.gerar(dias_semana=[0])
+
+        # O horário gravado pela outra execução não é repetido; a contagem não distingue quem o gravou.
+        self.assertEqual(criados, 3)
+        self.assertEqual(HorarioDisponivel.objects.filter(veterinario=self.veterinario).count(), 3)
+
+    def test_banco_recusa_horario_repetido(self):
+        data = self.horario(self.SEGUNDA, (8, 0))
+        HorarioDisponivel.objects.create(veterinario=self.veterinario, data=data)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            HorarioDisponivel.objects.create(veterinario=self.veterinario, data=data)
+
+    def test_comando_gerar_horarios(self):
+        saida = StringIO()
+        call_command(
+            "gerar_horarios",
+            self.veterinario.email,
+            "--inicio",
+            "2030-03-04",
+            "--fim",
+            "2030-03-06",
+            "--dias",
+            "0,2",
+            "--hora-inicio",
+            "08:00",
+            "--hora-fim",
+            "09:00",
+            "--feriado",
+            "2030-03-06",
+            "--batch-size",
+            "1",
+            stdout=saida,
+        )
+        self.assertIn("2 horário(s) criado(s)", saida.getvalue())
+        self.assertEqual(
+            list(HorarioDisponivel.objects.order_by("data").values_list("data", flat=True)),
+            [self.horario(self.SEGUNDA, (8, 0)), self.horario(self.SEGUNDA, (8, 30))],
+        )
+
+        with self.assertRaisesMessage(CommandError, "não encontrado"):
+            call_command("gerar_horarios", "ninguem@serravet.com", "--inicio", "2030-03-04", "--fim", "2030-03-06")
+
+    def dados_formulario(self, **campos):
+        dados = {
+            "veterinario": self.veterinario.pk,
+            "data_inicio": "2030-03-04",
+            "data_fim": "2030-03-08",
+            "dias_semana": ["0", "4"],
+            "hora_inicio": "08:00",
+            "hora_fim": "09:00",
+            "duracao": "30",
+            "feriados": "08/03/2030",
+        }
+        dados.update(campos)
+        return dados
+
+    def test_formulario_limita_periodo_a_um_ano(self):
+        resposta = self.client.post(
+            reverse("criar_horarios_recorrentes"),
+            self.dados_formulario(data_inicio="2030-01-01", data_fim="2031-01-03"),
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("não pode ultrapassar um ano", resposta.context["form"].errors["data_fim"][0])
+        self.assertFalse(HorarioDisponivel.objects.exists())
+
+    def test_view_enviada_duas_vezes_nao_duplica(self):
+        url = reverse("criar_horarios_recorrentes")
+        primeira = self.client.post(url, self.dados_formulario())
+        segunda = self.client.post(url, self.dados_formulario())
+
+        self.assertRedirects(primeira, reverse("home_atendente"), fetch_redirect_response=False)
+        self.assertEqual([str(m) for m in get_messages(primeira.wsgi_request)], ["2 horário(s) criado(s) com sucesso!"])
+        self.assertEqual(
+            [str(m) for m in get_messages(segunda.wsgi_request)][-1],
+            "Nenhum horário novo a criar para a agenda informada.",
+        )
+        self.assertEqual(HorarioDisponivel.objects.count(), 2)
+
+
+class EscritaConsultaTestCase(TestCase):
+    """Orçamentos de consultas SQL documentados em Consulta.save e Prontuario.save."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.outro_veterinario = criar_usuario("vet2@serravet.com", "veterinario", "00000000003")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+    def setUp(self):
+        self.horario = HorarioDisponivel.objects.create(
+            veterinario=self.veterinario, data=timezone.now() + timedelta(days=1)
+        )
+        self.consulta = Consulta.objects.create(
+            pet=self.pet, veterinario=self.veterinario, horario_agendado=self.horario, motivo="Check-up"
+        )
+
+    def test_iniciar_consulta_faz_um_update(self):
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.status = "EM_ANDAMENTO"
+        with self.assertNumQueries(1):
+            consulta.save(update_fields=["status"])
+
+    def test_cancelar_libera_horario_sem_carregar_relacoes(self):
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        consulta.status = "CANCELADA"
+        with self.assertNumQueries(4):  # SAVEPOINT, UPDATE do horário, UPDATE da consulta, RELEASE
+            consulta.save(update_fields=["status"])
+
+        self.horario.refresh_from_db()
+        self.assertTrue(self.horario.disponivel)
+
+    def test_finalizar_prontuario(self):
+        consulta = Consulta.objects.get(pk=self.consulta.pk)
+        prontuario = Prontuario(consulta=consulta, sinais_clinicos="Tosse", diagnostico="Gripe", finalizado=True)
+        with self.assertNumQueries(4):  # SAVEPOINT, INSERT do prontuário, UPDATE do status, RELEASE
+            prontuario.save()
+
+        self.assertEqual(consulta.status, "REALIZADA")
+        self.assertEqual(Consulta.objects.get(pk=consulta.pk).status, "REALIZADA")
+
+    def test_finalizar_prontuario_sem_consulta_carregada(self):
+        prontuario = Prontuario(consulta_id=self.consulta.pk, sinais_clinicos="Tosse", diagnostico="Gripe")
+        prontuario.finalizado = True
+        # SAVEPOINT, INSERT, um único SELECT dos ids do veterinário e do horário, UPDATE do status, RELEASE.
+        with self.assertNumQueries(5), self.captureOnCommitCallbacks() as callbacks:
+            prontuario.save()
+
+        self.assertFalse(Prontuario.consulta.is_cached(prontuario))
+        self.assertEqual(prontuario.ids_consulta(), (self.veterinario.pk, self.horario.pk))
+        self.assertEqual(len(callbacks), 2)  # namespace do horário e painel do veterinário
+
+    def test_banco_exige_mesmo_veterinario_do_horario(self):
+        horario = HorarioDisponivel.objects.create(
+            veterinario=self.outro_veterinario, data=timezone.now() + timedelta(days=2)
+        )
+        with self.assertRaisesMessage(ValidationError, "mesmo cadastrado no Horário Disponível"):
+            Consulta.objects.create(
+                pet=self.pet, veterinario=self.veterinario, horario_agendado_id=horario.pk, motivo="Vacina"
+            )
+        self.assertTrue(HorarioDisponivel.objects.get(pk=horario.pk).disponivel)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Consulta.objects.filter(pk=self.consulta.pk).update(veterinario=self.outro_veterinario)
+
+    def test_trocar_veterinario_do_horario_leva_a_consulta(self):
+        HorarioDisponivel.objects.filter(pk=self.horario.pk).update(veterinario=self.outro_veterinario)
+        self.assertEqual(Consulta.objects.get(pk=self.consulta.pk).veterinario_id, self.outro_veterinario.pk)
+
+
+class ViewsAssincronasTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+        cls.horario = HorarioDisponivel.objects.create(
+            veterinario=cls.veterinario, data=timezone.now() + timedelta(days=1)
+        )
+        horario_marcado = HorarioDisponivel.objects.create(
+            veterinario=cls.veterinario, data=timezone.now() + timedelta(days=2)
+        )
+        Consulta.objects.create(pet=pet, veterinario=cls.veterinario, horario_agendado=horario_marcado, motivo="Rotina")
+
+    async def test_horarios_disponiveis(self):
+        url = reverse("obter_horarios_disponiveis_ajax")
+        resposta = await self.async_client.get(url, {"veterinario_id": self.veterinario.id})
+        self.assertEqual([horario["id"] for horario in resposta.json()], [self.horario.id])
+
+        resposta = await self.async_client.get(url, {"veterinario_id": "x"})
+        self.assertEqual(resposta.json(), [])
+
+    async def test_contadores_painel(self):
+        url = reverse("contadores_painel_vet")
+        await self.async_client.aforce_login(self.veterinario)
+        resposta = await self.async_client.get(url)
+        self.assertEqual(
+            resposta.json(), {"count_em_andamento": 0, "count_marcadas": 1, "count_prontuarios_pendentes": 0}
+        )
+
+        await self.async_client.aforce_login(self.tutor)
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+
+
+class CacheHorariosDisponiveisTestCase(TestCase):
+    """O JSON de horários livres fica em cache; cada escrita que muda a agenda precisa refletir na resposta."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.outro_veterinario = criar_usuario("vet2@serravet.com", "veterinario", "00000000003")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+    def setUp(self):
+        cache.clear()
+        self.horario = HorarioDisponivel.objects.create(
+            veterinario=self.veterinario, data=timezone.now() + timedelta(days=1)
+        )
+
+    def livres(self, veterinario):
+        resposta = self.client.get(reverse("obter_horarios_disponiveis_ajax"), {"veterinario_id": veterinario.id})
+        return [horario["id"] for horario in resposta.json()]
+
+    def dados_horario(self, veterinario, dias):
+        data = timezone.localtime(timezone.now() + timedelta(days=dias))
+        return {"veterinario": veterinario.pk, "data": data.strftime("%Y-%m-%d %H:%M"), "disponivel": "on"}
+
+    def test_agendar_e_cancelar(self):
+        self.assertEqual(self.livres(self.veterinario), [self.horario.id])
+
+        self.client.force_login(self.tutor)
+        dados = {
+            "pet": self.pet.pk,
+            "veterinario": self.veterinario.pk,
+            "horario_agendado": self.horario.pk,
+            "motivo": "Vacina",
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("cadastrar_consulta"), dados)
+        self.assertEqual(self.livres(self.veterinario), [])
+
+        consulta = Consulta.objects.get(horario_agendado=self.horario)
+        consulta.status = "CANCELADA"
+        with self.captureOnCommitCallbacks(execute=True):
+            consulta.save(update_fields=["status"])
+        self.assertEqual(self.livres(self.veterinario), [self.horario.id])
+
+    def test_criar_editar_e_excluir_horario(self):
+        self.assertEqual(self.livres(self.veterinario), [self.horario.id])
+        self.assertEqual(self.livres(self.outro_veterinario), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("criar_horario"), self.dados_horario(self.veterinario, 2))
+        novo = HorarioDisponivel.objects.latest("id")
+        self.assertEqual(self.livres(self.veterinario), [self.horario.id, novo.id])
+
+        # Trocar o veterinário muda a agenda dos dois.
+        url = reverse("editar_horario", args=[novo.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, self.dados_horario(self.outro_veterinario, 2))
+        self.assertEqual(self.livres(self.veterinario), [self.horario.id])
+        self.assertEqual(self.livres(self.outro_veterinario), [novo.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("excluir_horario", args=[novo.id]))
+        self.assertEqual(self.livres(self.outro_veterinario), [])
+
+
+class ConsultasPorPaginaTestCase(TestCase):
+    """O número de consultas SQL do quadro de horários e do painel do veterinário não cresce com os dados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinarios = [
+            criar_usuario(f"vet{indice}@serravet.com", "veterinario", f"0000000001{indice}") for indice in range(3)
+        ]
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        pets = [
+            Pet.objects.create(tutor=cls.tutor, nome=f"Pet {indice}", especie="GATO", peso=4) for indice in range(3)
+        ]
+        agora = timezone.now()
+        for indice in range(12):
+            veterinario = cls.veterinarios[indice % 3]
+            horario = HorarioDisponivel.objects.create(
+                veterinario=veterinario, data=agora + timedelta(hours=indice + 1)
+            )
+            if indice % 2:
+                Consulta.objects.create(
+                    pet=pets[indice % 3], veterinario=veterinario, horario_agendado=horario, motivo="Rotina"
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_quadro_de_horarios_em_todas_as_paginas(self):
+        url = reverse("home_atendente")
+        paginas = 0
+        parametros = {"veterinario": self.veterinarios[0].pk}
+        while True:
+            # O veterinário do filtro, a página de horários (com veterinário, consulta, pet e tutor) e as
+            # opções do filtro.
+            with self.assertNumQueries(3):
+                resposta = self.client.get(url, parametros)
+            paginas += 1
+            pagina = resposta.context["page_obj"]
+            self.assertTrue(all(horario.veterinario_id == self.veterinarios[0].pk for horario in pagina))
+            if not pagina.has_next:
+                break
+            parametros["cursor"] = pagina.proximo_cursor
+        self.assertEqual(paginas, 2)
+
+        with self.assertNumQueries(2):  # sem filtro: a página e as opções do filtro
+            self.client.get(url)
+
+    def test_painel_do_veterinario_com_varias_consultas(self):
+        veterinario = self.veterinarios[1]
+        self.client.force_login(veterinario)
+        with self.assertNumQueries(3):  # usuário, contadores e próximas consultas (a sessão vem do cache)
+            resposta = self.client.get(reverse("home_vet"))
+        self.assertEqual(len(resposta.context["proximas_consultas"]), 2)
+        self.assertEqual(resposta.context["count_marcadas"], 2)
+
+        with self.assertNumQueries(2):  # usuário e próximas consultas; contadores vindos do cache
+            self.client.get(reverse("home_vet"))
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class AgendamentoConcorrenteTestCase(TransactionTestCase):
+    NUMERO_THREADS = 20
+
+    def test_apenas_um_agendamento_vence(self):
+        veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        pet = Pet.objects.create(tutor=tutor, nome="Rex", especie="CACHORRO", peso=10)
+        horario = HorarioDisponivel.objects.create(veterinario=veterinario, data=timezone.now() + timedelta(days=1))
+
+        barreira = threading.Barrier(self.NUMERO_THREADS)
+        vencedores, perdedores, erros = [], [], []
+
+        def agendar():
+            try:
+                barreira.wait()
+                Consulta.objects.create(pet=pet, veterinario=veterinario, horario_agendado=horario, motivo="Disputa")
+                vencedores.append(1)
+            except HorarioIndisponivelError:
+                perdedores.append(1)
+            except Exception as e:
+                erros.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=agendar) for _ in range(self.NUMERO_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        self.assertEqual(len(vencedores), 1)
+        self.assertEqual(len(perdedores), self.NUMERO_THREADS - 1)
+        self.assertEqual(Consulta.objects.filter(horario_agendado=horario).count(), 1)
+
+
+class IndicesTestCase(TestCase):
+    def test_consultas_frequentes_usam_indices(self):
+        veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        Pet.objects.create(tutor=tutor, nome="Rex", especie="CACHORRO", peso=10)
+        HorarioDisponivel.objects.bulk_create(
+            HorarioDisponivel(veterinario=veterinario, data=timezone.now() + timedelta(hours=hora))
+            for hora in range(50)
+        )
+
+        saida = StringIO()
+        call_command("verificar_indices", sem_seqscan=True, stdout=saida)
+        self.assertNotIn("FALHOU", saida.getvalue())
+
+
+class PaginacaoCursorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        Pet.objects.bulk_create(
+            Pet(tutor=cls.tutor, nome=nome, especie="GATO", peso=3)
+            for nome in ["Mel", "Amora", "Mel", "Bidu", "Mel", "Thor", "Jade"]
+        )
+        cls.pets = Pet.objects.filter(tutor=cls.tutor)
+        cls.esperado = list(cls.pets.order_by("nome", "id").values_list("id", flat=True))
+
+    def test_percorre_paginas_nos_dois_sentidos(self):
+        vistos, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                pagina = paginar_por_cursor(self.pets, ["nome", "id"], cursor, tamanho=3)
+            vistos += [pet.id for pet in pagina]
+            if not pagina.has_next:
+                break
+            cursor = pagina.proximo_cursor
+        self.assertEqual(vistos, self.esperado)
+
+        anterior = paginar_por_cursor(self.pets, ["nome", "id"], pagina.cursor_anterior, tamanho=3)
+        self.assertEqual([pet.id for pet in anterior], self.esperado[3:6])
+        self.assertTrue(anterior.has_next)
+        self.assertTrue(anterior.has_previous)
+
+        primeira = paginar_por_cursor(self.pets, ["nome", "id"], anterior.cursor_anterior, tamanho=3)
+        self.assertEqual([pet.id for pet in primeira], self.esperado[:3])
+        self.assertFalse(primeira.has_previous)
+
+    def test_datas_com_microssegundos_nao_repetem_linhas(self):
+        veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        base = timezone.now().replace(microsecond=123456)
+        HorarioDisponivel.objects.bulk_create(
+            HorarioDisponivel(veterinario=veterinario, data=base + timedelta(seconds=segundos, microseconds=segundos))
+            for segundos in range(7)
+        )
+        horarios = HorarioDisponivel.objects.all()
+        for campos in (["data", "id"], ["-data", "id"]):
+            with self.subTest(campos=campos):
+                vistos, cursor = [], None
+                while True:
+                    pagina = paginar_por_cursor(horarios, campos, cursor, tamanho=2)
+                    vistos += [horario.id for horario in pagina]
+                    if not pagina.has_next:
+                        break
+                    cursor = pagina.proximo_cursor
+                self.assertEqual(vistos, list(horarios.order_by(*campos).values_list("id", flat=True)))
+
+                anterior = paginar_por_cursor(horarios, campos, pagina.cursor_anterior, tamanho=2)
+                self.assertEqual([horario.id for horario in anterior], vistos[4:6])
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        pagina = paginar_por_cursor(self.pets, ["nome", "id"], "adulterado", tamanho=3)
+        self.assertEqual([pet.id for pet in pagina], self.esperado[:3])
+        self.assertFalse(pagina.has_previous)
+
+    def test_view_pagina_por_cursor(self):
+        self.client.force_login(self.tutor)
+        resposta = self.client.get(reverse("meus_pets"), {"especie": "GATO"})
+        self.assertTrue(resposta.context["pets"].has_next)
+
+        resposta = self.client.get(
+            reverse("meus_pets"), {"especie": "GATO", "cursor": resposta.context["pets"].proximo_cursor}
+        )
+        self.assertEqual([pet.id for pet in resposta.context["pets"]], self.esperado[3:6])
+
+
+class BuscaPetsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.tutor.nome, cls.tutor.sobrenome = "João", "Araújo"
+        cls.tutor.save()
+        cls.pacoca = Pet.objects.create(tutor=cls.tutor, nome="Paçoca", especie="CACHORRO", peso=10)
+        cls.thor = Pet.objects.create(tutor=cls.tutor, nome="Thor", especie="GATO", peso=4)
+
+    def buscar(self, texto):
+        return set(Pet.objects.filter(filtro_busca_pets(texto)).values_list("nome", flat=True))
+
+    def test_prefixo_sem_acentos(self):
+        self.assertEqual(self.buscar("paco"), {"Paçoca"})
+        self.assertEqual(self.buscar("PAÇ"), {"Paçoca"})
+        self.assertEqual(self.buscar("joao arau"), {"Paçoca", "Thor"})
+        self.assertEqual(self.buscar("thor joão"), {"Thor"})
+        self.assertEqual(self.buscar("oca"), set())
+
+    def test_renomear_tutor_atualiza_busca(self):
+        self.tutor.sobrenome = "Fernandes"
+        self.tutor.save()
+        self.assertEqual(self.buscar("fern"), {"Paçoca", "Thor"})
+        self.assertEqual(self.buscar("araujo"), set())
+
+    def test_lista_consultas_vet_busca_por_tutor_e_status(self):
+        for hora, pet in enumerate([self.pacoca, self.thor], start=1):
+            horario = HorarioDisponivel.objects.create(
+                veterinario=self.veterinario, data=timezone.now() + timedelta(hours=hora)
+            )
+            Consulta.objects.create(pet=pet, veterinario=self.veterinario, horario_agendado=horario, motivo="Rotina")
+
+        self.client.force_login(self.veterinario)
+        resposta = self.client.get(reverse("lista_consultas_vet"), {"q_ativas": "pacoca"})
+        self.assertEqual([c.pet.nome for c in resposta.context["consultas_ativas"]], ["Paçoca"])
+
+        resposta = self.client.get(reverse("lista_consultas_vet"), {"q_ativas": "marc"})
+        self.assertEqual(len(resposta.context["consultas_ativas"]), 2)
+
+
+class BuscaProntuariosTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.outro_veterinario = criar_usuario("vet2@serravet.com", "veterinario", "00000000003")
+        tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        pet = Pet.objects.create(tutor=tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+        textos = [
+            (cls.veterinario, "Vômito e diarreia", "Gastroenterite"),
+            (cls.veterinario, "Vômito recorrente, vômito com sangue", "Gastrite"),
+            (cls.veterinario, "Prurido generalizado", "Dermatite alérgica"),
+            (cls.outro_veterinario, "Vômito", "Gastroenterite"),
+        ]
+        cls.prontuarios = []
+        for hora, (veterinario, sinais, diagnostico) in enumerate(textos, start=1):
+            horario = HorarioDisponivel.objects.create(
+                veterinario=veterinario, data=timezone.now() + timedelta(hours=hora)
+            )
+            consulta = Consulta.objects.create(
+                pet=pet, veterinario=veterinario, horario_agendado=horario, motivo="Rotina"
+            )
+            cls.prontuarios.append(
+                Prontuario.objects.create(consulta=consulta, sinais_clinicos=sinais, diagnostico=diagnostico)
+            )
+
+    def buscar(self, texto):
+        self.client.force_login(self.veterinario)
+        resposta = self.client.get(reverse("buscar_prontuarios_vet"), {"q": texto})
+        self.assertEqual(resposta.status_code, 200)
+        return [resultado["id"] for resultado in resposta.json()["resultados"]]
+
+    def test_busca_ranqueada_sem_acentos_e_restrita_ao_veterinario(self):
+        self.assertEqual(self.buscar("vomito"), [self.prontuarios[1].id, self.prontuarios[0].id])
+        self.assertEqual(self.buscar("ALÉRGICA"), [self.prontuarios[2].id])
+        self.assertEqual(self.buscar(""), [])
+
+    def test_save_reindexa_prontuario(self):
+        prontuario = self.prontuarios[2]
+        prontuario.diagnostico = "Otite externa"
+        prontuario.save(update_fields=["diagnostico"])
+
+        self.assertEqual(self.buscar("otite"), [prontuario.id])
+        self.assertEqual(self.buscar("dermatite"), [])
+
+    def test_apenas_veterinarios(self):
+        self.client.force_login(criar_usuario("outro@serravet.com", "cliente", "00000000004"))
+        resposta = self.client.get(reverse("buscar_prontuarios_vet"), {"q": "vomito"})
+        self.assertEqual(resposta.status_code, 403)
+
+
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email="admin@serravet.com", password="senha-teste", nome="Admin", sobrenome="SerraVet", cpf="00000000009"
+        )
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+    def criar_consultas(self, quantidade):
+        for _ in range(quantidade):
+            horario = HorarioDisponivel.objects.create(
+                veterinario=self.veterinario,
+                data=timezone.now() + timedelta(days=1 + HorarioDisponivel.objects.count()),
+            )
+            consulta = Consulta.objects.create(
+                pet=self.pet, veterinario=self.veterinario, horario_agendado=horario, motivo="Rotina"
+            )
+            Prontuario.objects.create(consulta=consulta, sinais_clinicos="Tosse", diagnostico="Gripe")
+
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(consultas)
+
+    def test_changelists_nao_crescem_com_o_numero_de_linhas(self):
+        self.client.force_login(self.admin)
+        urls = [
+            reverse(f"admin:clinica_{modelo}_changelist")
+            for modelo in ["consulta", "prontuario", "horariodisponivel", "pet"]
+        ]
+        self.criar_consultas(2)
+        antes = [self.contar_consultas(url) for url in urls]
+        self.criar_consultas(8)
+        self.assertEqual([self.contar_consultas(url) for url in urls], antes)
+
+    def test_formulario_de_consulta_nao_lista_todos_os_horarios(self):
+        horario = HorarioDisponivel.objects.create(
+            veterinario=self.veterinario, data=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse("admin:clinica_consulta_add"))
+        self.assertNotContains(resposta, f'<option value="{horario.pk}"')
+        self.assertContains(resposta, "vForeignKeyRawIdAdminField")
+        self.assertContains(resposta, "admin-autocomplete")
+
+
+class InstrumentacaoMiddlewareTestCase(TestCase):
+    @override_settings(INSTRUMENTACAO_REQUISICOES=True)
+    def test_resposta_traz_server_timing(self):
+        with self.assertLogs("clinica.instrumentacao", level="INFO") as logs:
+            resposta = self.client.get(reverse("home"))
+
+        self.assertIn("db;dur=", resposta["Server-Timing"])
+        self.assertIn("total;dur=", resposta["Server-Timing"])
+        self.assertIn('cache;desc="', resposta["Server-Timing"])
+        self.assertIn('"caminho": "/"', logs.output[0])
+
+    def test_desativado_por_padrao(self):
+        resposta = self.client.get(reverse("home"))
+        self.assertNotIn("Server-Timing", resposta)
+
+
+class APITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.outro_tutor = criar_usuario("outro@serravet.com", "cliente", "00000000003")
+        cls.pets = [
+            Pet.objects.create(tutor=cls.tutor, nome=nome, especie="GATO", peso=4) for nome in ["Mia", "Bob", "Tom"]
+        ]
+        cls.pet_alheio = Pet.objects.create(tutor=cls.outro_tutor, nome="Rex", especie="CACHORRO", peso=10)
+        cls.horarios = [
+            HorarioDisponivel.objects.create(veterinario=cls.veterinario, data=timezone.now() + timedelta(days=dia))
+            for dia in range(1, 4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.tutor)
+
+    def test_pets_do_tutor_com_cursor_e_campos(self):
+        resposta = self.client.get(reverse("v1:pets"), {"tamanho": 2, "campos": "id,nome"})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            resposta.json()["resultados"],
+            [{"id": self.pets[1].id, "nome": "Bob"}, {"id": self.pets[0].id, "nome": "Mia"}],
+        )
+
+        with self.assertNumQueries(2):  # usuário e página (a sessão vem do cache)
+            resposta = self.client.get(resposta.json()["proximo"])
+        self.assertEqual([pet["nome"] for pet in resposta.json()["resultados"]], ["Tom"])
+        self.assertIsNone(resposta.json()["proximo"])
+
+    def test_agendamento(self):
+        url = reverse("v1:consultas")
+        dados = {"pet": self.pets[0].id, "horario_agendado": self.horarios[0].id, "motivo": "Vacina"}
+        resposta = self.client.post(url, dados, content_type="application/json")
+        self.assertEqual(resposta.status_code, 201)
+        consulta = Consulta.objects.get(pk=resposta.json()["id"])
+        self.assertEqual((consulta.veterinario_id, consulta.status), (self.veterinario.id, "MARCADA"))
+
+        resposta = self.client.post(url, dados, content_type="application/json")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("horario_agendado", resposta.json())
+
+        dados = {"pet": self.pet_alheio.id, "horario_agendado": self.horarios[1].id, "motivo": "Vacina"}
+        self.assertEqual(self.client.post(url, dados, content_type="application/json").status_code, 400)
+
+        resposta = self.client.get(url)
+        self.assertEqual([c["id"] for c in resposta.json()["resultados"]], [consulta.id])
+        self.assertEqual(resposta.json()["resultados"][0]["veterinario_nome"], "Teste SerraVet")
+
+    def test_agendamento_concorrente_responde_409(self):
+        # Outra requisição reserva o horário entre a validação e o INSERT.
+        dados = {"pet": self.pets[0].id, "horario_agendado": self.horarios[2].id, "motivo": "Vacina"}
+        with mock.patch("clinica.models.HorarioDisponivelQuerySet.reservar", return_value=False):
+            resposta = self.client.post(reverse("v1:consultas"), dados, content_type="application/json")
+        self.assertEqual(resposta.status_code, 409)
+        self.assertFalse(Consulta.objects.exists())
+
+    def test_horarios_e_veterinarios(self):
+        resposta = self.client.get(reverse("v1:horarios"), {"veterinario": self.veterinario.id, "tamanho": 2})
+        self.assertEqual([h["id"] for h in resposta.json()["resultados"]], [h.id for h in self.horarios[:2]])
+        resposta = self.client.get(reverse("v1:veterinarios"))
+        self.assertEqual(
+            resposta.json()["resultados"],
+            [{"id": self.veterinario.id, "nome": "Teste", "sobrenome": "SerraVet", "crmv": None}],
+        )
+
+    def test_cursor_com_microssegundos_nao_repete_linhas(self):
+        veterinario = criar_usuario("vet2@serravet.com", "veterinario", "00000000004")
+        base = (timezone.now() + timedelta(days=5)).replace(microsecond=654321)
+        horarios = [
+            HorarioDisponivel.objects.create(veterinario=veterinario, data=base + timedelta(minutes=minuto))
+            for minuto in range(5)
+        ]
+        for horario in horarios[:3]:
+            Consulta.objects.create(
+                pet=self.pets[0], veterinario=veterinario, horario_agendado=horario, motivo="Rotina"
+            )
+
+        def percorrer(url, parametros):
+            ids, resposta = [], self.client.get(url, {**parametros, "tamanho": 1})
+            while True:
+                ids += [linha["id"] for linha in resposta.json()["resultados"]]
+                if not resposta.json()["proximo"]:
+                    return ids
+                resposta = self.client.get(resposta.json()["proximo"])
+
+        self.assertEqual(
+            percorrer(reverse("v1:horarios"), {"veterinario": veterinario.id}), [h.id for h in horarios[3:]]
+        )
+        consultas = Consulta.objects.order_by("-horario_agendado__data").values_list("id", flat=True)
+        self.assertEqual(percorrer(reverse("v1:consultas"), {}), list(consultas))
+
+    def test_permissoes(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("v1:pets")).status_code, 403)
+        self.client.force_login(self.veterinario)
+        self.assertEqual(self.client.get(reverse("v1:pets")).status_code, 403)
+
+
+class ImagensTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root, IMAGENS_VARIANTES_EM_SEGUNDO_PLANO=False))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+
+    def foto(self, largura=600, altura=400, orientacao=None):
+        imagem = Image.new("RGB", (largura, altura), "orange")
+        exif = Image.Exif()
+        exif[0x010F] = "Camera Teste"
+        if orientacao:
+            exif[0x0112] = orientacao
+        saida = BytesIO()
+        imagem.save(saida, "JPEG", exif=exif)
+        return SimpleUploadedFile("rex.jpeg", saida.getvalue(), content_type="image/jpeg")
+
+    def test_upload_normalizado_e_variantes_geradas_apos_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            pet = Pet.objects.create(
+                tutor=self.tutor, nome="Rex", especie="CACHORRO", peso=10, foto_pet=self.foto(orientacao=6)
+            )
+        # variantes + invalidação do cache do tutor (clinica.sinais) + nova invalidação com as variantes prontas
+        self.assertEqual(len(callbacks), 3)
+
+        self.assertTrue(pet.foto_pet.name.startswith("fotos_pet/rex"))
+        self.assertTrue(pet.foto_pet.name.endswith(".jpg"))
+        with Image.open(pet.foto_pet.path) as original:
+            # Orientação 6 (girar 90°): a foto 600x400 passa a ser retrato, sem EXIF.
+            self.assertEqual(original.size, (400, 600))
+            self.assertEqual(len(original.getexif()), 0)
+
+        for largura in LARGURAS_VARIANTES["foto_pet"]:
+            for extensao, formato in [("jpg", "JPEG"), ("webp", "WEBP")]:
+                with Image.open(pet.foto_pet.storage.path(nome_variante(pet.foto_pet.name, largura, extensao))) as v:
+                    # Fotos menores que a variante não são ampliadas.
+                    self.assertEqual((v.format, v.width), (formato, min(largura, 400)))
+
+    def test_salvar_sem_trocar_a_foto_nao_reprocessa(self):
+        pet = Pet.objects.create(tutor=self.tutor, nome="Rex", especie="CACHORRO", peso=10, foto_pet=self.foto())
+        with self.captureOnCommitCallbacks() as callbacks:
+            pet.peso = 12
+            pet.save()
+        self.assertEqual(len(callbacks), 1)  # só a invalidação do cache do tutor
+
+    def test_imagem_responsiva(self):
+        template = Template('{% load imagens %}{% imagem_responsiva pet.foto_pet alt="Rex" sizes="60px" %}')
+        with self.captureOnCommitCallbacks(execute=False):
+            pet = Pet.objects.create(tutor=self.tutor, nome="Rex", especie="CACHORRO", peso=10, foto_pet=self.foto())
+        html = template.render(Context({"pet": pet}))
+        self.assertNotIn("<picture>", html)
+        self.assertIn(pet.foto_pet.url, html)
+
+        call_command("gerar_variantes_imagens", stdout=StringIO())
+        html = template.render(Context({"pet": pet}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn(f"{nome_variante(pet.foto_pet.url, 480, 'webp')} 480w", html)
+        self.assertIn('sizes="60px"', html)
+
+    def test_fragmentos_em_cache_recebem_as_variantes(self):
+        self.client.force_login(self.tutor)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Pet.objects.create(tutor=self.tutor, nome="Rex", especie="CACHORRO", peso=10, foto_pet=self.foto())
+        invalidar_tutor, gerar_variantes_rex = callbacks
+        invalidar_tutor()
+        self.assertNotContains(self.client.get(reverse("meus_pets")), "<picture>")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            gerar_variantes_rex()
+        self.assertContains(self.client.get(reverse("meus_pets")), "<picture>", count=1)
+
+        # As variantes refeitas pelo comando também invalidam os fragmentos do tutor.
+        with self.captureOnCommitCallbacks(execute=False):
+            Pet.objects.create(tutor=self.tutor, nome="Mel", especie="GATO", peso=4, foto_pet=self.foto())
+        self.assertContains(self.client.get(reverse("meus_pets")), "<picture>", count=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("gerar_variantes_imagens", stdout=StringIO())
+        self.assertContains(self.client.get(reverse("meus_pets")), "<picture>", count=2)
+
+    def test_etag_do_detalhe_muda_com_as_variantes(self):
+        self.client.force_login(self.tutor)
+        with self.captureOnCommitCallbacks(execute=False):
+            pet = Pet.objects.create(tutor=self.tutor, nome="Rex", especie="CACHORRO", peso=10, foto_pet=self.foto())
+        url = reverse("detalhes_pet", args=[pet.id])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        call_command("gerar_variantes_imagens", stdout=StringIO())
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, "<picture>")
+
+
+class ReceitaPrivadaTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.raiz_privada = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.raiz_privada, ignore_errors=True)
+        cls.enterClassContext(override_settings(ARQUIVOS_PRIVADOS_ROOT=cls.raiz_privada))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+        horario = HorarioDisponivel.objects.create(veterinario=cls.veterinario, data=timezone.now() + timedelta(days=1))
+        consulta = Consulta.objects.create(
+            pet=pet, veterinario=cls.veterinario, horario_agendado=horario, motivo="Rotina"
+        )
+        cls.prontuario = Prontuario(consulta=consulta, diagnostico="Otite")
+        cls.prontuario.receita_prescrita.save("receita.pdf", ContentFile(b"%PDF-1.4 receita"), save=False)
+        cls.prontuario.save()
+        cls.url = reverse("baixar_receita", args=[cls.prontuario.pk])
+
+    def test_arquivo_fora_de_media_root(self):
+        receita = self.prontuario.receita_prescrita
+        self.assertTrue(receita.path.startswith(self.raiz_privada))
+        self.assertTrue(receita.url.startswith("/protegido/receitas/"))
+
+    @override_settings(ARQUIVOS_PRIVADOS_X_ACCEL=True)
+    def test_x_accel_redirect_para_tutor_e_veterinario(self):
+        for usuario in [self.tutor, self.veterinario]:
+            self.client.force_login(usuario)
+            resposta = self.client.get(self.url)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(resposta["X-Accel-Redirect"], self.prontuario.receita_prescrita.url)
+            self.assertEqual(resposta["Content-Type"], "application/pdf")
+            self.assertEqual(resposta.content, b"")
+
+    @override_settings(ARQUIVOS_PRIVADOS_X_ACCEL=True)
+    def test_outros_usuarios_recebem_404(self):
+        self.client.force_login(criar_usuario("outro@serravet.com", "cliente", "00000000004"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(ARQUIVOS_PRIVADOS_X_ACCEL=False)
+    def test_sem_nginx_serve_com_get_condicional(self):
+        self.client.force_login(self.tutor)
+        resposta = self.client.get(self.url)
+        self.assertEqual(b"".join(resposta.streaming_content), b"%PDF-1.4 receita")
+        self.assertNotIn("X-Accel-Redirect", resposta)
+
+        resposta = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=resposta["Last-Modified"])
+        self.assertEqual(resposta.status_code, 304)
+
+
+class GetCondicionalTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+        horario = HorarioDisponivel.objects.create(veterinario=cls.veterinario, data=timezone.now() + timedelta(days=1))
+        cls.consulta = Consulta.objects.create(
+            pet=cls.pet, veterinario=cls.veterinario, horario_agendado=horario, motivo="Rotina"
+        )
+        cls.prontuario = Prontuario.objects.create(consulta=cls.consulta, diagnostico="Otite")
+
+    def test_304_nas_paginas_de_detalhe(self):
+        paginas = [
+            (self.tutor, reverse("detalhes_pet", args=[self.pet.id])),
+            (self.tutor, reverse("detalhes_consulta", args=[self.consulta.pk])),
+            (self.tutor, reverse("prontuario_user", args=[self.prontuario.pk])),
+            (self.veterinario, reverse("detalhe_consulta_vet", args=[self.consulta.id])),
+        ]
+        for usuario, url in paginas:
+            with self.subTest(url=url):
+                self.client.force_login(usuario)
+                resposta = self.client.get(url)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertIn("private", resposta["Cache-Control"])
+                with self.assertNumQueries(2):  # usuário e a consulta de versão (a sessão vem do cache)
+                    resposta = self.client.get(url, HTTP_IF_NONE_MATCH=resposta["ETag"])
+                self.assertEqual(resposta.status_code, 304)
+
+    def test_alteracao_muda_etag(self):
+        self.client.force_login(self.tutor)
+        url = reverse("detalhes_consulta", args=[self.consulta.pk])
+        etag = self.client.get(url)["ETag"]
+
+        self.pet.peso = 12
+        self.pet.save(update_fields=["peso"])
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta["ETag"], etag)
+
+        self.prontuario.finalizado = True
+        self.prontuario.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=resposta["ETag"]).status_code, 200)
+
+    def test_if_modified_since_nao_ignora_o_que_o_etag_cobre(self):
+        self.client.force_login(self.tutor)
+        url = reverse("detalhes_consulta", args=[self.consulta.pk])
+        self.assertNotIn("Last-Modified", self.client.get(url))
+
+        # O nome do veterinário entra no ETag mas não tem atualizado_em: uma data não diria que a página mudou.
+        CustomUser.objects.filter(pk=self.veterinario.pk).update(nome="Outro")
+        resposta = self.client.get(url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, "Outro")
+
+    def test_etag_por_usuario_e_sem_acesso(self):
+        self.client.force_login(self.tutor)
+        url = reverse("detalhes_pet", args=[self.pet.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.client.force_login(criar_usuario("outro@serravet.com", "cliente", "00000000004"))
+        resposta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(resposta.status_code, 304)
+        self.assertNotIn("ETag", resposta)
+
+
+class CacheFragmentosTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.veterinario = criar_usuario("vet@serravet.com", "veterinario", "00000000001")
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        cls.pet = Pet.objects.create(tutor=cls.tutor, nome="Rex", especie="CACHORRO", peso=10)
+        horario = HorarioDisponivel.objects.create(veterinario=cls.veterinario, data=timezone.now() + timedelta(days=1))
+        cls.consulta = Consulta.objects.create(
+            pet=cls.pet, veterinario=cls.veterinario, horario_agendado=horario, motivo="Rotina"
+        )
+
+    def setUp(self):
+        cache.clear()
+        zerar_estatisticas_cache()
+
+    def test_cartoes_de_pets_invalidados_ao_salvar_o_pet(self):
+        self.client.force_login(self.tutor)
+        self.client.get(reverse("meus_pets"))
+        with medir_cache() as medicao:
+            self.assertContains(self.client.get(reverse("meus_pets")), "10.00 kg")
+        self.assertEqual(medicao.falhas, 0)
+        self.assertEqual(estatisticas_cache()["fragmento"], {"acertos": 1, "falhas": 1, "taxa_acerto": 0.5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pet.peso = 12
+            self.pet.save()
+        resposta = self.client.get(reverse("meus_pets"))
+        self.assertContains(resposta, "12.00 kg")
+        self.assertNotContains(resposta, "10.00 kg")
+
+    def test_linhas_de_consultas_acompanham_status_e_nomes(self):
+        self.client.force_login(self.veterinario)
+        url = reverse("lista_consultas_vet")
+        self.assertContains(self.client.get(url), "Tutor: Teste SerraVet")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tutor.nome = "Maria"
+            self.tutor.save()
+        self.assertContains(self.client.get(url), "Tutor: Maria SerraVet")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Prontuario.objects.create(consulta=self.consulta, diagnostico="Otite", finalizado=True)
+        self.assertContains(self.client.get(url), "Prontuário OK")
+
+        self.client.force_login(self.tutor)
+        self.assertContains(self.client.get(reverse("consultas_user")), "Realizada")
+
+    def test_login_nao_invalida_namespace_do_tutor(self):
+        self.client.force_login(self.tutor)
+        self.client.get(reverse("meus_pets"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.logout()
+            self.client.login(email="tutor@serravet.com", password="senha-teste")
+        with medir_cache() as medicao:
+            self.client.get(reverse("meus_pets"))
+        self.assertEqual(medicao.falhas, 0)
+
+    def test_backends_contam_acertos_e_falhas(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+        for backend in [CacheMemoria("teste", {}), CacheArquivo(pasta, {})]:
+            with self.subTest(backend=type(backend).__name__), medir_cache() as medicao:
+                self.assertIsNone(backend.get("clinica:tutor:1:x"))
+                backend.set("clinica:tutor:1:x", "valor")
+                self.assertEqual(backend.get("clinica:tutor:1:x"), "valor")
+                self.assertEqual(backend.get("clinica:tutor:1:y", "padrao"), "padrao")
+                self.assertEqual((medicao.acertos, medicao.falhas), (1, 2))
+
+    @override_settings(CACHES={"default": {"BACKEND": "clinica.cache.CacheBanco", "LOCATION": "clinica_cache_teste"}})
+    def test_backend_de_banco(self):
+        call_command("createcachetable", verbosity=0)
+        with medir_cache() as medicao:
+            cache.set("clinica:horario:1:x", 1)
+            self.assertEqual(cache.get("clinica:horario:1:x"), 1)
+            self.assertIsNone(cache.get("clinica:horario:1:y"))
+        self.assertEqual((medicao.acertos, medicao.falhas), (1, 1))
+
+    def test_estatisticas_so_para_staff(self):
+        url = reverse("estatisticas_cache")
+        self.client.force_login(self.tutor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(CustomUser.objects.create_superuser(email="admin@serravet.com", password="x"))
+        self.assertIn("namespaces", self.client.get(url).json())
+
+
+class SessoesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+
+    def test_modos_sem_consulta_de_sessao(self):
+        for modo in ["cache_db", "cookie"]:
+            with self.subTest(modo=modo), override_settings(SESSION_ENGINE=settings.MODOS_SESSAO[modo]):
+                cliente = Client()  # o SessionMiddleware guarda o engine na primeira requisição
+                cliente.force_login(self.tutor)
+                with CaptureQueriesContext(connection) as consultas:
+                    self.assertEqual(cliente.get(reverse("home_user")).status_code, 200)
+                self.assertFalse([c for c in consultas.captured_queries if "django_session" in c["sql"]])
+
+    def sessao_no_worker(self, engine, cache_do_worker, chave=None):
+        sessao = import_module(engine).SessionStore(chave)
+        if hasattr(sessao, "_cache"):
+            sessao._cache = cache_do_worker
+        return sessao
+
+    def test_logout_invalida_a_sessao_nos_outros_workers(self):
+        # Dois workers, cada um com o próprio cache em memória: por isso SERRAVET_CACHE=memoria exige um worker.
+        for engine, invalida in [(settings.MODOS_SESSAO["cache_db"], False), (settings.MODOS_SESSAO["banco"], True)]:
+            with self.subTest(engine=engine):
+                worker_a, worker_b = CacheMemoria(f"{engine}-a", {}), CacheMemoria(f"{engine}-b", {})
+                login = self.sessao_no_worker(engine, worker_a)
+                login["_auth_user_id"] = str(self.tutor.pk)
+                login.save()
+                chave = login.session_key
+                self.assertEqual(
+                    self.sessao_no_worker(engine, worker_b, chave).get("_auth_user_id"), str(self.tutor.pk)
+                )
+
+                login.flush()  # o que o logout faz, atendido pelo worker A
+                restante = self.sessao_no_worker(engine, worker_b, chave).get("_auth_user_id")
+                self.assertEqual(restante is None, invalida)
+
+    def test_cache_memoria_so_com_um_worker(self):
+        with self.assertRaises(ImproperlyConfigured):
+            carregar_settings(SERRAVET_CACHE="memoria", GUNICORN_WORKERS="3")
+        for workers, backend in [("3", "clinica.cache.CacheArquivo"), ("1", "clinica.cache.CacheMemoria")]:
+            with self.subTest(workers=workers):
+                configuracao = carregar_settings(GUNICORN_WORKERS=workers)
+                self.assertEqual(configuracao["CACHES"]["default"]["BACKEND"], backend)
+                self.assertEqual(configuracao["SESSION_ENGINE"], settings.MODOS_SESSAO["cache_db"])
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+    def test_limpar_sessoes_em_lotes(self):
+        agora = timezone.now()
+        Session.objects.bulk_create(
+            [
+                Session(session_key=f"expirada{i}", session_data="", expire_date=agora - timedelta(days=1))
+                for i in range(5)
+            ]
+            + [Session(session_key="valida", session_data="", expire_date=agora + timedelta(days=1))]
+        )
+        saida = StringIO()
+        with CaptureQueriesContext(connection) as consultas:
+            call_command("limpar_sessoes", batch_size=2, pausa=0, stdout=saida)
+        self.assertIn("5 sessão(ões)", saida.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["valida"])
+        self.assertEqual(sum(c["sql"].startswith("DELETE") for c in consultas.captured_queries), 3)
+
+
+class EstaticosTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.origem = tempfile.mkdtemp()
+        cls.destino = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.origem, ignore_errors=True)
+        cls.addClassCleanup(shutil.rmtree, cls.destino, ignore_errors=True)
+        for pasta in ["css", "images"]:
+            os.makedirs(os.path.join(cls.origem, pasta))
+        with open(os.path.join(cls.origem, "css", "estilo.css"), "w") as arquivo:
+            arquivo.write(".fundo { background: url('../images/fundo.png'); }\n" * 50)
+        Image.new("RGBA", (64, 64), (255, 128, 0, 200)).save(os.path.join(cls.origem, "images", "fundo.png"))
+        cls.enterClassContext(
+            override_settings(
+                STATICFILES_DIRS=[cls.origem],
+                STATIC_ROOT=cls.destino,
+                STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            )
+        )
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def caminho(self, nome):
+        return os.path.join(self.destino, nome)
+
+    def test_nomes_com_hash_e_variantes_comprimidas(self):
+        url = static("css/estilo.css")
+        self.assertRegex(url, r"^/static/css/estilo\.[0-9a-f]{12}\.css$")
+        nome = url.removeprefix("/static/")
+        with open(self.caminho(nome), "rb") as arquivo:
+            conteudo = arquivo.read()
+        self.assertIn(static("images/fundo.png").replace("/static/", "../").encode(), conteudo)
+        with open(self.caminho(nome + ".gz"), "rb") as arquivo:
+            self.assertEqual(gzip.decompress(arquivo.read()), conteudo)
+        with open(self.caminho(nome + ".br"), "rb") as arquivo:
+            self.assertEqual(brotli.decompress(arquivo.read()), conteudo)
+
+    def test_imagem_otimizada_e_valida(self):
+        nome = static("images/fundo.png").removeprefix("/static/")
+        self.assertLessEqual(os.path.getsize(self.caminho(nome)), os.path.getsize(self.caminho("images/fundo.png")))
+        with Image.open(self.caminho(nome)) as imagem:
+            self.assertEqual((imagem.format, imagem.mode, imagem.size), ("PNG", "RGBA", (64, 64)))
+        self.assertFalse(os.path.exists(self.caminho(nome + ".gz")))
+
+    def test_arquivo_fora_do_manifesto_usa_nome_original(self):
+        self.assertEqual(static("img/inexistente.png"), "/static/img/inexistente.png")
+
+
+class PreparaBancoTestCase(TestCase):
+    comando = "clinica.management.commands.preparar_banco"
+
+    def test_sem_pendencias_nao_roda_migrate(self):
+        saida = StringIO()
+        with mock.patch(f"{self.comando}.call_command") as chamada:
+            call_command("preparar_banco", stdout=saida)
+        chamada.assert_not_called()
+        self.assertIn("Nenhuma migração pendente", saida.getvalue())
+
+    def test_confere_de_novo_com_a_trava(self):
+        for depois, migra in [([], False), (["clinica.0099"], True)]:
+            with self.subTest(depois=depois), mock.patch(f"{self.comando}.call_command") as chamada:
+                with mock.patch(f"{self.comando}.migracoes_pendentes", side_effect=[["clinica.0099"], depois]):
+                    call_command("preparar_banco", stdout=StringIO())
+                self.assertEqual(chamada.called, migra)
+
+    @skipUnlessDBFeature("test_db_allows_multiple_connections")
+    def test_trava_ocupada_por_outra_replica(self):
+        from .management.commands.preparar_banco import CHAVE_TRAVA_MIGRACOES, trava_migracoes
+
+        if connection.vendor != "postgresql":
+            self.skipTest("trava consultiva só no Postgres")
+        outra = connection.copy()
+        self.addCleanup(outra.close)
+        with outra.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [CHAVE_TRAVA_MIGRACOES])
+        with self.assertRaises(CommandError):
+            with trava_migracoes(espera_maxima=0):
+                pass
+
+
+class AquecimentoTestCase(TestCase):
+    def test_aquece_sem_consultas_e_registra_etapas(self):
+        with self.assertNumQueries(0), self.assertLogs("clinica.inicializacao") as registros:
+            tempos = aquecer(time.perf_counter())
+        self.assertEqual(list(tempos), ["django_setup", "urls", "templates", "primeira_requisicao", "total"])
+        self.assertIn('"status": 200', registros.output[0])
+
+
+class DadosSinteticosTestCase(TestCase):
+    def gerar(self, *argumentos):
+        saida = StringIO()
+        call_command(
+            "gerar_dados_sinteticos",
+            "--tutores",
+            "3",
+            "--veterinarios",
+            "2",
+            "--dias",
+            "2",
+            "--data-base",
+            "2030-03-06",
+            *argumentos,
+            stdout=saida,
+        )
+        return saida.getvalue()
+
+    def retrato(self):
+        """Tudo o que a seed sorteia, sem os ids (que mudam a cada geração)."""
+        return (
+            list(CustomUser.objects.order_by("email").values_list("email", "nome", "sobrenome", "cpf", "user_type")),
+            list(ClientePerfil.objects.order_by("user__email").values_list("user__email", "telefone")),
+            list(
+                Pet.objects.order_by("tutor__email", "nome", "peso").values_list(
+                    "tutor__email", "nome", "especie", "raca", "peso", "vacinas_em_dia"
+                )
+            ),
+            list(
+                HorarioDisponivel.objects.order_by("veterinario__email", "data").values_list(
+                    "veterinario__email",
+                    "data",
+                    "disponivel",
+                    "consulta__status",
+                    "consulta__pet__nome",
+                    "consulta__motivo",
+                    "consulta__prontuario__diagnostico",
+                    "consulta__prontuario__finalizado",
+                )
+            ),
+        )
+
+    def test_base_pequena_e_deterministica(self):
+        self.assertIn("3 tutores, 6 pets, 2 veterinários, 80 horários", self.gerar())
+        primeira = self.retrato()
+        # 05/03 é passado (consultas realizadas, com prontuário) e 06/03 é futuro (consultas marcadas).
+        status = {horario[3] for horario in primeira[3]}
+        self.assertTrue({"REALIZADA", "MARCADA"} <= status)
+        self.assertTrue(Prontuario.objects.filter(finalizado=True).exists())
+
+        with self.assertRaisesMessage(CommandError, "Use --limpar"):
+            self.gerar()
+        self.gerar("--limpar")
+        self.assertEqual(self.retrato(), primeira)
+
+    def test_seeds_com_os_mesmos_dois_ultimos_digitos(self):
+        self.gerar("--seed", "1")
+        with self.assertRaisesMessage(CommandError, "Use --limpar"):
+            self.gerar("--seed", "101")
+        self.gerar("--seed", "101", "--limpar")
+        emails = set(CustomUser.objects.values_list("email", flat=True))
+        self.assertIn("tutor0@101.sintetico.serravet.com", emails)
+        self.assertNotIn("tutor0@1.sintetico.serravet.com", emails)
+
+
+class BenchmarkViewsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "gerar_dados_sinteticos", "--tutores", "3", "--veterinarios", "2", "--dias", "2", stdout=StringIO()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_orcamentos_cobrem_todas_as_rotas(self):
+        self.assertEqual(set(_nomes_rotas()) - ROTAS_IGNORADAS, set(ORCAMENTOS))
+
+    def test_todas_as_rotas_dentro_do_orcamento(self):
+        saida = StringIO()
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "bench_views.json")
+            call_command(
+                "benchmark_views",
+                "--repeticoes",
+                "1",
+                "--aquecimento",
+                "0",
+                "--saida",
+                arquivo,
+                "--baseline",
+                os.path.join(pasta, "baseline.json"),
+                stdout=saida,
+            )
+            with open(arquivo) as relatorio:
+                views = json.load(relatorio)["views"]
+
+        # A base sintética não tem receitas anexadas; todas as outras rotas são medidas.
+        self.assertEqual(set(ORCAMENTOS) - set(views), {"baixar_receita"})
+        self.assertEqual(saida.getvalue().count("ignorada"), 1)
+        self.assertEqual({nome: v["status"] for nome, v in views.items() if v["status"] >= 400}, {})
+
+
+class ConexoesTestCase(TestCase):
+    def test_pool_dimensionado_pelas_threads_e_pelo_limite(self):
+        banco = carregar_settings()["DATABASES"]["default"]
+        self.assertEqual(banco["CONN_MAX_AGE"], 60)
+        self.assertTrue(banco["CONN_HEALTH_CHECKS"])
+        self.assertNotIn("OPTIONS", banco)
+
+        # 40 conexões divididas pelos 4 workers deste serviço e os 4 do outro: o pool fica em 5, abaixo das 8
+        # threads.
+        ambiente = {"SERRAVET_DB_POOL": "1", "GUNICORN_WORKERS": "4", "GUNICORN_THREADS": "8"}
+        banco = carregar_settings(**ambiente)["DATABASES"]["default"]
+        self.assertEqual(banco["CONN_MAX_AGE"], 0)
+        self.assertEqual(banco["OPTIONS"]["pool"]["max_size"], 5)
+
+        banco = carregar_settings(**ambiente, SERRAVET_DB_WORKERS_OUTRO_SERVICO="0")["DATABASES"]["default"]
+        self.assertEqual(banco["OPTIONS"]["pool"]["max_size"], 8)
+        banco = carregar_settings(**ambiente, SERRAVET_DB_MAX_CONEXOES="4")["DATABASES"]["default"]
+        self.assertEqual(banco["OPTIONS"]["pool"]["max_size"], 1)
+
+        banco = carregar_settings(SERRAVET_DB_POOL="1", GUNICORN_THREADS="2")["DATABASES"]["default"]
+        self.assertEqual(banco["OPTIONS"]["pool"]["max_size"], 2)
+
+    def test_asgi_sem_conexoes_persistentes(self):
+        banco = carregar_settings(SERRAVET_ASGI="1", SERRAVET_DB_CONN_MAX_AGE="60")["DATABASES"]["default"]
+        self.assertEqual(banco["CONN_MAX_AGE"], 0)
+        banco = carregar_settings(SERRAVET_ASGI="1", SERRAVET_DB_POOL="1")["DATABASES"]["default"]
+        self.assertIn("pool", banco["OPTIONS"])
+
+    @skipIf(connection.vendor == "postgresql", "no PostgreSQL o benchmark roda em BenchmarkConexoesTestCase")
+    def test_benchmark_exige_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "PostgreSQL"):
+            call_command("benchmark_conexoes", stdout=StringIO())
+
+
+@skipUnless(connection.vendor == "postgresql", "benchmark_conexoes mede conexões com o PostgreSQL")
+class BenchmarkConexoesTestCase(TransactionTestCase):
+    # As threads do benchmark abrem conexões próprias: os dados precisam estar commitados.
+
+    def test_mede_os_tres_modos(self):
+        tutor = criar_usuario("tutor@serravet.com", "cliente", "00000000002")
+        Pet.objects.create(tutor=tutor, nome="Rex", especie="CACHORRO", peso=10)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "bench_conexoes.json")
+            call_command(
+                "benchmark_conexoes", "--requisicoes", "4", "--threads", "2", "--saida", arquivo, stdout=StringIO()
+            )
+            with open(arquivo) as relatorio:
+                modos = json.load(relatorio)["modos"]
+
+        self.assertEqual(list(modos), ["por_requisicao", "persistente", "pool"])
+        self.assertTrue(all(modo["req_s"] > 0 for modo in modos.values()))
+        # Uma conexão por requisição contra uma por thread.
+        self.assertEqual(modos["por_requisicao"]["conexoes_abertas"], 4)
+        self.assertEqual(modos["persistente"]["conexoes_abertas"], 2)
+
+
+class CalibrarGunicornTestCase(TestCase):
+    def test_combinacoes_padrao(self):
+        self.assertEqual(combinacoes_padrao(1), [(1, 1), (1, 2), (1, 4), (1, 8), (3, 1), (3, 2), (3, 4), (3, 8)])
+
+    def test_escolhe_a_menor_entre_as_de_vazao_empatada(self):
+        def resultado(workers, threads, req_s, p95_ms, erros=0, status=("200",)):
+            return {
+                "workers": workers,
+                "threads": threads,
+                "requisicoes": 100,
+                "req_s": req_s,
+                "p95_ms": p95_ms,
+                "erros": erros,
+                "status": dict.fromkeys(status, 100),
+            }
+
+        comando = CalibrarGunicorn()
+        resultados = [
+            resultado(1, 1, 100, 50),
+            resultado(2, 4, 400, 40),
+            resultado(4, 4, 410, 45),  # empate técnico com 2 x 4
+            resultado(4, 8, 900, 400),  # p95 acima do máximo
+            resultado(8, 8, 950, 30, erros=3),
+            resultado(8, 4, 950, 30, status=("200", "500")),
+        ]
+        self.assertEqual(comando.escolher(resultados, 250), {"workers": 2, "threads": 4})
+        self.assertIsNone(comando.escolher(resultados, 10))
+
+    def test_calibra_uma_combinacao(self):
+        with socket.socket() as livre:
+            livre.bind(("127.0.0.1", 0))
+            porta = livre.getsockname()[1]
+
+        saida = StringIO()
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "calibracao.json")
+            call_command(
+                "calibrar_gunicorn",
+                "--combinacao",
+                "1:2",
+                "--duracao",
+                "0.5",
+                "--aquecimento",
+                "0",
+                "--concorrencia",
+                "2",
+                "--p95-maximo",
+                "5000",
+                "--porta",
+                str(porta),
+                "--saida",
+                arquivo,
+                stdout=saida,
+            )
+            with open(arquivo) as relatorio:
+                calibracao = json.load(relatorio)
+
+        self.assertEqual(calibracao["recomendada"], {"workers": 1, "threads": 2})
+        self.assertGreater(calibracao["combinacoes"][0]["requisicoes"], 0)
+        self.assertIn("GUNICORN_WORKERS=1 GUNICORN_THREADS=2", saida.getvalue())
@@ -1,17 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from .models import (
     ClientePerfil,
     Pet,
     Consulta,
     Prontuario,
     HorarioDisponivel,
+    HorarioIndisponivelError,
 )
 from .forms import (
     CadastroPetForm,
     ProntuarioForm,
     HorarioDisponivelForm,
+    HorarioRecorrenteForm,
     HorarioFiltroForm,
+    JanelaHorariosForm,
     AgendamentoClienteForm,
     ConsultaFiltroForm,
     ConsultaAtivasFiltroForm,
@@ -23,16 +26,32 @@ from django.contrib.auth.views import LoginView
 from .forms import CustomAuthenticationForm
 from django.contrib import messages
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.http import require_GET
 from django.utils.timezone import localtime
 from django.contrib.auth import update_session_auth_hash
 from .forms import ClientePerfilForm, CustomPasswordChangeForm
-from django.db.models import OuterRef, Exists
+from django.db.models import OuterRef, Exists, Subquery
 from django.utils.timezone import now
+from .agenda import gerar_horarios_recorrentes
+from .arquivos import resposta_arquivo_privado
+from .condicional import get_condicional
+from .imagens import variantes_disponiveis
+from .busca import buscar_prontuarios, filtro_busca_pets, valores_por_busca
+from .pagination import paginar_por_cursor
+from .cache import (
+    TEMPO_CACHE_HORARIOS,
+    achave_escopo,
+    chave_painel_veterinario,
+    estatisticas_cache,
+    tempo_cache_painel_veterinario,
+)
+from django.conf import settings
+from django.core.cache import cache
+import json
+import os
 
 
 # =====================
@@ -154,9 +173,7 @@ def meus_pets_view(request):
             pets = pets.filter(especie=especie)
 
     PAGINATION_SIZE = 3
-    paginator = Paginator(pets, PAGINATION_SIZE)
-    page_number = request.GET.get("page")
-    pets = paginator.get_page(page_number)
+    pets = paginar_por_cursor(pets, ["nome", "id"], request.GET.get("cursor"), PAGINATION_SIZE)
 
     context = {"pets": pets, "titulo_pagina": "Meus Pets", "form_filtro": form_filtro}
     return render(request, "clinica/user/meus_pets.html", context)
@@ -195,7 +212,38 @@ def excluir_pet_view(request, pet_id):
     return redirect("meus_pets")
 
 
+def _perfil_atualizado_em(request):
+    """atualizado_em do perfil do usuário logado (foto do cabeçalho das páginas do cliente)."""
+    return Subquery(ClientePerfil.objects.filter(user_id=request.user.pk).values("atualizado_em")[:1])
+
+
+def _foto_perfil(request):
+    """Nome da foto de perfil do usuário logado (avatar do cabeçalho)."""
+    return Subquery(ClientePerfil.objects.filter(user_id=request.user.pk).values("foto_user")[:1])
+
+
+def _variantes(modelo, campo, nome):
+    """Larguras das variantes já geradas da foto ``nome``, para os ETags: quando elas ficam prontas a página
+    troca o ``<img>`` simples pelo ``<picture>`` sem que nenhum ``atualizado_em`` mude."""
+    if not nome:
+        return ()
+    return variantes_disponiveis(getattr(modelo(**{campo: nome}), campo))
+
+
+def _versoes_detalhes_pet(request, pet_id):
+    linha = (
+        Pet.objects.filter(id=pet_id, tutor=request.user)
+        .annotate(perfil_atualizado_em=_perfil_atualizado_em(request), foto_perfil=_foto_perfil(request))
+        .values_list("atualizado_em", "perfil_atualizado_em", "foto_pet", "foto_perfil")
+        .first()
+    )
+    if not linha:
+        return None
+    return linha[:2], (_variantes(Pet, "foto_pet", linha[2]), _variantes(ClientePerfil, "foto_user", linha[3]))
+
+
 @login_required
+@get_condicional(_versoes_detalhes_pet)
 def detalhes_pet_view(request, pet_id):
     pet = get_object_or_404(Pet, id=pet_id, tutor=request.user)
     context = {
@@ -253,14 +301,13 @@ def minhas_consultas_view(request):
             consultas_queryset = consultas_queryset.filter(horario_agendado__data__date__lt=data_fim_exclusiva)
 
     PAGINATION_SIZE = 2
-    paginator = Paginator(consultas_queryset, PAGINATION_SIZE)
-    page_number = request.GET.get("page")
-    consultas = paginator.get_page(page_number)
+    consultas = paginar_por_cursor(
+        consultas_queryset, ["-horario_agendado__data", "-id"], request.GET.get("cursor"), PAGINATION_SIZE
+    )
 
     context = {
         "consultas": consultas,
         "form_filtro": form_filtro,
-        "consultas_list_vazia": not consultas_queryset.exists() and not request.GET,
     }
 
     return render(request, "clinica/user/consultas_user.html", context)
@@ -281,20 +328,16 @@ def agendar_consulta_view(request):
             )
 
         if form.is_valid():
-            horario = form.cleaned_data["horario_agendado"]
-            motivo = form.cleaned_data["motivo"]
-            pet = form.cleaned_data["pet"]
-
-            Consulta.objects.create(
-                pet=pet,
-                veterinario=horario.veterinario,
-                horario_agendado=horario,
-                motivo=motivo,
-                status="MARCADA",
-            )
-
-            horario.disponivel = False
-            horario.save()
+            try:
+                form.save(request.user)
+            except HorarioIndisponivelError as e:
+                form.add_error("horario_agendado", e)
+                return render(
+                    request,
+                    "clinica/user/cadastrar_consulta.html",
+                    {"form": form, "titulo": "Agendar Nova Consulta"},
+                    status=409,
+                )
 
             messages.success(request, "Consulta agendada com sucesso!")
             return redirect("consultas_user")
@@ -308,24 +351,73 @@ def agendar_consulta_view(request):
     )
 
 
-@require_GET
-def obter_horarios_disponiveis_ajax(request):
-    veterinario_id = request.GET.get("veterinario_id")
+async def _horarios_disponiveis_payload(veterinario_id, inicio=None, fim=None):
+    agora = timezone.now()
+    horarios = HorarioDisponivel.objects.filter(veterinario_id=veterinario_id, disponivel=True, data__gte=agora)
+    if inicio:
+        horarios = horarios.filter(data__gte=timezone.make_aware(datetime.combine(inicio, time.min)))
+    if fim:
+        horarios = horarios.filter(data__lt=timezone.make_aware(datetime.combine(fim + timedelta(days=1), time.min)))
+    horarios = [horario async for horario in horarios.order_by("data").values_list("id", "data")]
 
-    if not veterinario_id:
-        return JsonResponse([], safe=False)
+    payload = json.dumps(
+        [{"id": horario_id, "display": localtime(data).strftime("%d/%m/%Y às %H:%M")} for horario_id, data in horarios]
+    )
+
+    # O payload expira antes que o primeiro horário listado passe a ser passado.
+    timeout = TEMPO_CACHE_HORARIOS
+    if horarios:
+        timeout = max(1, min(timeout, int((horarios[0][1] - agora).total_seconds())))
+    return payload, timeout
 
-    try:
-        horarios = HorarioDisponivel.objects.filter(veterinario_id=veterinario_id, disponivel=True).order_by("data")
 
-        horarios_data = [{"id": h.id, "display": localtime(h.data).strftime("%d/%m/%Y às %H:%M")} for h in horarios]
-        return JsonResponse(horarios_data, safe=False)
-    except Exception as e:
-        print("ERRO AO OBTER HORÁRIOS:", e)
+@require_GET
+async def obter_horarios_disponiveis_ajax(request):
+    """
+    Horários livres de um veterinário, em JSON. View assíncrona: sob o servidor ASGI (start-asgi) a espera
+    pelo cache e pelo banco não prende um worker.
+    """
+    form = JanelaHorariosForm(request.GET)
+
+    if not form.is_valid():
         return JsonResponse([], safe=False)
 
+    veterinario_id = form.cleaned_data["veterinario_id"]
+    inicio = form.cleaned_data.get("inicio")
+    fim = form.cleaned_data.get("fim")
+
+    chave = await achave_escopo("agenda", veterinario_id, inicio or "", fim or "")
+    payload = await cache.aget(chave)
+    if payload is None:
+        payload, timeout = await _horarios_disponiveis_payload(veterinario_id, inicio, fim)
+        await cache.aset(chave, payload, timeout)
+
+    return HttpResponse(payload, content_type="application/json")
+
+
+def _versoes_detalhe_consulta(request, pk):
+    linha = (
+        Consulta.objects.filter(pk=pk, pet__tutor=request.user)
+        .annotate(perfil_atualizado_em=_perfil_atualizado_em(request), foto_perfil=_foto_perfil(request))
+        .values_list(
+            "atualizado_em",
+            "pet__atualizado_em",
+            "prontuario__atualizado_em",
+            "perfil_atualizado_em",
+            "horario_agendado__data",
+            "veterinario__nome",
+            "veterinario__sobrenome",
+            "foto_perfil",
+        )
+        .first()
+    )
+    if not linha:
+        return None
+    return linha[:4], (*linha[4:-1], _variantes(ClientePerfil, "foto_user", linha[-1]))
+
 
 @login_required
+@get_condicional(_versoes_detalhe_consulta)
 def detalhe_consulta_view(request, pk):
     try:
         consulta = (
@@ -405,7 +497,29 @@ def perfil_user(request):
     return render(request, "clinica/user/perfil_user.html", context)
 
 
+def _versoes_prontuario(request, pk):
+    linha = (
+        Prontuario.objects.filter(pk=pk)
+        .annotate(perfil_atualizado_em=_perfil_atualizado_em(request), foto_perfil=_foto_perfil(request))
+        .values_list(
+            "atualizado_em",
+            "consulta__atualizado_em",
+            "consulta__pet__atualizado_em",
+            "perfil_atualizado_em",
+            "consulta__horario_agendado__data",
+            "consulta__veterinario__nome",
+            "consulta__veterinario__sobrenome",
+            "foto_perfil",
+        )
+        .first()
+    )
+    if not linha:
+        return None
+    return linha[:4], (*linha[4:-1], _variantes(ClientePerfil, "foto_user", linha[-1]))
+
+
 @login_required
+@get_condicional(_versoes_prontuario)
 def prontuario_view(request, pk):
     prontuario = get_object_or_404(
         Prontuario.objects.select_related("consulta__pet", "consulta__veterinario"),
@@ -424,11 +538,47 @@ def prontuario_view(request, pk):
     return render(request, "clinica/user/prontuario_user.html", context)
 
 
+@login_required
+@require_GET
+def baixar_receita(request, pk):
+    """Entrega a receita do prontuário ao tutor do pet ou ao veterinário da consulta (404 para os demais)."""
+    prontuario = get_object_or_404(
+        Prontuario.objects.only("receita_prescrita").filter(
+            Q(consulta__pet__tutor=request.user) | Q(consulta__veterinario=request.user)
+        ),
+        pk=pk,
+    )
+    if not prontuario.receita_prescrita:
+        raise Http404("Prontuário sem receita anexada.")
+    return resposta_arquivo_privado(request, prontuario.receita_prescrita)
+
+
 # =====================
 # VETS VIEWS
 # =====================
 
 
+def _contadores_painel_vet(agora):
+    limite_atraso = agora - timedelta(minutes=30)
+    inicio_hoje = timezone.make_aware(datetime.combine(timezone.localdate(agora), time.min))
+    fim_hoje = inicio_hoje + timedelta(days=1)
+    return {
+        "count_em_andamento": Count(
+            "id",
+            filter=Q(
+                status="EM_ANDAMENTO",
+                horario_agendado__data__gte=max(limite_atraso, inicio_hoje),
+                horario_agendado__data__lt=fim_hoje,
+            ),
+        ),
+        "count_marcadas": Count("id", filter=Q(status="MARCADA", horario_agendado__data__gte=limite_atraso)),
+        "count_prontuarios_pendentes": Count(
+            "id",
+            filter=Q(status__in=["REALIZADA", "EM_ANDAMENTO"]) & ~Q(prontuario__finalizado=True),
+        ),
+    }
+
+
 @login_required
 def home_vet(request):
     if request.user.user_type != "veterinario":
@@ -436,35 +586,56 @@ def home_vet(request):
         return redirect("home")
 
     veterinario = request.user
-    hoje = now().date()
-    consultas_futuras_e_andamento = (
+    agora = now()
+    limite_atraso = agora - timedelta(minutes=30)
+
+    chave = chave_painel_veterinario(veterinario.id)
+    contadores = cache.get(chave)
+    if contadores is None:
+        contadores = Consulta.objects.filter(veterinario=veterinario).aggregate(**_contadores_painel_vet(agora))
+        if tempo_cache_painel_veterinario():
+            cache.set(chave, contadores, tempo_cache_painel_veterinario())
+
+    proximas_consultas = (
         Consulta.objects.filter(
             veterinario=veterinario,
-            horario_agendado__data__gte=now() - timedelta(minutes=30),
+            status__in=["MARCADA", "EM_ANDAMENTO"],
+            horario_agendado__data__gte=limite_atraso,
         )
-        .filter(status__in=["MARCADA", "EM_ANDAMENTO"])
-        .order_by("horario_agendado__data")
+        .select_related("pet__tutor", "horario_agendado")
+        .order_by("horario_agendado__data")[:5]
     )
-    consultas_hoje = consultas_futuras_e_andamento.filter(horario_agendado__data__date=hoje)
-    count_em_andamento = consultas_hoje.filter(status="EM_ANDAMENTO").count()
-    count_marcadas = consultas_futuras_e_andamento.filter(status="MARCADA").count()
-    prontuarios_pendentes = (
-        Consulta.objects.filter(veterinario=veterinario, status__in=["REALIZADA", "EM_ANDAMENTO"])
-        .annotate(prontuario_finalizado=Exists(Prontuario.objects.filter(consulta=OuterRef("pk"), finalizado=True)))
-        .exclude(prontuario_finalizado=True)
-        .count()
-    )
-    proximas_consultas = consultas_futuras_e_andamento[:5]
 
     context = {
-        "count_em_andamento": count_em_andamento,
-        "count_marcadas": count_marcadas,
-        "count_prontuarios_pendentes": prontuarios_pendentes,
+        **contadores,
         "proximas_consultas": proximas_consultas,
     }
     return render(request, "clinica/vet/home_vet.html", context)
 
 
+@login_required
+@require_GET
+async def contadores_painel_vet(request):
+    """
+    Contadores do painel do veterinário em JSON, consultados periodicamente pela home_vet. View assíncrona
+    (ORM e cache assíncronos), compartilhando o cache dos contadores com a home_vet.
+    """
+    usuario = await request.auser()
+    if usuario.user_type != "veterinario":
+        return JsonResponse({"erro": "Acesso negado."}, status=403)
+
+    chave = chave_painel_veterinario(usuario.id)
+    contadores = await cache.aget(chave)
+    if contadores is None:
+        contadores = await Consulta.objects.filter(veterinario_id=usuario.id).aaggregate(
+            **_contadores_painel_vet(now())
+        )
+        if tempo_cache_painel_veterinario():
+            await cache.aset(chave, contadores, tempo_cache_painel_veterinario())
+
+    return JsonResponse(contadores)
+
+
 @login_required
 def lista_consultas_vet(request):
     """
@@ -496,15 +667,13 @@ def lista_consultas_vet(request):
             consultas_ativas_qs = consultas_ativas_qs.filter(horario_agendado__data__date__lt=data_fim_exclusiva)
         if query_busca_ativas:
             consultas_ativas_qs = consultas_ativas_qs.filter(
-                Q(pet__nome__icontains=query_busca_ativas)
-                | Q(pet__tutor__nome__icontains=query_busca_ativas)
-                | Q(pet__tutor__sobrenome__icontains=query_busca_ativas)
-                | Q(status__icontains=query_busca_ativas)
+                filtro_busca_pets(query_busca_ativas, relacao="pet")
+                | Q(status__in=valores_por_busca(query_busca_ativas, Consulta.STATUS_CHOICES))
             )
 
-    paginator_ativas = Paginator(consultas_ativas_qs, 5)
-    page_number_ativas = request.GET.get("page_ativas")
-    consultas_ativas = paginator_ativas.get_page(page_number_ativas)
+    consultas_ativas = paginar_por_cursor(
+        consultas_ativas_qs, ["horario_agendado__data", "id"], request.GET.get("cursor_ativas"), 5
+    )
 
     form_finalizadas = ConsultaFinalizadasFiltroForm(request.GET)
 
@@ -534,14 +703,12 @@ def lista_consultas_vet(request):
 
         if query_busca_finalizadas:
             consultas_finalizadas_qs = consultas_finalizadas_qs.filter(
-                Q(pet__nome__icontains=query_busca_finalizadas)
-                | Q(pet__tutor__nome__icontains=query_busca_finalizadas)
-                | Q(pet__tutor__sobrenome__icontains=query_busca_finalizadas)
+                filtro_busca_pets(query_busca_finalizadas, relacao="pet")
             )
 
-    paginator_finalizadas = Paginator(consultas_finalizadas_qs, 5)
-    page_number_finalizadas = request.GET.get("page_finalizadas")
-    consultas_finalizadas = paginator_finalizadas.get_page(page_number_finalizadas)
+    consultas_finalizadas = paginar_por_cursor(
+        consultas_finalizadas_qs, ["-horario_agendado__data", "-id"], request.GET.get("cursor_finalizadas"), 5
+    )
 
     context = {
         "consultas_ativas": consultas_ativas,
@@ -553,7 +720,71 @@ def lista_consultas_vet(request):
     return render(request, "clinica/vet/lista_consultas_vet.html", context)
 
 
+LIMITE_BUSCA_PRONTUARIOS = 20
+
+
+@login_required
+@require_GET
+def buscar_prontuarios_vet(request):
+    """
+    Busca textual ranqueada nos prontuários das consultas do veterinário logado.
+    """
+    if request.user.user_type != "veterinario":
+        return JsonResponse({"erro": "Acesso negado."}, status=403)
+
+    prontuarios = buscar_prontuarios(
+        Prontuario.objects.filter(consulta__veterinario=request.user), request.GET.get("q", "")
+    ).values(
+        "id",
+        "consulta_id",
+        "consulta__pet__nome",
+        "consulta__pet__tutor__nome",
+        "consulta__pet__tutor__sobrenome",
+        "consulta__horario_agendado__data",
+        "diagnostico",
+        "sinais_clinicos",
+        "relevancia",
+    )[
+        :LIMITE_BUSCA_PRONTUARIOS
+    ]
+
+    resultados = [
+        {
+            "id": prontuario["id"],
+            "pet": prontuario["consulta__pet__nome"],
+            "tutor": f"{prontuario['consulta__pet__tutor__nome']} {prontuario['consulta__pet__tutor__sobrenome']}",
+            "data": localtime(prontuario["consulta__horario_agendado__data"]).strftime("%d/%m/%Y às %H:%M"),
+            "diagnostico": prontuario["diagnostico"],
+            "sinais_clinicos": prontuario["sinais_clinicos"],
+            "relevancia": round(prontuario["relevancia"], 4),
+            "url": reverse("detalhe_consulta_vet", args=[prontuario["consulta_id"]]),
+        }
+        for prontuario in prontuarios
+    ]
+    return JsonResponse({"resultados": resultados})
+
+
+def _versoes_detalhe_consulta_vet(request, consulta_id):
+    linha = (
+        Consulta.objects.filter(id=consulta_id, veterinario=request.user)
+        .values_list(
+            "atualizado_em",
+            "pet__atualizado_em",
+            "prontuario__atualizado_em",
+            "horario_agendado__data",
+            "pet__tutor__nome",
+            "pet__tutor__sobrenome",
+            "pet__foto_pet",
+        )
+        .first()
+    )
+    if not linha:
+        return None
+    return linha[:3], (*linha[3:-1], _variantes(Pet, "foto_pet", linha[-1]))
+
+
 @login_required
+@get_condicional(_versoes_detalhe_consulta_vet)
 def detalhe_consulta_vet(request, consulta_id):
     consulta = get_object_or_404(
         Consulta.objects.select_related(
@@ -611,6 +842,7 @@ def cadastrar_prontuario_vet(request, consulta_id):
 
     try:
         prontuario = Prontuario.objects.get(consulta=consulta)
+        prontuario.consulta = consulta
     except Prontuario.DoesNotExist:
         prontuario = Prontuario(consulta=consulta)
 
@@ -654,9 +886,7 @@ def cadastrar_prontuario_vet(request, consulta_id):
 
 
 def gerenciar_horarios(request):
-    horarios = HorarioDisponivel.objects.all().order_by("data")
-    for horario in horarios:
-        horario.consulta = Consulta.objects.filter(horario_agendado=horario).first()
+    horarios = HorarioDisponivel.objects.select_related("veterinario", "consulta__pet__tutor").order_by("data", "id")
 
     filtro_form = HorarioFiltroForm(request.GET or None)
 
@@ -667,15 +897,14 @@ def gerenciar_horarios(request):
 
         data = filtro_form.cleaned_data.get("data")
         if data:
-            horarios = horarios.filter(data__date=data)
+            inicio_dia = timezone.make_aware(datetime.combine(data, time.min))
+            horarios = horarios.filter(data__gte=inicio_dia, data__lt=inicio_dia + timedelta(days=1))
 
         apenas_disponiveis = filtro_form.cleaned_data.get("apenas_disponiveis")
         if apenas_disponiveis:
             horarios = horarios.filter(disponivel=True)
 
-    paginator = Paginator(horarios, 3)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginar_por_cursor(horarios, ["data", "id"], request.GET.get("cursor"), 3)
 
     contexto = {
         "horarios": page_obj,
@@ -699,6 +928,23 @@ def criar_horario(request):
     return render(request, "clinica/atd/criar_horario.html", {"form": form})
 
 
+def criar_horarios_recorrentes(request):
+    """Gera em lote os horários de uma agenda recorrente."""
+    if request.method == "POST":
+        form = HorarioRecorrenteForm(request.POST)
+        if form.is_valid():
+            criados = gerar_horarios_recorrentes(**form.cleaned_data)
+            if criados:
+                messages.success(request, f"{criados} horário(s) criado(s) com sucesso!")
+            else:
+                messages.info(request, "Nenhum horário novo a criar para a agenda informada.")
+            return redirect("home_atendente")
+    else:
+        form = HorarioRecorrenteForm()
+
+    return render(request, "clinica/atd/criar_horarios_recorrentes.html", {"form": form})
+
+
 def editar_horario(request, horario_id):
     """Edita um horário existente."""
     horario = get_object_or_404(HorarioDisponivel, id=horario_id)
@@ -720,3 +966,23 @@ def excluir_horario(request, horario_id):
         horario.delete()
         return redirect("home_atendente")
     return render(request, "clinica/atd/excluir_horario.html", {"horario": horario})
+
+
+# =====================
+# CACHE STATS
+# =====================
+
+
+@login_required
+@require_GET
+def estatisticas_cache_view(request):
+    """Acertos e falhas de cache por namespace do worker que atendeu (para dimensionar o cache)."""
+    if not request.user.is_staff:
+        return JsonResponse({"erro": "Acesso negado."}, status=403)
+    return JsonResponse(
+        {
+            "backend": settings.CACHES["default"]["BACKEND"],
+            "pid": os.getpid(),
+            "namespaces": estatisticas_cache(),
+        }
+    )